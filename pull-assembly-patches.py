@@ -6,6 +6,8 @@ from zipfile import ZipFile
 
 import requests
 
+from mars_patcher.option_patches import build_option_bundle
+
 VERSION = "0.1.8"
 ASSET_NAME = "Randomizer.Patches.zip"
 DESTINATION_ASSEMBLY_PATH = (
@@ -38,4 +40,7 @@ for asset in response["assets"]:
 
     break
 
+print("Compiling option patches")
+build_option_bundle("mf_u")
+
 print("Done.")
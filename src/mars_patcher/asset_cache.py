@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+from typing import TYPE_CHECKING
+from weakref import WeakKeyDictionary
+
+from mars_patcher.compress import decomp_lz77, decomp_rle
+from mars_patcher.compression_cache import LZ77, RLE
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from os import PathLike
+
+    from mars_patcher.rom import Rom
+
+# Magic, version, entry count
+PACK_HEADER = struct.Struct("<4sHxxI")
+# Address, kind, compressed length, payload offset, payload size, hash of compressed data
+PACK_ENTRY = struct.Struct("<IB3xIII16s")
+PACK_MAGIC = b"MPAK"
+PACK_VERSION = 1
+
+_KIND_IDS = {RLE: 0, LZ77: 1}
+
+# Packs opened with open_asset_pack(), by ROM
+_open_packs: WeakKeyDictionary[Rom, AssetPack] = WeakKeyDictionary()
+_cache_dir: str | None = None
+
+
+def base_checksum(data: bytes | bytearray) -> str:
+    """Returns the checksum identifying a base image, as a hex string."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _data_hash(data: bytes | bytearray | memoryview) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class AssetPack:
+    """
+    Decompressed room layers and minimaps of a single base image, read from a pack file.
+    The file is memory-mapped, so payloads are only read when they are used.
+
+    Each entry stores a hash of the compressed data it was decompressed from. An entry is
+    only used while the ROM still contains that data, so entries are never stale.
+    """
+
+    def __init__(self, path: str | PathLike[str]):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = PACK_HEADER.unpack_from(self._mmap)
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            self._mmap.close()
+            raise ValueError(f"Not a supported asset pack: {path}")
+        # (Address, kind ID): (Compressed length, payload offset, payload size, hash)
+        self._entries: dict[tuple[int, int], tuple[int, int, int, bytes]] = {}
+        for addr, kind_id, *entry in PACK_ENTRY.iter_unpack(
+            self._mmap[PACK_HEADER.size : PACK_HEADER.size + count * PACK_ENTRY.size]
+        ):
+            self._entries[(addr, kind_id)] = tuple(entry)  # type: ignore[assignment]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, data: bytes | bytearray, addr: int, kind: str) -> tuple[bytearray, int] | None:
+        """
+        Returns the decompressed data at an address and the size of the compressed data, or
+        None if the pack doesn't have it or the ROM data changed.
+        """
+        entry = self._entries.get((addr, _KIND_IDS[kind]))
+        if entry is None:
+            return None
+        comp_len, offset, size, comp_hash = entry
+        with memoryview(data) as view:
+            if _data_hash(view[addr : addr + comp_len]) != comp_hash:
+                return None
+        return bytearray(self._mmap[offset : offset + size]), comp_len
+
+    def close(self) -> None:
+        self._mmap.close()
+
+
+def write_asset_pack(
+    path: str | PathLike[str], rom_data: bytes | bytearray, assets: Iterable[tuple[int, str]]
+) -> int:
+    """
+    Decompresses each `(address, kind)` asset from ROM data and writes them to a pack file.
+    Returns the number of assets written. The file is replaced atomically.
+    """
+    entries: list[tuple[int, int, int, bytes]] = []
+    payloads: list[bytearray] = []
+    for addr, kind in sorted(set(assets)):
+        if kind == RLE:
+            payload, comp_len = decomp_rle(rom_data, addr)
+        elif kind == LZ77:
+            payload, comp_len = decomp_lz77(rom_data, addr)
+        else:
+            raise ValueError(f"Unknown compression kind '{kind}'")
+        comp_hash = _data_hash(rom_data[addr : addr + comp_len])
+        entries.append((addr, _KIND_IDS[kind], comp_len, comp_hash))
+        payloads.append(payload)
+
+    offset = PACK_HEADER.size + len(entries) * PACK_ENTRY.size
+    index = bytearray(PACK_HEADER.pack(PACK_MAGIC, PACK_VERSION, len(entries)))
+    for (addr, kind_id, comp_len, comp_hash), payload in zip(entries, payloads):
+        index += PACK_ENTRY.pack(addr, kind_id, comp_len, offset, len(payload), comp_hash)
+        offset += len(payload)
+
+    directory = os.path.dirname(os.fspath(path)) or "."
+    os.makedirs(directory, exist_ok=True)
+    # Write to a temporary file first, so patches running meanwhile never read partial packs
+    fd, temp_path = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(index)
+            for payload in payloads:
+                f.write(payload)
+        os.replace(temp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temp_path)
+        raise
+    return len(entries)
+
+
+def pack_path(directory: str | PathLike[str], checksum: str) -> str:
+    """Returns the path of the pack file for a base image checksum."""
+    return os.path.join(directory, f"{checksum}.pack")
+
+
+def get_asset_cache_dir() -> str | None:
+    """Returns the directory asset packs are read from, or None if the cache is disabled."""
+    return _cache_dir
+
+
+def set_asset_cache_dir(directory: str | PathLike[str] | None) -> None:
+    """Sets the directory asset packs are read from. None disables the cache."""
+    global _cache_dir
+    _cache_dir = os.fspath(directory) if directory is not None else None
+
+
+def open_asset_pack(rom: Rom) -> AssetPack | None:
+    """
+    Opens the pack for the ROM's current data, if the cache is enabled and the pack exists.
+    Should be called right after applying the base patch. Later loads of room layers and
+    minimaps from the ROM use the pack.
+    """
+    old_pack = _open_packs.pop(rom, None)
+    if old_pack is not None:
+        old_pack.close()
+    if _cache_dir is None or not os.path.isdir(_cache_dir):
+        return None
+    path = pack_path(_cache_dir, base_checksum(rom.data))
+    try:
+        pack = AssetPack(path)
+    except (OSError, ValueError):
+        # The cache is best effort
+        return None
+    _open_packs[rom] = pack
+    return pack
+
+
+def load_asset(rom: Rom, addr: int, kind: str) -> tuple[bytearray, int]:
+    """
+    Returns the decompressed data at an address and the size of the compressed data.
+    Uses the ROM's asset pack if it has the data, and decompresses it otherwise.
+    """
+    pack = _open_packs.get(rom)
+    if pack is not None:
+        result = pack.get(rom.data, addr, kind)
+        if result is not None:
+            return result
+    if kind == RLE:
+        return decomp_rle(rom.data, addr)
+    return decomp_lz77(rom.data, addr)
+
+
+def warm_asset_cache(rom: Rom, directory: str | PathLike[str]) -> tuple[str, int]:
+    """
+    Writes the pack for a ROM with every room layer and minimap, decompressing each once.
+    The base patch should already be applied. Returns the pack path and number of assets.
+    """
+    from mars_patcher.constants.game_data import minimap_count, minimap_ptrs
+    from mars_patcher.door_table import DELETED_DOOR_ROOM, DoorTable
+    from mars_patcher.room_entry import RoomEntry
+
+    assets: list[tuple[int, str]] = []
+    # Every room has at least one door
+    for area, room in DoorTable(rom).room_doors:
+        if room == DELETED_DOOR_ROOM:
+            continue
+        entry = RoomEntry(rom, area, room)
+        for addr in (entry.bg1_addr(), entry.bg2_addr(), entry.clip_addr()):
+            # Skip the width and height
+            assets.append((addr + 2, RLE))
+    for addr in rom.read_ptr_table(minimap_ptrs(rom), minimap_count(rom)):
+        assets.append((addr, LZ77))
+
+    path = pack_path(directory, base_checksum(rom.data))
+    return path, write_asset_pack(path, rom.data, assets)
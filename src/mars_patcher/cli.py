@@ -1,18 +1,74 @@
+from __future__ import annotations
+
 import argparse
 import copy
 import json
+import sys
 import typing
 
-from mars_patcher.auto_generated_types import MarsSchema
 from mars_patcher.patcher import patch, validate_patch_data
+from mars_patcher.profiling import PatchProfiler
+from mars_patcher.tracing import Tracer
+
+if typing.TYPE_CHECKING:
+    from mars_patcher.auto_generated_types import MarsSchema
 
 
 def main() -> None:
-    parser = argparse.ArgumentParser()
-    parser.add_argument("rom_path", type=str, help="Path to a GBA ROM file")
-    parser.add_argument("out_path", type=str, help="Path to output ROM file")
-    parser.add_argument("patch_data_path", type=str, help="Path to patch data json file")
-    args = parser.parse_args()
+    parser = argparse.ArgumentParser(prog="mars_patcher")
+    subparsers = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    patch_parser = subparsers.add_parser(
+        "patch",
+        help="Patch a ROM with patch data (the default command)",
+        description="Creates a randomized ROM from a ROM and a patch data json file.",
+    )
+    patch_parser.add_argument("rom_path", type=str, help="Path to a GBA ROM file")
+    patch_parser.add_argument("out_path", type=str, help="Path to output ROM file")
+    patch_parser.add_argument("patch_data_path", type=str, help="Path to patch data json file")
+    patch_parser.add_argument(
+        "--profile",
+        type=str,
+        metavar="OUT_JSON",
+        help="Write per-stage timing, memory and ROM access measurements to a json file",
+    )
+    patch_parser.add_argument(
+        "--trace",
+        type=str,
+        metavar="OUT_JSON",
+        help="Write nested spans in Chrome trace event format to a json file",
+    )
+    patch_parser.add_argument(
+        "--asset-cache",
+        type=str,
+        metavar="DIR",
+        help="Read decompressed room and minimap data from packs written by warm-cache",
+    )
+    patch_parser.set_defaults(func=run_patch)
+
+    warm_parser = subparsers.add_parser(
+        "warm-cache",
+        help="Cache decompressed room and minimap data of a ROM",
+        description="Decompresses every room layer and minimap of a ROM once, and writes them "
+        "to a pack file that later patches of the same ROM start from.",
+    )
+    warm_parser.add_argument("rom_path", type=str, help="Path to a GBA ROM file")
+    warm_parser.add_argument("cache_dir", type=str, help="Directory to write the pack file to")
+    warm_parser.set_defaults(func=warm_cache)
+
+    argv = sys.argv[1:]
+    # The patch command can be left out, which is how the patcher has always been run
+    if not argv or argv[0] not in (*subparsers.choices, "-h", "--help"):
+        argv = ["patch", *argv]
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+def run_patch(args: argparse.Namespace) -> None:
+    if args.asset_cache:
+        from mars_patcher.asset_cache import set_asset_cache_dir
+
+        set_asset_cache_dir(args.asset_cache)
 
     # Load patch data file and validate
     with open(args.patch_data_path, encoding="utf-8") as f:
@@ -20,9 +76,29 @@ def main() -> None:
 
     validate_patch_data(patch_data)
 
+    profiler = PatchProfiler() if args.profile else None
+    tracer = Tracer() if args.trace else None
     patch(
         args.rom_path,
         args.out_path,
-        typing.cast(MarsSchema, copy.copy(patch_data)),
+        typing.cast("MarsSchema", copy.copy(patch_data)),
         lambda message, progress: print(message),
+        profiler,
+        tracer,
     )
+    if profiler is not None:
+        profiler.report.write_json(args.profile)
+    if tracer is not None:
+        tracer.write_json(args.trace)
+
+
+def warm_cache(args: argparse.Namespace) -> None:
+    from mars_patcher.asset_cache import warm_asset_cache
+    from mars_patcher.misc_patches import apply_base_patch
+    from mars_patcher.rom import Rom
+
+    # Patches read the packs after applying the base patch
+    rom = Rom(args.rom_path)
+    apply_base_patch(rom)
+    path, count = warm_asset_cache(rom, args.cache_dir)
+    print(f"Wrote {count} assets to {path}")
@@ -1,10 +1,34 @@
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING
+
+from mars_patcher.profiling import profiled
+from mars_patcher.tracing import traced
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
 MIN_MATCH_SIZE = 3
 MIN_WINDOW_SIZE = 1
 MAX_MATCH_SIZE = (1 << 4) - 1 + MIN_MATCH_SIZE
 MAX_WINDOW_SIZE = (1 << 12) - 1 + MIN_WINDOW_SIZE
+# Fixed minimum run lengths tried by comp_rle_best()
+RLE_MIN_RUN_LENS = range(2, 9)
 
+# Size of the ring buffer of LZ77 positions, which must be larger than the window
+_RING_SIZE = 0x2000
+_RING_MASK = _RING_SIZE - 1
 
-def decomp_rle(input: bytes, idx: int) -> tuple[bytearray, int]:
+# Matches a byte that repeats, capturing the run and the byte
+_REPEAT_PATTERN = re.compile(rb"((.)\2+)", re.DOTALL)
+# Size of encodings that aren't possible
+_NO_SIZE = 1 << 62
+
+
+@traced("decomp_rle", "compress")
+@profiled("decomp_rle")
+def decomp_rle(input: bytes | bytearray, idx: int) -> tuple[bytearray, int]:
     """
     Decompresses RLE data and returns it with the size of the compressed data.
     """
@@ -64,10 +88,240 @@ def decomp_rle(input: bytes, idx: int) -> tuple[bytearray, int]:
     return output, comp_size
 
 
-def comp_rle(input: bytes) -> bytearray:
+@traced("comp_rle", "compress")
+@profiled("comp_rle")
+def comp_rle(input: bytes | bytearray) -> bytearray:
+    """
+    Compresses data using RLE. Each run is written as a run or with the literal values
+    around it, whichever makes the output smallest.
+    """
+    output = bytearray()
+    # Do two passes for low and high bytes
+    for p in range(2):
+        values, counts = _get_runs(input, p)
+        r, is_run = _plan_smaller_rle_pass(counts)
+        output += _write_rle_pass(values, counts, r, is_run)
+    return output
+
+
+@traced("comp_rle_best", "compress")
+@profiled("comp_rle_best")
+def comp_rle_best(input: bytes | bytearray) -> bytearray:
+    """
+    Compresses data using RLE, also trying fixed minimum run lengths for each pass.
+    Slower than comp_rle(), but the output is never larger.
+    """
+    output = bytearray()
+    for p in range(2):
+        values, counts = _get_runs(input, p)
+        r, is_run = _plan_smaller_rle_pass(counts)
+        candidates = [_write_rle_pass(values, counts, r, is_run)]
+        candidates += [
+            _comp_rle_pass(values, counts, r, m) for r in range(2) for m in RLE_MIN_RUN_LENS
+        ]
+        output += min(candidates, key=len)
+    return output
+
+
+def _get_runs(input: bytes | bytearray, p: int) -> tuple[bytes, list[int]]:
+    """Returns the values of every other byte starting at p, and how many times each repeats."""
+    data = bytes(input[p::2])
+    # Values that don't repeat, followed by a run and its value, for each run
+    parts = _REPEAT_PATTERN.split(data)
+    counts: list[int] = []
+    for singles, run in zip(parts[0::3], parts[1::3]):
+        counts += [1] * len(singles)
+        counts.append(len(run))
+    counts += [1] * len(parts[-1])
+    del parts[1::3]
+    return b"".join(parts), counts
+
+
+def _plan_smaller_rle_pass(counts: list[int]) -> tuple[int, bytearray]:
+    """
+    Finds the smallest encoding of a pass with each read length (1 or 2). Returns the r of
+    the smaller one and its runs, see _plan_rle_pass().
+    """
+    size, is_run = _plan_rle_pass(counts, 0)
+    # With 2 byte lengths, each run takes at least 3 bytes or its literal values, and the
+    # read length and ending zeros take 3. Often 1 byte lengths are already as small
+    min_size = 3 + 3 * len(counts) - 2 * counts.count(1) - counts.count(2)
+    if size <= min_size:
+        return 0, is_run
+    long_size, long_is_run = _plan_rle_pass(counts, 1)
+    if long_size < size:
+        return 1, long_is_run
+    return 0, is_run
+
+
+def _plan_rle_pass(counts: list[int], r: int) -> tuple[int, bytearray]:
+    """
+    Finds the smallest encoding of a pass using lengths of r + 1 bytes. Returns its size
+    and whether each run is written as a run (1) or with literal values (0).
+    """
+    width = r + 1
+    max_len = (0x80 << (8 * r)) - 1
+    # Keeping only the smallest open size is enough with 1 byte lengths, or when no literal
+    # values can need another length
+    if width > 1 and sum(counts) > max_len:
+        return _plan_long_rle_pass(counts)
+    count = len(counts)
+    # Smallest size so far, with the last run written as a run (closed) or with literal
+    # values (opened). The length of the open literal values is kept to know when they need
+    # another length
+    closed = 0
+    opened = _NO_SIZE
+    open_len = 0
+    # Whether the smallest size in each state came from the opened state
+    closed_from_open = bytearray(count)
+    open_from_open = bytearray(count)
+    for i, c in enumerate(counts):
+        if c <= max_len:
+            run_size = width + 1
+            new_opened = closed + width + c
+            new_open_len = c
+        else:
+            # Long runs are split into several runs or literal lengths
+            parts = -(-c // max_len)
+            run_size = parts * (width + 1)
+            new_opened = closed + parts * width + c
+            new_open_len = (c - 1) % max_len + 1
+        # Write as a run
+        if opened < closed:
+            closed_from_open[i] = 1
+            closed = opened + run_size
+        else:
+            closed += run_size
+        # Write with literal values, continuing the open ones if that's smaller
+        total = open_len + c
+        if total <= max_len:
+            cont = opened + c
+        else:
+            cont = opened + c + (-(-total // max_len) - 1) * width
+            total = (total - 1) % max_len + 1
+        if cont < new_opened or (cont == new_opened and total < new_open_len):
+            open_from_open[i] = 1
+            opened = cont
+            open_len = total
+        else:
+            opened = new_opened
+            open_len = new_open_len
+
+    # Walk back through the choices
+    is_run = bytearray(count)
+    state_open = opened < closed
+    for i in range(count - 1, -1, -1):
+        if state_open:
+            state_open = open_from_open[i] == 1
+        else:
+            is_run[i] = 1
+            state_open = closed_from_open[i] == 1
+    # Read length byte, data and ending zero(s)
+    return 1 + min(closed, opened) + width, is_run
+
+
+def _plan_long_rle_pass(counts: list[int]) -> tuple[int, bytearray]:
     """
-    Compresses data using RLE.
+    Same as _plan_rle_pass() with 2 byte lengths, for passes long enough that open literal
+    values can need another length. Keeping the smallest open size isn't enough then: one
+    that's a byte larger can still end up smaller if it has fewer values since its last
+    length, since that can save a length later. Larger ones can't.
     """
+    max_len = 0x7FFF
+    count = len(counts)
+    closed = 0
+    # The smallest open size (a), and an open size one byte larger with fewer values since
+    # its last length (b), if there is one
+    a_size = b_size = _NO_SIZE
+    a_len = b_len = 0
+    closed_from_open = bytearray(count)
+    # Which state each open state came from: 0 for closed, 1 for a, 2 for b
+    a_from = bytearray(count)
+    b_from = bytearray(count)
+    for i, c in enumerate(counts):
+        if c <= max_len:
+            run_size = 3
+            states = [(closed + 2 + c, c, 0)]
+        else:
+            parts = -(-c // max_len)
+            run_size = parts * 3
+            states = [(closed + parts * 2 + c, (c - 1) % max_len + 1, 0)]
+        for size, open_len, origin in ((a_size, a_len, 1), (b_size, b_len, 2)):
+            if size == _NO_SIZE:
+                continue
+            total = open_len + c
+            if total <= max_len:
+                states.append((size + c, total, origin))
+            else:
+                extra = (-(-total // max_len) - 1) * 2
+                states.append((size + c + extra, (total - 1) % max_len + 1, origin))
+        if a_size < closed:
+            closed_from_open[i] = 1
+            closed = a_size + run_size
+        else:
+            closed += run_size
+        # Ties prefer the closed state, like _plan_rle_pass()
+        states.sort()
+        a_size, a_len, a_from[i] = states[0]
+        b_size = _NO_SIZE
+        for size, open_len, origin in states:
+            if size == a_size + 1 and open_len < a_len:
+                b_size, b_len, b_from[i] = size, open_len, origin
+                break
+
+    is_run = bytearray(count)
+    state = 1 if a_size < closed else 0
+    for i in range(count - 1, -1, -1):
+        if state == 0:
+            is_run[i] = 1
+            state = closed_from_open[i]
+        else:
+            state = a_from[i] if state == 1 else b_from[i]
+    return 3 + min(closed, a_size), is_run
+
+
+def _write_rle_pass(values: bytes, counts: list[int], r: int, is_run: bytearray) -> bytearray:
+    """Writes a pass using lengths of r + 1 bytes, with the runs chosen by _plan_rle_pass()."""
+    width = r + 1
+    flag = 0x80 << (8 * r)
+    max_len = flag - 1
+    output = bytearray([width])
+    unique = bytearray()
+
+    def add_unique() -> None:
+        for start in range(0, len(unique), max_len):
+            chunk = unique[start : start + max_len]
+            output.extend(len(chunk).to_bytes(width, "big"))
+            output.extend(chunk)
+        unique.clear()
+
+    long_len = (max_len | flag).to_bytes(width, "big")
+    for val, count, run in zip(values, counts, is_run):
+        if not run:
+            if count == 1:
+                unique.append(val)
+            else:
+                unique.extend(bytes((val,)) * count)
+            continue
+        if unique:
+            add_unique()
+        # Long runs are split into runs of the longest length first
+        while count > max_len:
+            output.extend(long_len)
+            output.append(val)
+            count -= max_len
+        output.extend((count | flag).to_bytes(width, "big"))
+        output.append(val)
+    if unique:
+        add_unique()
+    # Write ending zero(s)
+    output.extend(bytes(width))
+    return output
+
+
+def _comp_rle_pass(values: bytes, counts: list[int], r: int, min_run_len: int) -> bytearray:
+    """Compresses a single pass using lengths of r + 1 bytes, writing runs of min_run_len or
+    more values as runs."""
 
     # Inner helper functions
     def write_len(arr: bytearray, val: int, size: int) -> None:
@@ -82,78 +336,49 @@ def comp_rle(input: bytes) -> bytearray:
         arr += unique
         unique.clear()
 
-    output = bytearray()
-    # Do two passes for low and high bytes
-    for p in range(2):
-        # Get counts of consecutive values
-        values = bytearray()
-        counts = []
-
-        prev = input[p]
-        values.append(prev)
-        count = 1
-
-        for i in range(p + 2, len(input), 2):
-            val = input[i]
-            if val == prev:
-                count += 1
-            else:
-                values.append(val)
-                counts.append(count)
-                prev = val
-                count = 1
-        counts.append(count)
-
-        # Try each read length (1 or 2)
-        shortest: bytearray | None = None
-        for r in range(2):
-            temp = bytearray()
-            min_run_len = 3 + r
-            flag = 0x80 << (8 * r)
-            max_run_len = flag - 1
-            unique = bytearray()
-
-            # Write number of bytes to read
-            temp.append(r + 1)
-
-            # For each value and its count
-            for i in range(len(values)):
-                count = counts[i]
-                # If the value's count is long enough for a run
-                if count >= min_run_len:
-                    # If the value is preceded by unique values
-                    if len(unique) > 0:
-                        add_unique(temp, unique, r)
-                    # Add run length and value (multiple times if over max run length)
-                    while count > 0:
-                        curr_len = min(count, max_run_len)
-                        len_flag = curr_len + flag
-                        write_len(temp, len_flag, r)
-                        temp.append(values[i])
-                        count -= curr_len
-                # If the value's count is too short for a run
-                else:
-                    # If the total count would be too long for a run
-                    if len(unique) + count > max_run_len:
-                        add_unique(temp, unique, r)
-                    for _ in range(count):
-                        unique.append(values[i])
-            # Check if there were unique values at the end
-            if len(unique) > 0:
-                add_unique(temp, unique, r)
-            # Write ending zero(s)
-            temp.append(0)
-            if r == 1:
-                temp.append(0)
-            if shortest is None or len(temp) < len(shortest):
-                shortest = temp
-        if shortest is None:
-            raise ValueError("shortest was not assigned")
-        output += shortest
-    return output
+    temp = bytearray()
+    flag = 0x80 << (8 * r)
+    max_run_len = flag - 1
+    unique = bytearray()
 
+    # Write number of bytes to read
+    temp.append(r + 1)
 
-def decomp_lz77(input: bytes, idx: int) -> tuple[bytearray, int]:
+    # For each value and its count
+    for i in range(len(values)):
+        count = counts[i]
+        # If the value's count is long enough for a run
+        if count >= min_run_len:
+            # If the value is preceded by unique values
+            if len(unique) > 0:
+                add_unique(temp, unique, r)
+            # Add run length and value (multiple times if over max run length)
+            while count > 0:
+                curr_len = min(count, max_run_len)
+                len_flag = curr_len + flag
+                write_len(temp, len_flag, r)
+                temp.append(values[i])
+                count -= curr_len
+        # If the value's count is too short for a run
+        else:
+            # If the total count would be too long for a run
+            if len(unique) + count > max_run_len:
+                add_unique(temp, unique, r)
+            for _ in range(count):
+                unique.append(values[i])
+    # Check if there were unique values at the end
+    if len(unique) > 0:
+        add_unique(temp, unique, r)
+    # Write ending zero(s)
+    temp.append(0)
+    if r == 1:
+        temp.append(0)
+    return temp
+
+
+@traced("decomp_lz77", "compress")
+@profiled("decomp_lz77")
+def decomp_lz77(input: bytes | bytearray, idx: int) -> tuple[bytearray, int]:
     """Decompresses LZ77 data and returns it with the size of the compressed data."""
     # Check for 0x10 flag
     if input[idx] != 0x10:
@@ -202,12 +427,115 @@ def decomp_lz77(input: bytes, idx: int) -> tuple[bytearray, int]:
             cflag <<= 1
 
 
-def comp_lz77(input: bytes) -> bytearray:
+@traced("comp_lz77", "compress")
+@profiled("comp_lz77")
+def comp_lz77(input: bytes | bytearray | memoryview) -> bytearray:
     """Compresses data using LZ77."""
-    length = len(input)
+    output = bytearray()
+    for chunk in iter_comp_lz77(input):
+        output += chunk
+    return output
+
+
+def iter_comp_lz77(
+    input: bytes | bytearray | memoryview, chunk_size: int = 0x1000
+) -> Iterator[bytes]:
+    """
+    Compresses data using LZ77, yielding the output in chunks of about chunk_size bytes.
+    Accepts any buffer without copying it, and only keeps match state for the positions
+    within the window, so memory use doesn't grow with the input. The output is the same
+    as comp_lz77().
+    """
+    data = memoryview(input).cast("B")
+    length = len(data)
+    finder = _MatchFinder(data)
+
+    # Write start of data
+    output = bytearray()
+    output.append(0x10)
+    output.append(length & 0xFF)
+    output.append((length >> 8) & 0xFF)
+    output.append(length >> 16)
+
     idx = 0
+    while idx < length:
+        # Get index of new compression flag
+        flag = len(output)
+        output.append(0)
+
+        for i in range(8):
+            # Greedily use the longest match at current position
+            _match = finder.find(idx)
+            if _match is not None:
+                # Compressed
+                match_idx, match_len = _match
+                match_offset = idx - match_idx - MIN_WINDOW_SIZE
+                output.append(((match_len - MIN_MATCH_SIZE) << 4) | (match_offset >> 8))
+                output.append(match_offset & 0xFF)
+                output[flag] |= 0x80 >> i
+                idx += match_len
+            else:
+                # Uncompressed
+                output.append(data[idx])
+                idx += 1
+
+            # Check if at end
+            if idx >= length:
+                break
+
+        if len(output) >= chunk_size:
+            yield bytes(output)
+            output.clear()
+
+    if output:
+        yield bytes(output)
+
+
+@traced("comp_lz77_best", "compress")
+@profiled("comp_lz77_best")
+def comp_lz77_best(input: bytes | bytearray) -> bytearray:
+    """
+    Compresses data using LZ77, choosing matches with an optimal parse instead of greedily.
+    Slower than comp_lz77(), but the output is never larger.
+    """
+    length = len(input)
     longest_matches = _find_longest_matches(input)
 
+    # Cost of encoding the data from each position to the end, in bits. A literal is one
+    # byte and a match is two, plus one bit of their flag byte
+    costs = [0] * (length + 1)
+    steps = [1] * (length + 1)
+    for i in range(length - 1, -1, -1):
+        best_cost = costs[i + 1] + 9
+        best_step = 1
+        _match = longest_matches.get(i)
+        if _match is not None:
+            # Any shorter match at the same offset is also valid
+            for match_len in range(MIN_MATCH_SIZE, _match[1] + 1):
+                cost = costs[i + match_len] + 17
+                if cost < best_cost:
+                    best_cost = cost
+                    best_step = match_len
+        costs[i] = best_cost
+        steps[i] = best_step
+
+    matches: dict[int, tuple[int, int]] = {}
+    idx = 0
+    while idx < length:
+        step = steps[idx]
+        if step > 1:
+            matches[idx] = (longest_matches[idx][0], step)
+        idx += step
+
+    # Flag bytes are rounded up, so the greedy output can still be a byte smaller
+    return min(_write_lz77(input, matches), comp_lz77(input), key=len)
+
+
+def _write_lz77(input: bytes | bytearray, matches: dict[int, tuple[int, int]]) -> bytearray:
+    """Writes LZ77 data, using `(match index, match length)` at each position in matches."""
+    length = len(input)
+    idx = 0
+
     # Write start of data
     output = bytearray()
     output.append(0x10)
@@ -221,8 +549,8 @@ def comp_lz77(input: bytes) -> bytearray:
         output.append(0)
 
         for i in range(8):
-            # Find longest match at current position
-            _match = longest_matches.get(idx)
+            # Find match at current position
+            _match = matches.get(idx)
             if _match is not None:
                 # Compressed
                 match_idx, match_len = _match
@@ -243,42 +571,78 @@ def comp_lz77(input: bytes) -> bytearray:
     raise RuntimeError("LZ77 compression error")
 
 
-def _find_longest_matches(input: bytes) -> dict[int, tuple[int, int]]:
-    length = len(input)
-    triplets: dict[int, list[int]] = {}
+def _find_longest_matches(input: bytes | bytearray) -> dict[int, tuple[int, int]]:
+    """Returns the longest match at every position that has one."""
+    finder = _MatchFinder(memoryview(input).cast("B"))
     longest_matches: dict[int, tuple[int, int]] = {}
+    for i in range(len(input)):
+        _match = finder.find(i)
+        if _match is not None:
+            longest_matches[i] = _match
+    return longest_matches
 
-    for i in range(length - 2):
-        # Get triplet at current position
-        triplet = input[i] | (input[i + 1] << 8) | (input[i + 2] << 16)
 
-        # Check if triplet has no match
-        indexes = triplets.get(triplet)
-        if indexes is None:
-            triplets[triplet] = [i]
-            continue
+class _MatchFinder:
+    """
+    Finds the longest match at each position, searching the most recent positions with
+    the same three bytes first. Positions are kept in hash chains stored in a ring buffer,
+    so only positions within the window take up memory.
+    """
+
+    __slots__ = ("data", "length", "head", "prev", "next_pos")
+
+    def __init__(self, data: memoryview):
+        self.data = data
+        self.length = len(data)
+        # Triplet: Most recent position with it
+        self.head: dict[int, int] = {}
+        # Position % ring size: Previous position with the same triplet, or -1
+        self.prev = [-1] * _RING_SIZE
+        # Next position to add to the chains
+        self.next_pos = 0
+
+    def _add_until(self, end: int) -> None:
+        data = self.data
+        head = self.head
+        prev = self.prev
+        end = min(end, self.length - 2)
+        for i in range(self.next_pos, end):
+            triplet = data[i] | (data[i + 1] << 8) | (data[i + 2] << 16)
+            prev[i & _RING_MASK] = head.get(triplet, -1)
+            head[triplet] = i
+            if i & _RING_MASK == _RING_MASK:
+                # Forget triplets that were last seen outside the window
+                window_start = i - MAX_WINDOW_SIZE
+                self.head = head = {t: j for t, j in head.items() if j >= window_start}
+        self.next_pos = max(self.next_pos, end)
+
+    def find(self, i: int) -> tuple[int, int] | None:
+        """
+        Returns the index and length of the longest match at a position, or None if there
+        is none. Positions must be searched in increasing order.
+        """
+        self._add_until(i)
+        if i >= self.length - 2:
+            return None
+        data = self.data
+        triplet = data[i] | (data[i + 1] << 8) | (data[i + 2] << 16)
+        idx = self.head.get(triplet, -1)
 
         window_start = max(i - MAX_WINDOW_SIZE, 0)
-        max_size = min(MAX_MATCH_SIZE, length - i)
+        max_size = min(MAX_MATCH_SIZE, self.length - i)
         longest_len = 0
         longest_idx = -1
 
         # Skip first index if one byte behind current position
-        j = len(indexes) - 1
-        if indexes[j] >= i - 1:
-            j -= 1
+        if idx == i - 1:
+            idx = self.prev[idx & _RING_MASK]
 
         # Try each index to find the longest match
-        while j >= 0:
-            idx = indexes[j]
-            # Stop if past window
-            if idx < window_start:
-                break
-
+        while idx >= window_start:
             # Find length of match
             match_len = MIN_MATCH_SIZE
             while match_len < max_size:
-                if input[idx + match_len] != input[i + match_len]:
+                if data[idx + match_len] != data[i + match_len]:
                     break
                 match_len += 1
 
@@ -291,10 +655,9 @@ def _find_longest_matches(input: bytes) -> dict[int, tuple[int, int]]:
                 if longest_len == max_size:
                     break
 
-            j -= 1
+            idx = self.prev[idx & _RING_MASK]
 
-        indexes.append(i)
+        self._add_until(i + 1)
         if longest_len >= MIN_MATCH_SIZE:
-            longest_matches[i] = (longest_idx, longest_len)
-
-    return longest_matches
+            return longest_idx, longest_len
+        return None
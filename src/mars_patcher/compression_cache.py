@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+from weakref import WeakKeyDictionary
+
+from mars_patcher.compress import comp_lz77, comp_lz77_best, comp_rle, comp_rle_best
+from mars_patcher.tracing import span
+
+if TYPE_CHECKING:
+    from os import PathLike
+
+    from mars_patcher.rom import Rom
+
+RLE = "rle"
+LZ77 = "lz77"
+# Slower encoders, used when the output of the ones above doesn't fit in place
+RLE_BEST = "rle-best"
+LZ77_BEST = "lz77-best"
+_BEST_KINDS = {RLE: RLE_BEST, LZ77: LZ77_BEST}
+
+# Increase when an encoder's output changes, so cached output from older encoders is not used
+CACHE_VERSION = 3
+
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+
+def compress(kind: str, data: bytes | bytearray) -> bytes:
+    """Compresses data with the encoder for the provided kind, like "rle" or "lz77"."""
+    if kind == RLE:
+        return bytes(comp_rle(data))
+    elif kind == LZ77:
+        return bytes(comp_lz77(data))
+    elif kind == RLE_BEST:
+        return bytes(comp_rle_best(data))
+    elif kind == LZ77_BEST:
+        return bytes(comp_lz77_best(data))
+    raise ValueError(f"Unknown compression kind '{kind}'")
+
+
+class CompressionCache:
+    """
+    Cache of compressed data, keyed by a BLAKE2 hash of the uncompressed data.
+
+    Entries are kept in memory up to a total size, evicting the least recently used ones.
+    If a directory is provided, entries are also stored there and shared between processes.
+    """
+
+    def __init__(
+        self, max_bytes: int = DEFAULT_MAX_BYTES, directory: str | PathLike[str] | None = None
+    ):
+        self.max_bytes = max_bytes
+        self.directory = os.fspath(directory) if directory is not None else None
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, bytes] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(kind: str, data: bytes | bytearray) -> bytes:
+        person = f"{kind}.v{CACHE_VERSION}".encode()
+        return hashlib.blake2b(data, digest_size=20, person=person).digest()
+
+    def get(self, kind: str, data: bytes | bytearray) -> bytes | None:
+        """Returns the cached compressed data, or None if it's not cached."""
+        key = self.key(kind, data)
+        with self._lock:
+            comp_data = self._entries.get(key)
+            if comp_data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return comp_data
+        comp_data = self._read_file(key)
+        with self._lock:
+            if comp_data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._add(key, comp_data)
+        return comp_data
+
+    def put(self, kind: str, data: bytes | bytearray, comp_data: bytes) -> None:
+        """Stores compressed data for the provided uncompressed data."""
+        key = self.key(kind, data)
+        with self._lock:
+            self._add(key, comp_data)
+        self._write_file(key, comp_data)
+
+    def compress(self, kind: str, data: bytes | bytearray) -> bytes:
+        """Returns compressed data from the cache, compressing and storing it if needed."""
+        comp_data = self.get(kind, data)
+        if comp_data is None:
+            comp_data = compress(kind, data)
+            self.put(kind, data, comp_data)
+        return comp_data
+
+    def clear(self) -> None:
+        """Removes every entry from memory. Files in the directory are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _add(self, key: bytes, comp_data: bytes) -> None:
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old)
+        if len(comp_data) > self.max_bytes:
+            return
+        self._entries[key] = comp_data
+        self._size += len(comp_data)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def _path(self, key: bytes) -> str:
+        assert self.directory is not None
+        name = key.hex()
+        return os.path.join(self.directory, name[:2], name[2:])
+
+    def _read_file(self, key: bytes) -> bytes | None:
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_file(self, key: bytes, comp_data: bytes) -> None:
+        if self.directory is None:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first, so other processes never read partial entries
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        except OSError:
+            # The disk tier is best effort
+            return
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(comp_data)
+            os.replace(temp_path, path)
+        except OSError:
+            with contextlib.suppress(OSError):
+                os.remove(temp_path)
+
+
+_cache: CompressionCache | None = CompressionCache()
+
+
+def get_compression_cache() -> CompressionCache | None:
+    """Returns the cache used when writing room layers and minimaps, or None if disabled."""
+    return _cache
+
+
+def set_compression_cache(cache: CompressionCache | None) -> None:
+    """Sets the cache used when writing room layers and minimaps. None disables caching."""
+    global _cache
+    _cache = cache
+
+
+def compress_cached(kind: str, data: bytes | bytearray) -> bytes:
+    """Compresses data, using the current compression cache if there is one."""
+    cache = _cache
+    if cache is None:
+        return compress(kind, data)
+    return cache.compress(kind, data)
+
+
+@dataclass
+class FitStats:
+    """Counts of compressed writes that didn't fit in the space of the original data."""
+
+    escalations: int = 0
+    """Writes that were compressed again with a slower encoder."""
+    repoints_avoided: int = 0
+    """Writes that fit in place after compressing them again."""
+    repoints: int = 0
+    """Writes that still didn't fit, and were repointed to free space."""
+
+
+_fit_stats: WeakKeyDictionary[Rom, FitStats] = WeakKeyDictionary()
+
+
+def get_fit_stats(rom: Rom) -> FitStats:
+    """Returns the counts of compressed writes that didn't fit in place for a ROM."""
+    stats = _fit_stats.get(rom)
+    if stats is None:
+        stats = _fit_stats[rom] = FitStats()
+    return stats
+
+
+def compress_to_fit(
+    rom: Rom, kind: str, data: bytes | bytearray, comp_data: bytes | bytearray, max_len: int
+) -> bytes | bytearray:
+    """
+    Returns data compressed with a fast encoder if it fits in max_len bytes. Otherwise, the
+    data is compressed again with the slower encoder for the kind, and the smaller output is
+    returned. Repointing is only needed if that output doesn't fit either.
+    """
+    if len(comp_data) <= max_len:
+        return comp_data
+    stats = get_fit_stats(rom)
+    stats.escalations += 1
+    with span("compress_to_fit", "compress", kind=kind):
+        best = compress_cached(_BEST_KINDS[kind], data)
+    if len(best) < len(comp_data):
+        comp_data = best
+    if len(comp_data) <= max_len:
+        stats.repoints_avoided += 1
+    else:
+        stats.repoints += 1
+    return comp_data
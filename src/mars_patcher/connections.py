@@ -1,12 +1,9 @@
-from collections.abc import Sequence
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
 import mars_patcher.constants.game_data as gd
-from mars_patcher.auto_generated_types import (
-    MarsschemaElevatorconnections,
-    MarsschemaSectorshortcuts,
-    Validelevatorbottoms,
-    Validelevatortops,
-)
 from mars_patcher.constants.main_hub_numbers import (
     MAIN_HUB_CENTER_ROOM,
     MAIN_HUB_CENTER_SMALL_NUM_COORDS_1,
@@ -21,10 +18,22 @@ from mars_patcher.constants.main_hub_numbers import (
     MAIN_HUB_TILEMAP_ADDR,
 )
 from mars_patcher.data import get_data_path
-from mars_patcher.minimap import Minimap
+from mars_patcher.door_table import load_door_table
+from mars_patcher.flush import flush
+from mars_patcher.minimap import load_minimap
 from mars_patcher.rom import Game, Rom
 from mars_patcher.room_entry import BlockLayer, RoomEntry
 
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+
+    from mars_patcher.auto_generated_types import (
+        MarsschemaElevatorconnections,
+        MarsschemaSectorshortcuts,
+        Validelevatorbottoms,
+        Validelevatortops,
+    )
+
 # Area ID, Room ID, Is area connection
 ELEVATOR_TOPS = {
     "OperationsDeckTop": (0, 0x1A, False),
@@ -61,47 +70,73 @@ SHORTCUT_RIGHT_NUM_COORD = (9, 3)
 SHORTCUT_NUM_X_OFFSET = 3
 SHORTCUT_NUM_BLOCKS = [0x101, 0x104, 0xE5, 0xE6, 0xE7, 0xE8]
 
+# Pointer to the area connections in the code that reads them
+AREA_CONNS_CODE_PTR = 0x6945C
+
 DOOR_TYPE_AREA_CONN = 1
 DOOR_TYPE_NO_HATCH = 2
 
 
+@dataclass(frozen=True, slots=True)
+class ElevatorConnections:
+    tops: tuple[tuple[Validelevatortops, Validelevatorbottoms], ...]
+    """Pairs of elevator tops and the bottoms they lead to."""
+    bottoms: tuple[tuple[Validelevatorbottoms, Validelevatortops], ...]
+    """Pairs of elevator bottoms and the tops they lead to."""
+
+    @classmethod
+    def from_json(cls, data: MarsschemaElevatorconnections) -> ElevatorConnections:
+        return cls(tuple(data["ElevatorTops"].items()), tuple(data["ElevatorBottoms"].items()))
+
+
+@dataclass(frozen=True, slots=True)
+class SectorShortcuts:
+    left_areas: tuple[int, ...]
+    """Destination areas of the left shortcuts, starting from sector 1."""
+    right_areas: tuple[int, ...]
+    """Destination areas of the right shortcuts, starting from sector 1."""
+
+    @classmethod
+    def from_json(cls, data: MarsschemaSectorshortcuts) -> SectorShortcuts:
+        return cls(tuple(data["LeftAreas"]), tuple(data["RightAreas"]))
+
+
 class Connections:
     """Class for handling elevator shuffle and sector shortcut shuffle."""
 
     def __init__(self, rom: Rom):
         self.rom = rom
-        self.area_doors_ptrs = gd.area_doors_ptrs(rom)
+        self.door_table = load_door_table(rom)
         self.area_conns_addr = gd.area_connections(rom)
         self.area_conns_count = gd.area_connections_count(rom)
 
-    def set_elevator_connections(self, data: MarsschemaElevatorconnections) -> None:
+    def set_elevator_connections(self, elevators: ElevatorConnections) -> None:
         # Repoint area connections data
         size = self.area_conns_count * 3
         # Reserve space for 8 more area connections
         new_size = size + 8 * 3
         ac_addr = self.rom.reserve_free_space(new_size)
         self.rom.copy_bytes(self.area_conns_addr, ac_addr, size)
-        # TODO: Move constant
-        self.rom.write_ptr(0x6945C, ac_addr)
+        self.rom.write_ptr(AREA_CONNS_CODE_PTR, ac_addr)
         self.area_conns_addr = ac_addr
 
         # Connect tops to bottoms
-        pairs_top = data["ElevatorTops"]
-        self.connect_elevators(ELEVATOR_TOPS, ELEVATOR_BOTTOMS, pairs_top)
+        self.connect_elevators(ELEVATOR_TOPS, ELEVATOR_BOTTOMS, elevators.tops)
         # Connect bottoms to tops
-        pairs_bottom = data["ElevatorBottoms"]
-        self.connect_elevators(ELEVATOR_BOTTOMS, ELEVATOR_TOPS, pairs_bottom)
+        self.connect_elevators(ELEVATOR_BOTTOMS, ELEVATOR_TOPS, elevators.bottoms)
         if self.rom.game == Game.MF:
             # Update area number tiles in main hub rooms
             self.fix_main_hub_tiles()
             # Remove area numbers from Main Deck minimap
             self.remove_main_deck_minimap_area_nums()
+        self.door_table.write()
 
-    def set_shortcut_connections(self, data: MarsschemaSectorshortcuts) -> None:
-        for i, dst_area in enumerate(data["LeftAreas"]):
+    def set_shortcut_connections(self, shortcuts: SectorShortcuts) -> None:
+        for i, dst_area in enumerate(shortcuts.left_areas):
             self.connect_shortcuts(i + 1, dst_area, True)
-        for i, dst_area in enumerate(data["RightAreas"]):
+        for i, dst_area in enumerate(shortcuts.right_areas):
             self.connect_shortcuts(i + 1, dst_area, False)
+        self.door_table.write()
 
     def connect_shortcuts(self, area: int, dst_area: int, left: bool) -> None:
         # Connect doors and update area connection
@@ -121,26 +156,24 @@ class Connections:
         self.connect_areas(area, door, dst_area, True)
 
         # Update area numbers on BG1
-        addr = self.rom.read_ptr(self.area_doors_ptrs + area * 4) + door * 0xC
-        room = self.rom.read_8(addr + 1)
+        room = self.door_table.doors[(area, door)].room
         room_entry = RoomEntry(self.rom, area, room)
         with room_entry.load_bg1() as bg1:
             block = SHORTCUT_NUM_BLOCKS[left_area - 1]
-            bg1.set_block_value(x, y, block)
-            bg1.set_block_value(x, y + 1, block + 0x10)
+            bg1.set_column(x, y, (block, block + 0x10))
             block = SHORTCUT_NUM_BLOCKS[right_area - 1]
             x += SHORTCUT_NUM_X_OFFSET
-            bg1.set_block_value(x, y, block)
-            bg1.set_block_value(x, y + 1, block + 0x10)
+            bg1.set_column(x, y, (block, block + 0x10))
+        # Write the room now, since both shortcuts of an area can be in the same room
+        flush(self.rom)
 
     def connect_elevators(
         self,
         src_dict: dict,
         dst_dict: dict,
-        pairs: dict[Validelevatortops, Validelevatorbottoms]
-        | dict[Validelevatorbottoms, Validelevatortops],
+        pairs: Iterable[tuple[str, str]],
     ) -> None:
-        for src_name, dst_name in pairs.items():
+        for src_name, dst_name in pairs:
             src_area, src_door, in_list = src_dict[src_name]
             dst_area, dst_door, _ = dst_dict[dst_name]
             # Modify door entry
@@ -149,13 +182,12 @@ class Connections:
             self.connect_areas(src_area, src_door, dst_area, in_list)
 
     def connect_doors(self, src_area: int, src_door: int, dst_area: int, dst_door: int) -> None:
-        addr = self.rom.read_ptr(self.area_doors_ptrs + src_area * 4) + src_door * 0xC
+        entry = self.door_table.doors[(src_area, src_door)]
         # Fix door type
-        props = self.rom.read_8(addr)
         door_type = DOOR_TYPE_AREA_CONN if src_area != dst_area else DOOR_TYPE_NO_HATCH
-        self.rom.write_8(addr, props & 0xF0 | door_type)
+        entry.type = entry.type & 0xF0 | door_type
         # Set destination door
-        self.rom.write_8(addr + 6, dst_door)
+        entry.dest_door = dst_door
 
     def connect_areas(self, src_area: int, src_door: int, dst_area: int, in_list: bool) -> None:
         rom = self.rom
@@ -219,8 +251,7 @@ class Connections:
             with room_entry.load_bg2() as bg2:
                 self._write_main_hub_small_nums(bg2, coords, ele_areas)
                 block = MAIN_HUB_LARGE_NUM_BLOCKS[ele_areas[i]]
-                bg2.set_block_value(large_x, large_y, block)
-                bg2.set_block_value(large_x, large_y + 1, block + 0x10)
+                bg2.set_column(large_x, large_y, (block, block + 0x10))
 
     def _write_main_hub_small_nums(
         self, bg2: BlockLayer, coords: Sequence[tuple[int, int] | None], ele_areas: list[int]
@@ -232,11 +263,10 @@ class Connections:
             if area % 2 == 0:
                 block += 2
             x, y = coord
-            bg2.set_block_value(x, y, block)
-            bg2.set_block_value(x + 1, y, block + 1)
+            bg2.set_row(x, y, (block, block + 1))
 
     def remove_main_deck_minimap_area_nums(self) -> None:
-        with Minimap(self.rom, 0) as minimap:
+        with load_minimap(self.rom, 0) as minimap:
             minimap.set_tile_value(0x2, 0x11, 0xA0, 0)  # 5
             minimap.set_tile_value(0x3, 0x10, 0xA0, 0)  # 3
             minimap.set_tile_value(0x4, 0x0F, 0xA0, 0)  # 1
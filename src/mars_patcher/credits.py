@@ -1,4 +1,8 @@
-from mars_patcher.auto_generated_types import MarsschemaCreditstextItem
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, ClassVar
+
 from mars_patcher.constants.credits_lines import (
     FUSION_STAFF_LINES,
     LINE_TYPE_HEIGHTS,
@@ -6,7 +10,12 @@ from mars_patcher.constants.credits_lines import (
     TEXT_LINE_TYPES,
     LineType,
 )
-from mars_patcher.rom import Rom
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from mars_patcher.auto_generated_types import MarsschemaCreditstextItem
+    from mars_patcher.rom import Rom
 
 CREDITS_ADDR = 0x74B0B0
 CREDITS_LEN = 0x2B98
@@ -14,8 +23,9 @@ FULL_LINE_LEN = 36
 LINE_WIDTH = 30
 
 
+@dataclass(frozen=True, slots=True)
 class CreditsLine:
-    LINE_TYPE_ENUMS = {
+    LINE_TYPE_ENUMS: ClassVar[dict[str, LineType]] = {
         "Blank": LineType.BLANK,
         "Blue": LineType.BLUE,
         "Red": LineType.RED,
@@ -23,20 +33,13 @@ class CreditsLine:
         "White2": LineType.WHITE2,
     }
 
-    def __init__(
-        self,
-        line_type: LineType,
-        blank_lines: int = 0,
-        text: str | None = None,
-        centered: bool = True,
-    ):
-        self.line_type = line_type
-        self.blank_lines = blank_lines
-        self.text = text
-        self.centered = centered
+    line_type: LineType
+    blank_lines: int = 0
+    text: str | None = None
+    centered: bool = True
 
     @classmethod
-    def from_json(cls, data: MarsschemaCreditstextItem) -> "CreditsLine":
+    def from_json(cls, data: MarsschemaCreditstextItem) -> CreditsLine:
         line_type = cls.LINE_TYPE_ENUMS[data["LineType"]]
         blank_lines = data.get("BlankLines", 0)
         text = data.get("Text")
@@ -44,11 +47,10 @@ class CreditsLine:
         return CreditsLine(line_type, blank_lines, text, centered)
 
 
-def write_credits(rom: Rom, data: list[MarsschemaCreditstextItem]) -> None:
+def write_credits(rom: Rom, custom_lines: Sequence[CreditsLine]) -> None:
     writer = CreditsWriter(rom)
     # Write custom credits
-    lines = [CreditsLine.from_json(d) for d in data]
-    writer.write_lines(lines)
+    writer.write_lines(custom_lines)
     # Write fusion staff credits
     lines = [CreditsLine(*line) for line in FUSION_STAFF_LINES]
     writer.write_lines(lines)
@@ -60,7 +62,7 @@ class CreditsWriter:
         self.addr = CREDITS_ADDR
         self.num_lines = 0
 
-    def write_lines(self, lines: list[CreditsLine]) -> None:
+    def write_lines(self, lines: Sequence[CreditsLine]) -> None:
         for line in lines:
             lt_val = LINE_TYPE_VALS[line.line_type]
             line_bytes = bytearray([lt_val, line.blank_lines])
@@ -1,16 +1,28 @@
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
 from enum import Enum
+from functools import cache
+from typing import TYPE_CHECKING
+
+from frozendict import frozendict
 
-from mars_patcher.auto_generated_types import MarsschemaDoorlocksItem
 from mars_patcher.constants.game_data import (
-    area_doors_ptrs,
     hatch_lock_event_count,
     hatch_lock_events,
     minimap_count,
 )
 from mars_patcher.constants.minimap_tiles import COLORED_DOOR_TILES, NORMAL_DOOR_TILES
-from mars_patcher.minimap import MINIMAP_DIM, Minimap
-from mars_patcher.rom import Rom
-from mars_patcher.room_entry import BlockLayer, RoomEntry
+from mars_patcher.door_table import DELETED_DOOR_ROOM, DoorTable, load_door_table
+from mars_patcher.minimap import load_minimap
+from mars_patcher.room_entry import RoomEntry
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+    from mars_patcher.auto_generated_types import MarsschemaDoorlocksItem
+    from mars_patcher.rom import Rom
 
 
 class HatchLock(Enum):
@@ -63,133 +75,163 @@ EXCLUDED_DOORS = {
 }
 
 
-# TODO:
-# - Optimize by only loading rooms that contain doors to modify
-# - Split into more than one function for readability
-def set_door_locks(rom: Rom, data: list[MarsschemaDoorlocksItem]) -> None:
-    door_locks = parse_door_lock_data(data)
-    # Go through all doors in game in order
-    doors_ptrs = area_doors_ptrs(rom)
-    loaded_rooms: dict[tuple[int, int], RoomEntry] = {}
-    # (AreaID, RoomID): (BG1, Clipdata)
-    loaded_bg1_and_clip: dict[tuple[int, int], tuple[BlockLayer, BlockLayer]] = {}
-    # (AreaID, RoomID): (CappedSlot, CaplessSlot)
-    orig_room_hatch_slots: dict[tuple[int, int], tuple[int, int]] = {}
-    new_room_hatch_slots: dict[tuple[int, int], tuple[int, int]] = {}
-    # (AreaID, RoomID): {OrigSlot: NewSlot}
-    hatch_slot_changes: dict[tuple[int, int], dict[int, int]] = {}
-    for area in range(7):
-        area_addr = rom.read_ptr(doors_ptrs + area * 4)
-        for door in range(256):
-            door_addr = area_addr + door * 0xC
-            door_type = rom.read_8(door_addr)
-            # Check if at end of list
-            if door_type == 0:
-                break
+@dataclass(frozen=True, slots=True)
+class Hatch:
+    """A lockable hatch, found from the door entry it belongs to."""
+
+    door: int
+    x: int
+    y: int
+    facing_right: bool
+
+
+class HatchIndex:
+    """
+    Index of every lockable hatch in the game, built from the door entries alone, so door
+    entries are only parsed once.
+    """
+
+    def __init__(self, door_table: DoorTable):
+        # (AreaID, RoomID): Hatches in door order. Rooms are in the order their first door
+        # appears, which keeps repointed room data in the same order
+        self.rooms: dict[tuple[int, int], list[Hatch]] = {}
+        # (AreaID, DoorID): (AreaID, RoomID)
+        self.door_rooms: dict[tuple[int, int], tuple[int, int]] = {}
+        # (AreaID, DoorID) of doors that can't have their lock changed
+        self.unlockable_doors: set[tuple[int, int]] = set()
+        for (area, door), entry in door_table.doors.items():
             # Skip doors that mage marks as deleted
-            room = rom.read_8(door_addr + 1)
-            if room == 0xFF:
+            room = entry.room
+            if room == DELETED_DOOR_ROOM:
                 continue
             # Skip excluded doors and doors that aren't lockable hatches
-            lock = door_locks.get((area, door))
-            if (area, door) in EXCLUDED_DOORS or door_type & 0xF != 4:
-                assert lock is None, f"Area {area} door {door} cannot have its lock changed"
+            if (area, door) in EXCLUDED_DOORS or entry.type & 0xF != 4:
+                self.unlockable_doors.add((area, door))
                 continue
-            # Load room's BG1 and clipdata if not already loaded
-            area_room = (area, room)
-            room_entry = loaded_rooms.get(area_room)
-            if room_entry is None:
-                room_entry = RoomEntry(rom, area, room)
-                bg1 = room_entry.load_bg1()
-                clip = room_entry.load_clip()
-                loaded_rooms[area_room] = room_entry
-                loaded_bg1_and_clip[area_room] = (bg1, clip)
-                orig_room_hatch_slots[area_room] = (0, 5)
-                new_room_hatch_slots[area_room] = (0, 5)
-                hatch_slot_changes[area_room] = {}
-            else:
-                _tuple = loaded_bg1_and_clip.get(area_room)
-                if _tuple is not None:
-                    bg1, clip = _tuple
-
             # Check x exit distance to get facing direction
-            x_exit = rom.read_8(door_addr + 7)
-            facing_right = x_exit < 0x80
+            facing_right = entry.x_exit >= 0
             dx = 1 if facing_right else -1
             # Get hatch position
-            hatch_x = rom.read_8(door_addr + 2) + dx
-            hatch_y = rom.read_8(door_addr + 4)
-            # Get original hatch slot number
-            capped_slot, capless_slot = orig_room_hatch_slots[area_room]
-            clip_val = clip.get_block_value(hatch_x, hatch_y)
-            orig_has_cap = clip_val != 0
-            if orig_has_cap:
-                # Has cap
-                orig_hatch_slot = capped_slot
-                capped_slot += 1
-            else:
-                # Capless
-                orig_hatch_slot = capless_slot
-                capless_slot -= 1
-            orig_room_hatch_slots[area_room] = (capped_slot, capless_slot)
-            # Get new hatch slot number
-            capped_slot, capless_slot = new_room_hatch_slots[area_room]
-            if lock == HatchLock.LOCKED:
-                new_hatch_slot = orig_hatch_slot
-                # Mark door as deleted
-                rom.write_8(door_addr + 1, 0xFF)
-            elif (lock is None and orig_has_cap) or (lock is not None and lock != HatchLock.OPEN):
-                # Has cap
-                new_hatch_slot = capped_slot
-                capped_slot += 1
-            else:
-                # Capless
-                new_hatch_slot = capless_slot
-                capless_slot -= 1
-            new_room_hatch_slots[area_room] = (capped_slot, capless_slot)
-            if new_hatch_slot != orig_hatch_slot:
-                hatch_slot_changes[area_room][orig_hatch_slot] = new_hatch_slot
-            # Overwrite BG1 and clipdata
-            if lock is None:
-                # Even if a hatch's lock hasn't changed, its slot may have changed
-                lock = CLIP_TO_HATCH_LOCK.get(clip_val)
-                if lock is None:
-                    continue
-            bg1_val = BG1_VALUES[lock]
-            if facing_right:
-                bg1_val += 1
-            clip_val = CLIP_VALUES[lock][new_hatch_slot]
-            for y in range(4):
-                bg1.set_block_value(hatch_x, hatch_y + y, bg1_val)
-                clip.set_block_value(hatch_x, hatch_y + y, clip_val)
-                bg1_val += 0x10
-    # Write BG1 and clipdata for each room
-    for bg1, clip in loaded_bg1_and_clip.values():
-        bg1.write()
-        clip.write()
+            hatch = Hatch(door, entry.x_start + dx, entry.y_start, facing_right)
+            self.rooms.setdefault((area, room), []).append(hatch)
+            self.door_rooms[(area, door)] = (area, room)
+
+
+def set_door_locks(rom: Rom, door_locks: Mapping[tuple[int, int], HatchLock]) -> None:
+    door_table = load_door_table(rom)
+    index = HatchIndex(door_table)
+    for area, door in door_locks:
+        assert (area, door) not in index.unlockable_doors, (
+            f"Area {area} door {door} cannot have its lock changed"
+        )
+    # (AreaID, RoomID): {OrigSlot: NewSlot}
+    hatch_slot_changes: dict[tuple[int, int], dict[int, int]] = {}
+    for area_room, hatches in index.rooms.items():
+        changes = set_room_hatch_locks(rom, door_table, area_room, hatches, door_locks)
+        hatch_slot_changes[area_room] = changes
+    door_table.write()
     fix_hatch_lock_events(rom, hatch_slot_changes)
 
 
+def set_room_hatch_locks(
+    rom: Rom,
+    door_table: DoorTable,
+    area_room: tuple[int, int],
+    hatches: list[Hatch],
+    door_locks: Mapping[tuple[int, int], HatchLock],
+) -> dict[int, int]:
+    """
+    Sets the locks of a room's hatches, moving hatches to new slots as needed. Hatches
+    without a new lock still get the BG1 and clipdata of their (possibly new) slot. The
+    room is only written if that changed its data.
+    Returns a dictionary of `OrigSlot: NewSlot` for hatches whose slot changed.
+    """
+    area, room = area_room
+    room_entry = RoomEntry(rom, area, room)
+    bg1 = room_entry.load_bg1()
+    clip = room_entry.load_clip()
+    # (CappedSlot, CaplessSlot)
+    orig_capped_slot, orig_capless_slot = 0, 5
+    new_capped_slot, new_capless_slot = 0, 5
+    hatch_slot_changes: dict[int, int] = {}
+    for hatch in hatches:
+        lock = door_locks.get((area, hatch.door))
+        # Get original hatch slot number
+        clip_val = clip.get_block_value(hatch.x, hatch.y)
+        orig_has_cap = clip_val != 0
+        if orig_has_cap:
+            # Has cap
+            orig_hatch_slot = orig_capped_slot
+            orig_capped_slot += 1
+        else:
+            # Capless
+            orig_hatch_slot = orig_capless_slot
+            orig_capless_slot -= 1
+        # Get new hatch slot number
+        if lock == HatchLock.LOCKED:
+            new_hatch_slot = orig_hatch_slot
+            # Mark door as deleted
+            door_table.doors[(area, hatch.door)].room = DELETED_DOOR_ROOM
+        elif (lock is None and orig_has_cap) or (lock is not None and lock != HatchLock.OPEN):
+            # Has cap
+            new_hatch_slot = new_capped_slot
+            new_capped_slot += 1
+        else:
+            # Capless
+            new_hatch_slot = new_capless_slot
+            new_capless_slot -= 1
+        if new_hatch_slot != orig_hatch_slot:
+            hatch_slot_changes[orig_hatch_slot] = new_hatch_slot
+        # Overwrite BG1 and clipdata
+        if lock is None:
+            # Even if a hatch's lock hasn't changed, its slot may have changed
+            lock = CLIP_TO_HATCH_LOCK.get(clip_val)
+            if lock is None:
+                continue
+        bg1_val = BG1_VALUES[lock]
+        if hatch.facing_right:
+            bg1_val += 1
+        clip_val = CLIP_VALUES[lock][new_hatch_slot]
+        bg1.set_column(hatch.x, hatch.y, [bg1_val + y * 0x10 for y in range(4)])
+        clip.set_column(hatch.x, hatch.y, [clip_val] * 4)
+    # Write BG1, then clipdata. Shared layers are written when the deferred writes are flushed
+    if bg1.is_dirty() or clip.is_dirty():
+        for layer in (bg1, clip):
+            if not layer.is_shared():
+                layer.write()
+    return hatch_slot_changes
+
+
 def remove_door_colors_on_minimap(rom: Rom) -> None:
+    """Replaces colored door tiles on every minimap."""
+    table = _normal_door_tile_table()
     for id in range(minimap_count(rom)):
-        with Minimap(rom, id) as minimap:
-            for y in range(MINIMAP_DIM):
-                for x in range(MINIMAP_DIM):
-                    tile, pal, h_flip, v_flip = minimap.get_tile_value(x, y)
-                    tile_type = COLORED_DOOR_TILES.get(tile)
-                    if tile_type is not None:
-                        tile = NORMAL_DOOR_TILES[tile_type]
-                        minimap.set_tile_value(x, y, tile, pal, h_flip, v_flip)
-
-
-def parse_door_lock_data(data: list[MarsschemaDoorlocksItem]) -> dict[tuple[int, int], HatchLock]:
-    """Returns a dictionary of `(AreaID, RoomID): HatchLock` from the input data."""
+        with load_minimap(rom, id) as minimap:
+            minimap.translate(table)
+
+
+@cache
+def _normal_door_tile_table() -> array[int]:
+    """Returns a table mapping every minimap tile value to one without colored doors.
+    Palette and flip bits are kept."""
+    table = array("H", range(0x10000))
+    for colored_tile, tile_type in COLORED_DOOR_TILES.items():
+        tile = NORMAL_DOOR_TILES[tile_type]
+        for attrs in range(0, 0x10000, 0x400):
+            table[attrs | colored_tile] = attrs | tile
+    return table
+
+
+def parse_door_lock_data(
+    data: list[MarsschemaDoorlocksItem],
+) -> frozendict[tuple[int, int], HatchLock]:
+    """Returns a dictionary of `(AreaID, DoorID): HatchLock` from the input data."""
     door_locks: dict[tuple[int, int], HatchLock] = {}
     for entry in data:
         area_door = (entry["Area"], entry["Door"])
         lock = HATCH_LOCK_ENUMS[entry["LockType"]]
         door_locks[area_door] = lock
-    return door_locks
+    return frozendict(door_locks)
 
 
 def fix_hatch_lock_events(
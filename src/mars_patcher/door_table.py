@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import struct
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+from weakref import WeakKeyDictionary
+
+from mars_patcher.constants.game_data import area_count, area_doors_ptrs
+
+if TYPE_CHECKING:
+    from mars_patcher.rom import Rom
+
+DOOR_ENTRY_SIZE = 0xC
+MAX_DOORS_PER_AREA = 256
+# Type, room, X start, X end, Y start, Y end, destination door, X exit, Y exit
+DOOR_FIELDS = struct.Struct("<7B2b")
+# Door fields followed by 3 bytes of padding
+DOOR_ENTRY = struct.Struct("<7B2b3x")
+# Room ID of doors that were deleted
+DELETED_DOOR_ROOM = 0xFF
+
+# Door tables shared by load_door_table(), or None until one is loaded. A ROM is only in
+# here while its writes are deferred, see flush.deferred_writes()
+_loaded_tables: WeakKeyDictionary[Rom, DoorTable | None] = WeakKeyDictionary()
+
+
+@dataclass(slots=True)
+class DoorEntry:
+    """A door entry, with the address it was read from."""
+
+    addr: int
+    type: int
+    room: int
+    x_start: int
+    x_end: int
+    y_start: int
+    y_end: int
+    dest_door: int
+    x_exit: int
+    """Signed X exit distance. Positive if the door faces right."""
+    y_exit: int
+
+    def fields(self) -> tuple[int, ...]:
+        return (
+            self.type,
+            self.room,
+            self.x_start,
+            self.x_end,
+            self.y_start,
+            self.y_end,
+            self.dest_door,
+            self.x_exit,
+            self.y_exit,
+        )
+
+
+class DoorTable:
+    """
+    Every area's door entries, unpacked at once. Door entries can be modified and written
+    back with write(), which only writes the doors that changed.
+    """
+
+    def __init__(self, rom: Rom):
+        self.rom = rom
+        # (AreaID, DoorID): DoorEntry
+        self.doors: dict[tuple[int, int], DoorEntry] = {}
+        # (AreaID, RoomID): Door IDs in order. Reflects the rooms as they were read, and
+        # includes deleted doors under DELETED_DOOR_ROOM. Doors deleted later are still
+        # listed under their old room
+        self.room_doors: dict[tuple[int, int], list[int]] = {}
+        self._written: dict[tuple[int, int], tuple[int, ...]] = {}
+        area_addrs = rom.read_ptr_table(area_doors_ptrs(rom), area_count(rom))
+        for area, area_addr in enumerate(area_addrs):
+            size = min(MAX_DOORS_PER_AREA * DOOR_ENTRY_SIZE, len(rom.data) - area_addr)
+            size -= size % DOOR_ENTRY_SIZE
+            data = rom.read_bytes(area_addr, size)
+            for door, fields in enumerate(DOOR_ENTRY.iter_unpack(data)):
+                # Check if at end of list
+                if fields[0] == 0:
+                    break
+                entry = DoorEntry(area_addr + door * DOOR_ENTRY_SIZE, *fields)
+                self.doors[(area, door)] = entry
+                self.room_doors.setdefault((area, entry.room), []).append(door)
+                self._written[(area, door)] = fields
+
+    def find_door_in_room(self, area: int, room: int) -> int | None:
+        """Returns the first door in a room, or None if the room has no doors."""
+        for door in self.room_doors.get((area, room), ()):
+            if self.doors[(area, door)].room == room:
+                return door
+        return None
+
+    def write(self) -> None:
+        """Writes every door entry that changed since it was read or last written."""
+        for area_door, entry in self.doors.items():
+            fields = entry.fields()
+            if fields != self._written[area_door]:
+                self.rom.write_bytes(entry.addr, DOOR_FIELDS.pack(*fields))
+                self._written[area_door] = fields
+
+
+def load_door_table(rom: Rom) -> DoorTable:
+    """
+    Returns the door table of the ROM. While the ROM's writes are deferred (see
+    flush.deferred_writes()), the table is shared by every caller patching the ROM, so
+    the doors are only read once. Otherwise, a new table is read. Either way, changed doors
+    are only written by DoorTable.write().
+    """
+    if rom not in _loaded_tables:
+        return DoorTable(rom)
+    table = _loaded_tables[rom]
+    if table is None:
+        table = _loaded_tables[rom] = DoorTable(rom)
+    return table
+
+
+def start_sharing_door_table(rom: Rom) -> bool:
+    """
+    Makes load_door_table() share the door table of the ROM until
+    stop_sharing_door_table() is called. Returns False if it was already shared.
+    """
+    if rom in _loaded_tables:
+        return False
+    _loaded_tables[rom] = None
+    return True
+
+
+def stop_sharing_door_table(rom: Rom) -> None:
+    """Stops sharing the door table of the ROM. Doors that weren't written are discarded."""
+    _loaded_tables.pop(rom, None)
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+from mars_patcher.compression_cache import LZ77, RLE, compress, get_compression_cache
+from mars_patcher.door_table import start_sharing_door_table, stop_sharing_door_table
+from mars_patcher.minimap import pop_loaded_minimaps, start_sharing_minimaps, stop_sharing_minimaps
+from mars_patcher.room_entry import (
+    pop_loaded_block_layers,
+    start_sharing_block_layers,
+    stop_sharing_block_layers,
+)
+from mars_patcher.tracing import span
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Sequence
+
+    from mars_patcher.rom import Rom
+
+# Below this many buffers, starting worker processes costs more than it saves
+MIN_PARALLEL_JOBS = 8
+
+
+@contextmanager
+def deferred_writes(rom: Rom, max_workers: int = 1) -> Iterator[None]:
+    """
+    Defers writing block layers and minimaps of the ROM until the end of the block. Inside
+    it, load_block_layer() and load_minimap() (and the RoomEntry methods that use them)
+    return layers and minimaps shared by every caller, so each is decompressed once, and
+    changed ones are compressed once by flush(). Leaving the block always flushes, so no
+    changes are left unwritten. If the block raises, nothing more is written, since the
+    ROM is left half patched anyway. Entering it again while already inside does nothing.
+
+    The door table from load_door_table() is shared in the block too, so the doors are only
+    read once. Its changes are still written by DoorTable.write().
+    """
+    started = start_sharing_block_layers(rom)
+    started = start_sharing_minimaps(rom) or started
+    started = start_sharing_door_table(rom) or started
+    if not started:
+        yield
+        return
+    try:
+        yield
+        flush(rom, max_workers)
+    finally:
+        stop_sharing_block_layers(rom)
+        stop_sharing_minimaps(rom)
+        stop_sharing_door_table(rom)
+
+
+def flush(rom: Rom, max_workers: int = 1) -> None:
+    """
+    Compresses and writes every changed block layer and minimap shared while the ROM's
+    writes are deferred, see deferred_writes(). Does nothing outside of it.
+
+    Buffers found in the compression cache are not compressed again. The rest are
+    compressed in this process, or in a process pool if max_workers allows it and there
+    are enough of them. Free space is reserved and pointers are written afterwards, in
+    load order (layers first, then minimaps), so the output doesn't depend on max_workers.
+
+    Args:
+        rom: The ROM being patched.
+        max_workers: The maximum number of worker processes. The default of 1 compresses
+            everything in this process. Programs that use more must be able to start
+            worker processes, which frozen builds need freeze_support() for.
+    """
+    with span("flush", "flush"):
+        layers = [layer for layer in pop_loaded_block_layers(rom) if layer.is_dirty()]
+        minimaps = [minimap for minimap in pop_loaded_minimaps(rom) if minimap.dirty]
+        jobs = [(RLE, bytes(layer.block_data)) for layer in layers]
+        jobs += [(LZ77, bytes(minimap.tile_data)) for minimap in minimaps]
+        results = compress_all_cached(jobs, max_workers)
+        for layer, comp_data in zip(layers, results[: len(layers)]):
+            layer.write_compressed(comp_data)
+        for minimap, comp_data in zip(minimaps, results[len(layers) :]):
+            minimap.write_compressed(comp_data)
+
+
+def compress_all_cached(jobs: Sequence[tuple[str, bytes]], max_workers: int = 1) -> list[bytes]:
+    """Same as compress_all(), but uses the compression cache for buffers it contains."""
+    cache = get_compression_cache()
+    if cache is None:
+        return compress_all(jobs, max_workers)
+    results = [cache.get(kind, data) for kind, data in jobs]
+    misses = [i for i, result in enumerate(results) if result is None]
+    compressed = compress_all([jobs[i] for i in misses], max_workers)
+    for i, comp_data in zip(misses, compressed):
+        kind, data = jobs[i]
+        cache.put(kind, data, comp_data)
+        results[i] = comp_data
+    return [result for result in results if result is not None]
+
+
+def compress_all(jobs: Sequence[tuple[str, bytes]], max_workers: int = 1) -> list[bytes]:
+    """
+    Compresses each `(kind, data)` job, where kind is "rle" or "lz77". Results are returned
+    in the same order as the jobs. Only uses worker processes if max_workers is above 1.
+    """
+    workers = min(max_workers, len(jobs))
+    if workers > 1 and len(jobs) >= MIN_PARALLEL_JOBS:
+        # Imported here, as multiprocessing is slow to import and often not needed
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+
+        kinds = [kind for kind, _ in jobs]
+        buffers = [data for _, data in jobs]
+        chunksize = max(1, len(jobs) // (4 * workers))
+        try:
+            with ProcessPoolExecutor(workers) as executor:
+                return list(executor.map(compress, kinds, buffers, chunksize=chunksize))
+        except (OSError, NotImplementedError, BrokenProcessPool):
+            # Some platforms can't start worker processes
+            pass
+    return [compress(kind, data) for kind, data in jobs]
@@ -1,11 +1,19 @@
-from mars_patcher.auto_generated_types import MarsschemaTankincrements
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
 from mars_patcher.constants.reserved_space import ReservedConstants
+from mars_patcher.flush import flush
 from mars_patcher.locations import ItemMessages, ItemSprite, ItemType, LocationSettings
-from mars_patcher.rom import Rom
 from mars_patcher.room_entry import RoomEntry
 from mars_patcher.text import Language, MessageType, encode_text
 from mars_patcher.tileset import Tileset
 
+if TYPE_CHECKING:
+    from mars_patcher.auto_generated_types import MarsschemaTankincrements
+    from mars_patcher.rom import Rom
+
 MINOR_LOCS_TABLE_ADDR = ReservedConstants.MINOR_LOCS_TABLE_ADDR
 MINOR_LOCS_ARRAY_ADDR = ReservedConstants.MINOR_LOCS_ARRAY_ADDR
 MINOR_LOC_SIZE = 0x8
@@ -50,9 +58,9 @@ class ItemPatcher:
     def write_items(self) -> None:
         rom = self.rom
         custom_message_id = FIRST_CUSTOM_MESSAGE_ID
-        message_table_addrs: dict[Language, int] = {}
-        for lang in Language:
-            message_table_addrs[lang] = rom.read_ptr(MESSAGE_TABLE_LOOKUP_ADDR + lang.value * 4)
+        message_table_addrs = dict(
+            zip(Language, rom.read_ptr_table(MESSAGE_TABLE_LOOKUP_ADDR, len(Language)))
+        )
         # Handle minor locations
         minor_locs = self.settings.minor_locs
         MINOR_LOCS_ARRAY = rom.read_ptr(MINOR_LOCS_ARRAY_ADDR)
@@ -90,6 +98,9 @@ class ItemPatcher:
                 val = TANK_BG1_START + idx
                 with room.load_bg1() as bg1:
                     bg1.set_block_value(min_loc.block_x, min_loc.block_y, val)
+            # Write the room now, since a room can have more than one tank, and messages below
+            # reserve free space
+            flush(rom)
 
             # Write to minors array
             # Assembly has:
@@ -212,7 +223,18 @@ def set_required_metroid_count(rom: Rom, count: int) -> None:
     rom.write_8(REQUIRED_METROID_COUNT_ADDR, count)
 
 
-def set_tank_increments(rom: Rom, data: MarsschemaTankincrements) -> None:
-    rom.write_16(TANK_INC_ADDR, data["MissileTank"])
-    rom.write_16(TANK_INC_ADDR + 2, data["EnergyTank"])
-    rom.write_16(TANK_INC_ADDR + 4, data["PowerBombTank"])
+@dataclass(frozen=True, slots=True)
+class TankIncrements:
+    missile_tank: int
+    energy_tank: int
+    power_bomb_tank: int
+
+    @classmethod
+    def from_json(cls, data: MarsschemaTankincrements) -> TankIncrements:
+        return cls(data["MissileTank"], data["EnergyTank"], data["PowerBombTank"])
+
+
+def set_tank_increments(rom: Rom, increments: TankIncrements) -> None:
+    rom.write_16(TANK_INC_ADDR, increments.missile_tank)
+    rom.write_16(TANK_INC_ADDR + 2, increments.energy_tank)
+    rom.write_16(TANK_INC_ADDR + 4, increments.power_bomb_tank)
@@ -1,26 +1,100 @@
-from mars_patcher.rom import Rom
+from __future__ import annotations
+
+from dataclasses import dataclass
+from enum import Enum
+from typing import TYPE_CHECKING, cast
+
 from mars_patcher.room_entry import RoomEntry
 
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+
+    from mars_patcher.auto_generated_types import Areaidkey, Blocklayer, MarsschemaLeveledits
+    from mars_patcher.rom import Rom
+    from mars_patcher.room_entry import BlockLayer
+
+
+# Block X, block Y and new block values going right
+BlockRow = tuple[int, int, tuple[int, ...]]
+
+
+class LevelLayer(Enum):
+    BG1 = 1
+    BG2 = 2
+    CLIPDATA = 3
+
+
+LAYER_ENUMS = {
+    "BG1": LevelLayer.BG1,
+    "BG2": LevelLayer.BG2,
+    "Clipdata": LevelLayer.CLIPDATA,
+}
+
 
-def apply_level_edits(rom: Rom, edit_dict: dict) -> None:
+@dataclass(frozen=True, slots=True)
+class LayerEdits:
+    """Block changes to make to a single layer of a room."""
+
+    area: int
+    room: int
+    layer: LevelLayer
+    rows: tuple[BlockRow, ...]
+    """Runs of changes to consecutive blocks of a row, in the order they're made."""
+
+
+def _join_rows(changes: Sequence[tuple[int, int, int]]) -> tuple[BlockRow, ...]:
+    """
+    Joins changes to consecutive blocks of a row into runs. Only neighboring changes are
+    joined, so they're still set in order, and later changes take priority.
+    """
+    rows: list[tuple[int, int, list[int]]] = []
+    for x, y, value in changes:
+        if rows:
+            row_x, row_y, values = rows[-1]
+            if y == row_y and x == row_x + len(values):
+                values.append(value)
+                continue
+        rows.append((x, y, [value]))
+    return tuple((x, y, tuple(values)) for x, y, values in rows)
+
+
+def parse_level_edits(
+    data: dict[Areaidkey, dict[str, MarsschemaLeveledits]],
+) -> tuple[LayerEdits, ...]:
+    edits = []
     # Go through every area
-    for area, rooms in edit_dict.items():
+    for area, rooms in data.items():
         # Go through every room
         for room, layers in rooms.items():
-            r = RoomEntry(rom, int(area), int(room))
-
             # Go through every layer
-            for layer, changes in layers.items():
-                if layer == "BG1":
-                    load = r.load_bg1
-                elif layer == "BG2":
-                    load = r.load_bg2
-                elif layer == "Clipdata":
-                    load = r.load_clip
-                else:
+            for layer_name, changes in layers.items():
+                layer = LAYER_ENUMS.get(layer_name)
+                if layer is None:
                     raise ValueError("Unsupported Block Layer")
+                block_changes = [(c["X"], c["Y"], c["Value"]) for c in cast("Blocklayer", changes)]
+                edits.append(LayerEdits(int(area), int(room), layer, _join_rows(block_changes)))
+    return tuple(edits)
+
 
-                # Load layer, do every edit that's provided and write back.
-                with load() as layer:
-                    for change in changes:
-                        layer.set_block_value(change["X"], change["Y"], change["Value"])
+def apply_level_edits(rom: Rom, edits: Sequence[LayerEdits]) -> None:
+    for edit in edits:
+        r = RoomEntry(rom, edit.area, edit.room)
+        load: Callable[[], BlockLayer]
+        if edit.layer == LevelLayer.BG1:
+            load = r.load_bg1
+        elif edit.layer == LevelLayer.BG2:
+            load = r.load_bg2
+        else:
+            load = r.load_clip
+
+        # Load layer, do every edit that's provided and write back.
+        with load() as layer:
+            for x, y, values in edit.rows:
+                if len(values) == 1:
+                    layer.set_block_value(x, y, values[0])
+                elif x + len(values) <= layer.width:
+                    layer.set_row(x, y, values)
+                else:
+                    # Blocks past the end of the row go on to the next one
+                    for i, value in enumerate(values):
+                        layer.set_block_value(x + i, y, value)
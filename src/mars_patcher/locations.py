@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import json
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, ClassVar
+from typing import TYPE_CHECKING
 
 from frozendict import frozendict
 
@@ -29,7 +29,7 @@ from mars_patcher.constants.items import (
     MajorSource,
 )
 from mars_patcher.data import get_data_path
-from mars_patcher.text import Language
+from mars_patcher.text import LANG_ENUMS, Language
 
 if TYPE_CHECKING:
     from mars_patcher.auto_generated_types import Itemmessages, MarsschemaLocations
@@ -89,26 +89,16 @@ class MinorLocation(Location):
         self.item_messages = item_messages
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ItemMessages:
     item_messages: frozendict[Language, str]
     centered: bool
 
-    LANG_ENUMS: ClassVar[dict[str, Language]] = {
-        "JapaneseKanji": Language.JAPANESE_KANJI,
-        "JapaneseHiragana": Language.JAPANESE_HIRAGANA,
-        "English": Language.ENGLISH,
-        "German": Language.GERMAN,
-        "French": Language.FRENCH,
-        "Italian": Language.ITALIAN,
-        "Spanish": Language.SPANISH,
-    }
-
     @classmethod
     def from_json(cls, data: Itemmessages) -> ItemMessages:
         item_messages: dict[Language, str] = {}
         for lang_name, message in data[KEY_LANGUAGES].items():
-            lang = cls.LANG_ENUMS[lang_name]
+            lang = LANG_ENUMS[lang_name]
             item_messages[lang] = message
         centered = data.get(KEY_CENTERED, True)
         return cls(frozendict(item_messages), centered)
@@ -148,23 +138,19 @@ class LocationSettings:
 
         return LocationSettings(major_locs, minor_locs)
 
-    def set_assignments(self, data: MarsschemaLocations) -> None:
-        for maj_loc_entry in data[KEY_MAJOR_LOCS]:
-            # Get source and item
-            source = SOURCE_ENUMS[maj_loc_entry[KEY_SOURCE]]
-            item = ITEM_ENUMS[maj_loc_entry[KEY_ITEM]]
+    def set_assignments(self, assignments: LocationAssignments) -> None:
+        for maj_assignment in assignments.majors:
             # Find location with this source
-            maj_loc = next(m for m in self.major_locs if m.major_src == source)
-            maj_loc.new_item = item
-            if KEY_ITEM_MESSAGES in maj_loc_entry:
-                maj_loc.item_messages = ItemMessages.from_json(maj_loc_entry[KEY_ITEM_MESSAGES])
-
-        for min_loc_entry in data[KEY_MINOR_LOCS]:
-            # Get area, room, block X, block Y
-            area = min_loc_entry[KEY_AREA]
-            room = min_loc_entry[KEY_ROOM]
-            block_x = min_loc_entry[KEY_BLOCK_X]
-            block_y = min_loc_entry[KEY_BLOCK_Y]
+            maj_loc = next(m for m in self.major_locs if m.major_src == maj_assignment.source)
+            maj_loc.new_item = maj_assignment.item
+            if maj_assignment.item_messages is not None:
+                maj_loc.item_messages = maj_assignment.item_messages
+
+        for min_assignment in assignments.minors:
+            area = min_assignment.area
+            room = min_assignment.room
+            block_x = min_assignment.block_x
+            block_y = min_assignment.block_y
             # Find location with this source
             try:
                 min_loc = next(
@@ -180,9 +166,67 @@ class LocationSettings:
                     f"Invalid minor location: Area {area}, Room {room}, X {block_x}, Y {block_y}"
                 )
             # Set item and item sprite
-            item = ITEM_ENUMS[min_loc_entry[KEY_ITEM]]
-            min_loc.new_item = item
-            if KEY_ITEM_SPRITE in min_loc_entry:
-                min_loc.item_sprite = ITEM_SPRITE_ENUMS[min_loc_entry[KEY_ITEM_SPRITE]]
-            if KEY_ITEM_MESSAGES in min_loc_entry:
-                min_loc.item_messages = ItemMessages.from_json(min_loc_entry[KEY_ITEM_MESSAGES])
+            min_loc.new_item = min_assignment.item
+            if min_assignment.item_sprite is not None:
+                min_loc.item_sprite = min_assignment.item_sprite
+            if min_assignment.item_messages is not None:
+                min_loc.item_messages = min_assignment.item_messages
+
+
+@dataclass(frozen=True, slots=True)
+class MajorAssignment:
+    source: MajorSource
+    item: ItemType
+    item_messages: ItemMessages | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class MinorAssignment:
+    area: int
+    room: int
+    block_x: int
+    block_y: int
+    item: ItemType
+    item_sprite: ItemSprite | None = None
+    item_messages: ItemMessages | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class LocationAssignments:
+    """The items assigned to major and minor locations."""
+
+    majors: tuple[MajorAssignment, ...]
+    minors: tuple[MinorAssignment, ...]
+
+    @classmethod
+    def from_json(cls, data: MarsschemaLocations) -> LocationAssignments:
+        majors = []
+        for maj_entry in data[KEY_MAJOR_LOCS]:
+            item_messages = None
+            if KEY_ITEM_MESSAGES in maj_entry:
+                item_messages = ItemMessages.from_json(maj_entry[KEY_ITEM_MESSAGES])
+            source = SOURCE_ENUMS[maj_entry[KEY_SOURCE]]
+            item = ITEM_ENUMS[maj_entry[KEY_ITEM]]
+            majors.append(MajorAssignment(source, item, item_messages))
+
+        minors = []
+        for min_entry in data[KEY_MINOR_LOCS]:
+            item_sprite = None
+            if KEY_ITEM_SPRITE in min_entry:
+                item_sprite = ITEM_SPRITE_ENUMS[min_entry[KEY_ITEM_SPRITE]]
+            item_messages = None
+            if KEY_ITEM_MESSAGES in min_entry:
+                item_messages = ItemMessages.from_json(min_entry[KEY_ITEM_MESSAGES])
+            minors.append(
+                MinorAssignment(
+                    min_entry[KEY_AREA],
+                    min_entry[KEY_ROOM],
+                    min_entry[KEY_BLOCK_X],
+                    min_entry[KEY_BLOCK_Y],
+                    ITEM_ENUMS[min_entry[KEY_ITEM]],
+                    item_sprite,
+                    item_messages,
+                )
+            )
+
+        return cls(tuple(majors), tuple(minors))
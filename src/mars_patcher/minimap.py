@@ -1,26 +1,49 @@
 from __future__ import annotations
 
+from array import array
+from dataclasses import dataclass
 from typing import TYPE_CHECKING
+from weakref import WeakKeyDictionary
 
-from mars_patcher.compress import comp_lz77, decomp_lz77
+from mars_patcher.asset_cache import load_asset
+from mars_patcher.compression_cache import LZ77, compress_cached, compress_to_fit
 from mars_patcher.constants.game_data import minimap_ptrs
+from mars_patcher.rom import view_u16_buffer
+from mars_patcher.tracing import span
 
 if TYPE_CHECKING:
+    from collections.abc import Sequence
     from types import TracebackType
 
+    from mars_patcher.auto_generated_types import MarsschemaMinimapeditsItem, Minimapidkey
     from mars_patcher.rom import Rom
 
 MINIMAP_DIM = 32
 
+# Minimaps shared by load_minimap(), by ROM and data address. A ROM is only in here while
+# its writes are deferred, see flush.deferred_writes()
+_loaded_minimaps: WeakKeyDictionary[Rom, dict[int, Minimap]] = WeakKeyDictionary()
+
 
 class Minimap:
-    """Class for reading/writing minimap data and setting tiles."""
+    """
+    Class for reading/writing minimap data and setting tiles.
+
+    Tile values are exposed as a flat array of 16-bit values through `tiles`, which views
+    `tile_data` directly. Like the ROM's views, it's only supported on little endian hosts.
+    """
 
     def __init__(self, rom: Rom, id: int):
-        self.rom = rom
-        self.pointer = minimap_ptrs(rom) + (id * 4)
-        addr = rom.read_ptr(self.pointer)
-        self.tile_data, self.comp_len = decomp_lz77(rom.data, addr)
+        with span("Minimap.load", "minimap", id=id):
+            self.rom = rom
+            self.id = id
+            self.pointer = minimap_ptrs(rom) + (id * 4)
+            # Every pointer to the data, which are all repointed together
+            self.pointers = [self.pointer]
+            self.addr = addr = rom.read_ptr(self.pointer)
+            self.tile_data, self.comp_len = load_asset(rom, addr, LZ77)
+            self.tiles = view_u16_buffer(self.tile_data)
+            self.dirty = False
 
     def __enter__(self) -> Minimap:
         # We don't need to do anything
@@ -32,13 +55,15 @@ class Minimap:
         exc_val: BaseException | None,
         exc_tb: TracebackType | None,
     ) -> None:
-        self.write()
+        # Shared minimaps are written when the deferred writes are flushed
+        if _loaded_minimaps.get(self.rom, {}).get(self.addr) is not self:
+            self.write()
 
     def get_tile_value(self, x: int, y: int) -> tuple[int, int, bool, bool]:
-        idx = (y * MINIMAP_DIM + x) * 2
-        if idx >= len(self.tile_data):
+        idx = y * MINIMAP_DIM + x
+        if idx >= len(self.tiles):
             raise IndexError(f"Tile coordinate ({x}, {y}) is not within minimap")
-        value = self.tile_data[idx] | self.tile_data[idx + 1] << 8
+        value = self.tiles[idx]
         tile = value & (0x3FF)
         palette = value >> 12
         h_flip = value & 0x400 != 0
@@ -48,36 +73,146 @@ class Minimap:
     def set_tile_value(
         self, x: int, y: int, tile: int, palette: int, h_flip: bool = False, v_flip: bool = False
     ) -> None:
-        idx = (y * MINIMAP_DIM + x) * 2
-        if idx >= len(self.tile_data):
+        idx = y * MINIMAP_DIM + x
+        if idx >= len(self.tiles):
             raise IndexError(f"Tile coordinate ({x}, {y}) is not within minimap")
         value = tile | (palette << 12)
         if h_flip:
             value |= 0x400
         if v_flip:
             value |= 0x800
-        self.tile_data[idx] = value & 0xFF
-        self.tile_data[idx + 1] = value >> 8
+        if self.tiles[idx] != value:
+            self.tiles[idx] = value
+            self.dirty = True
+
+    def translate(self, table: Sequence[int]) -> bool:
+        """
+        Replaces every tile value with its entry in a table of 0x10000 values, in a single
+        pass. Returns True if any tile value changed.
+        """
+        new_tiles = array("H", map(table.__getitem__, self.tiles))
+        if new_tiles.tobytes() == self.tile_data:
+            return False
+        self.tiles[:] = memoryview(new_tiles)
+        self.dirty = True
+        return True
 
     def write(self) -> None:
-        comp_data = comp_lz77(self.tile_data)
-        comp_len = len(comp_data)
-        if comp_len > self.comp_len:
-            # Repoint data
-            addr = self.rom.reserve_free_space(comp_len)
-            self.rom.write_ptr(self.pointer, addr)
-        else:
-            addr = self.rom.read_ptr(self.pointer)
-        self.rom.write_bytes(addr, comp_data)
-        self.comp_len = comp_len
-
-
-def apply_minimap_edits(rom: Rom, edit_dict: dict) -> None:
-    # Go through every minimap
-    for map_id, changes in edit_dict.items():
-        with Minimap(rom, int(map_id)) as minimap:
-            for change in changes:
-                minimap.set_tile_value(
+        """Compresses and writes the tile data, even if no tiles changed."""
+        self.write_compressed(compress_cached(LZ77, self.tile_data))
+
+    def write_compressed(self, comp_data: bytes | bytearray) -> None:
+        """
+        Writes tile data that was already compressed. If it grew, it's compressed again with
+        a slower encoder, and only repointed if it still doesn't fit.
+        """
+        with span("Minimap.write", "minimap", id=self.id):
+            comp_data = compress_to_fit(self.rom, LZ77, self.tile_data, comp_data, self.comp_len)
+            comp_len = len(comp_data)
+            addr = self.addr
+            if comp_len > self.comp_len:
+                # Repoint data
+                addr = self.addr = self.rom.reserve_free_space(comp_len)
+                for ptr in self.pointers:
+                    self.rom.write_ptr(ptr, addr)
+            self.rom.write_bytes(addr, comp_data)
+            self.comp_len = comp_len
+            self.dirty = False
+
+
+def load_minimap(rom: Rom, id: int) -> Minimap:
+    """
+    Returns the minimap with the provided ID. While the ROM's writes are deferred (see
+    flush.deferred_writes()), the minimap is shared by every caller patching the ROM, so
+    it's only decompressed once, and it's written when the deferred writes are flushed
+    instead of when leaving a `with` block. Minimaps whose pointers point to the same data
+    get the same minimap, and writing it repoints all of them. Otherwise, a new minimap is
+    returned, which is written when leaving a `with` block.
+    """
+    minimaps = _loaded_minimaps.get(rom)
+    if minimaps is None:
+        return Minimap(rom, id)
+    ptr = minimap_ptrs(rom) + (id * 4)
+    addr = rom.read_ptr(ptr)
+    minimap = minimaps.get(addr)
+    if minimap is None:
+        minimap = minimaps[addr] = Minimap(rom, id)
+    elif ptr not in minimap.pointers:
+        minimap.pointers.append(ptr)
+    return minimap
+
+
+def start_sharing_minimaps(rom: Rom) -> bool:
+    """
+    Makes load_minimap() share minimaps of the ROM until stop_sharing_minimaps() is called.
+    Returns False if they were already shared.
+    """
+    if rom in _loaded_minimaps:
+        return False
+    _loaded_minimaps[rom] = {}
+    return True
+
+
+def stop_sharing_minimaps(rom: Rom) -> None:
+    """Stops sharing minimaps of the ROM. Shared minimaps that weren't written are discarded."""
+    _loaded_minimaps.pop(rom, None)
+
+
+def pending_minimaps(rom: Rom) -> dict[int, Minimap]:
+    """
+    Returns the shared minimaps of the ROM that changed but aren't written yet, by the first
+    ID they were loaded with.
+    """
+    minimaps = _loaded_minimaps.get(rom, {}).values()
+    return {minimap.id: minimap for minimap in minimaps if minimap.dirty}
+
+
+def pop_loaded_minimaps(rom: Rom) -> list[Minimap]:
+    """
+    Returns the shared minimaps of the ROM in load order, and forgets them. Minimaps loaded
+    later are decompressed again from the ROM.
+    """
+    minimaps = _loaded_minimaps.get(rom)
+    if minimaps is None:
+        return []
+    loaded = list(minimaps.values())
+    minimaps.clear()
+    return loaded
+
+
+def write_minimaps(rom: Rom) -> None:
+    """Writes every shared minimap of the ROM that changed, and forgets them."""
+    for minimap in pop_loaded_minimaps(rom):
+        if minimap.dirty:
+            minimap.write()
+
+
+@dataclass(frozen=True, slots=True)
+class MinimapTileEdit:
+    x: int
+    y: int
+    tile: int
+    palette: int
+    h_flip: bool = False
+    v_flip: bool = False
+
+
+@dataclass(frozen=True, slots=True)
+class MinimapEdits:
+    """Tile changes to make to a single minimap."""
+
+    id: int
+    tiles: tuple[MinimapTileEdit, ...]
+
+
+def parse_minimap_edits(
+    data: dict[Minimapidkey, list[MarsschemaMinimapeditsItem]],
+) -> tuple[MinimapEdits, ...]:
+    return tuple(
+        MinimapEdits(
+            int(map_id),
+            tuple(
+                MinimapTileEdit(
                     change["X"],
                     change["Y"],
                     change["Tile"],
@@ -85,3 +220,18 @@ def apply_minimap_edits(rom: Rom, edit_dict: dict) -> None:
                     change.get("HFlip", False),
                     change.get("VFlip", False),
                 )
+                for change in changes
+            ),
+        )
+        for map_id, changes in data.items()
+    )
+
+
+def apply_minimap_edits(rom: Rom, edits: Sequence[MinimapEdits]) -> None:
+    # Go through every minimap
+    for edit in edits:
+        with load_minimap(rom, edit.id) as minimap:
+            for tile in edit.tiles:
+                minimap.set_tile_value(
+                    tile.x, tile.y, tile.tile, tile.palette, tile.h_flip, tile.v_flip
+                )
@@ -1,6 +1,7 @@
 import mars_patcher.constants.game_data as gd
 from mars_patcher.constants.reserved_space import ReservedConstants
 from mars_patcher.data import get_data_path
+from mars_patcher.option_patches import apply_option_patch
 from mars_patcher.patching import BpsDecoder, IpsDecoder
 from mars_patcher.rom import Rom
 
@@ -33,27 +34,23 @@ def apply_base_patch(rom: Rom) -> None:
 
 
 def disable_demos(rom: Rom) -> None:
-    # TODO: Move to patch
-    # b 0x8087460
-    rom.write_16(0x87436, 0xE013)
+    apply_option_patch(rom, "disable_demos")
 
 
 def skip_door_transitions(rom: Rom) -> None:
-    # TODO: Move to patch
-    rom.write_32(0x69500, 0x3000BDE)
-    rom.write_8(0x694E2, 0xC)
+    apply_option_patch(rom, "skip_door_transitions")
 
 
 def stereo_default(rom: Rom) -> None:
-    apply_patch_in_data_path(rom, "stereo_default.ips")
+    apply_option_patch(rom, "stereo_default")
 
 
 def disable_sounds(rom: Rom, start: int, end: int, exclude: set[int] = set()) -> None:
-    sound_data_addr = gd.sound_data_entries(rom)
-    for idx in range(start, end):
+    sound_data_addr = gd.sound_data_entries(rom) + start * 8
+    header_addrs = rom.read_ptr_table(sound_data_addr, end - start, 8)
+    for idx, header_addr in enumerate(header_addrs, start):
         if idx not in exclude:
-            addr = sound_data_addr + idx * 8
-            rom.write_8(rom.read_ptr(addr), 0)
+            rom.write_8(header_addr, 0)
 
 
 def disable_music(rom: Rom) -> None:
@@ -76,15 +73,15 @@ def change_missile_limit(rom: Rom, limit: int) -> None:
 
 
 def apply_unexplored_map(rom: Rom) -> None:
-    apply_patch_in_asm_path(rom, "unhidden_map.ips")
+    apply_option_patch(rom, "unexplored_map")
 
 
 def apply_pbs_without_bombs(rom: Rom) -> None:
-    apply_patch_in_asm_path(rom, "bombless_pbs.ips")
+    apply_option_patch(rom, "pbs_without_bombs")
 
 
 def apply_anti_softlock_edits(rom: Rom) -> None:
-    apply_patch_in_asm_path(rom, "anti_softlock.ips")
+    apply_option_patch(rom, "anti_softlock_edits")
 
 
 def apply_reveal_hidden_tiles(rom: Rom) -> None:
@@ -1,14 +1,19 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from enum import Enum
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, ClassVar
+
+from frozendict import frozendict
 
 from mars_patcher.constants.game_data import navigation_text_ptrs
 from mars_patcher.constants.reserved_space import ReservedConstants
 from mars_patcher.rom import Rom
-from mars_patcher.text import Language, MessageType, encode_text
+from mars_patcher.text import LANG_ENUMS, Language, MessageType, encode_text
 
 if TYPE_CHECKING:
+    from collections.abc import Mapping
+
     from mars_patcher.auto_generated_types import Hintlocks, MarsschemaNavstationlocksKey
     from mars_patcher.rom import Rom
 
@@ -48,18 +53,9 @@ class NavStationLockType(Enum):
     RED = 0x04
 
 
+@dataclass(frozen=True, slots=True)
 class NavigationText:
-    LANG_ENUMS = {
-        "JapaneseKanji": Language.JAPANESE_KANJI,
-        "JapaneseHiragana": Language.JAPANESE_HIRAGANA,
-        "English": Language.ENGLISH,
-        "German": Language.GERMAN,
-        "French": Language.FRENCH,
-        "Italian": Language.ITALIAN,
-        "Spanish": Language.SPANISH,
-    }
-
-    NAV_ROOM_ENUMS: dict[MarsschemaNavstationlocksKey, NavRoom] = {
+    NAV_ROOM_ENUMS: ClassVar[dict[MarsschemaNavstationlocksKey, NavRoom]] = {
         "MainDeckWest": NavRoom.MAIN_DECK_WEST,
         "MainDeckEast": NavRoom.MAIN_DECK_EAST,
         "OperationsDeck": NavRoom.OPERATIONS_DECK,
@@ -83,32 +79,39 @@ class NavigationText:
         "ConfirmText": ShipText.CONFIRM_TEXT,
     }
 
-    def __init__(self, navigation_text: dict[Language, dict[str, dict[Enum, str]]]):
-        self.navigation_text = navigation_text
+    navigation_text: frozendict[Language, frozendict[str, frozendict[Enum, str]]]
 
     @classmethod
     def from_json(cls, data: dict) -> NavigationText:
-        navigation_text: dict[Language, dict[str, dict[Enum, str]]] = {}
-        for lang, lang_text in data.items():
-            lang = cls.LANG_ENUMS[lang]
-            navigation_text[lang] = {
-                cls.NAV_TERMINALS_KEY: {
-                    cls.NAV_ROOM_ENUMS[k]: v for k, v in lang_text[cls.NAV_TERMINALS_KEY].items()
-                },
-                cls.SHIP_TEXT_KEY: {
-                    # Make sure initial text string starts with [GAME_START]
-                    cls.INFO_TEXT_ENUMS[k]: cls.GAME_START_CHAR + v
-                    if k == cls.INITIAL_TEXT_KEY and not v.startswith(cls.GAME_START_CHAR)
-                    else v
-                    for k, v in lang_text[cls.SHIP_TEXT_KEY].items()
-                },
-            }
-        return cls(navigation_text)
+        navigation_text: dict[Language, frozendict[str, frozendict[Enum, str]]] = {}
+        for lang_name, lang_text in data.items():
+            lang = LANG_ENUMS[lang_name]
+            navigation_text[lang] = frozendict(
+                {
+                    cls.NAV_TERMINALS_KEY: frozendict(
+                        {
+                            cls.NAV_ROOM_ENUMS[k]: v
+                            for k, v in lang_text[cls.NAV_TERMINALS_KEY].items()
+                        }
+                    ),
+                    cls.SHIP_TEXT_KEY: frozendict(
+                        {
+                            # Make sure initial text string starts with [GAME_START]
+                            cls.INFO_TEXT_ENUMS[k]: cls.GAME_START_CHAR + v
+                            if k == cls.INITIAL_TEXT_KEY and not v.startswith(cls.GAME_START_CHAR)
+                            else v
+                            for k, v in lang_text[cls.SHIP_TEXT_KEY].items()
+                        }
+                    ),
+                }
+            )
+        return cls(frozendict(navigation_text))
 
     def write(self, rom: Rom) -> None:
         text_addr = HINT_TEXT_ADDR
+        lang_ptrs = rom.read_ptr_table(navigation_text_ptrs(rom), len(Language))
         for lang, lang_texts in self.navigation_text.items():
-            base_text_address = rom.read_ptr(navigation_text_ptrs(rom) + lang.value * 4)
+            base_text_address = lang_ptrs[lang.value]
 
             # Info Text
             for info_place, text in lang_texts["ShipText"].items():
@@ -131,16 +134,19 @@ class NavigationText:
                     raise ValueError("Attempted to write too much text to ROM.")
 
     @classmethod
-    def apply_hint_security(
-        cls, rom: Rom, locks: dict[MarsschemaNavstationlocksKey, Hintlocks]
-    ) -> None:
+    def parse_hint_security(
+        cls, data: dict[MarsschemaNavstationlocksKey, Hintlocks]
+    ) -> frozendict[NavRoom, NavStationLockType]:
+        return frozendict({cls.NAV_ROOM_ENUMS[k]: NavStationLockType[v] for k, v in data.items()})
+
+    @classmethod
+    def apply_hint_security(cls, rom: Rom, locks: Mapping[NavRoom, NavStationLockType]) -> None:
         """
         Applies an optional security level requirement to use Navigation Stations
         Defaults to OPEN if not provided in patch data JSON
         """
-        default_lock_name = "OPEN"
-        for location, offset in NavigationText.NAV_ROOM_ENUMS.items():
+        for nav_room in cls.NAV_ROOM_ENUMS.values():
             rom.write_8(
-                ReservedConstants.HINT_SECURITY_LEVELS_ADDR + offset.value,
-                NavStationLockType[locks.get(location, default_lock_name)].value,
+                ReservedConstants.HINT_SECURITY_LEVELS_ADDR + nav_room.value,
+                locks.get(nav_room, NavStationLockType.OPEN).value,
             )
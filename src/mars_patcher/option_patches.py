@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+from functools import cache
+from typing import TYPE_CHECKING
+
+from mars_patcher.data import get_data_path
+from mars_patcher.patching import IpsDecoder
+from mars_patcher.rom import SIZE_8MB
+
+if TYPE_CHECKING:
+    from mars_patcher.rom import Rom
+
+# (Address, data) records of an option, sorted by address and not overlapping
+PatchRecords = tuple[tuple[int, bytes], ...]
+# Option: (Hash of the option's source, records)
+BundledOptions = dict[str, tuple[bytes, PatchRecords]]
+
+# The bundle is generated from the asm patches, so it lives next to them
+BUNDLE_SUBFOLDER = "asm"
+BUNDLE_NAME = "option_patches.bin"
+BUNDLE_MAGIC = b"MOPT"
+BUNDLE_VERSION = 3
+# Magic, version, option count
+_BUNDLE_HEADER = struct.Struct("<4sHH")
+# Name length, record count, source hash
+_BUNDLE_OPTION = struct.Struct("<BI16s")
+# Address, size
+_BUNDLE_RECORD = struct.Struct("<II")
+
+# Options applied from IPS files: Option: (Subfolder, file name)
+IPS_OPTIONS = {
+    "stereo_default": ("", "stereo_default.ips"),
+    "unexplored_map": ("asm", "unhidden_map.ips"),
+    "pbs_without_bombs": ("asm", "bombless_pbs.ips"),
+    "anti_softlock_edits": ("asm", "anti_softlock.ips"),
+}
+
+# Options without a patch file: Option: Records
+WRITE_OPTIONS: dict[str, PatchRecords] = {
+    "disable_demos": (
+        # b 0x8087460
+        (0x87436, bytes.fromhex("13E0")),
+    ),
+    "skip_door_transitions": (
+        (0x694E2, bytes.fromhex("0C")),
+        (0x69500, (0x3000BDE).to_bytes(4, "little")),
+    ),
+}
+
+
+def _patches_dir(rom: Rom) -> str:
+    return f"{rom.game.name}_{rom.region.name}".lower()
+
+
+def merge_records(records: list[tuple[int, bytes]]) -> PatchRecords:
+    """
+    Flattens records that are applied in order into sorted records that don't overlap,
+    with later records taking priority like when patching. Adjacent records are joined.
+    """
+    written: dict[int, int] = {}
+    for addr, data in records:
+        for i, val in enumerate(data, addr):
+            written[i] = val
+    merged: list[tuple[int, bytes]] = []
+    start = -1
+    run = bytearray()
+    for addr in sorted(written):
+        if addr != start + len(run):
+            if run:
+                merged.append((start, bytes(run)))
+            start = addr
+            run = bytearray()
+        run.append(written[addr])
+    if run:
+        merged.append((start, bytes(run)))
+    return tuple(merged)
+
+
+def read_option_source(patches_dir: str, option: str) -> PatchRecords:
+    """Returns the records of an option, read from its IPS file or its fixed writes."""
+    if option in WRITE_OPTIONS:
+        return merge_records(list(WRITE_OPTIONS[option]))
+    return merge_records(IpsDecoder().read_records(_read_ips_option(patches_dir, option)))
+
+
+def hash_option_source(patches_dir: str, option: str) -> bytes:
+    """
+    Returns a hash of an option's IPS file, which tells if the records in a bundle are still
+    up to date.
+    """
+    return hashlib.blake2b(_read_ips_option(patches_dir, option), digest_size=16).digest()
+
+
+def _read_ips_option(patches_dir: str, option: str) -> bytes:
+    subfolder, filename = IPS_OPTIONS[option]
+    with open(get_data_path("patches", patches_dir, subfolder, filename), "rb") as f:
+        return f.read()
+
+
+def find_conflicts(options: dict[str, PatchRecords]) -> list[str]:
+    """
+    Returns descriptions of the bytes that two options write with different values.
+    Options can be combined in any order, so these bytes would depend on the order.
+    """
+    # Address: (Option, value)
+    owners: dict[int, tuple[str, int]] = {}
+    conflicts: list[str] = []
+    for option, records in options.items():
+        for addr, data in records:
+            if addr + len(data) > SIZE_8MB:
+                conflicts.append(f"{option} writes past the end of the ROM at {addr:X}")
+            for i, val in enumerate(data, addr):
+                owner = owners.setdefault(i, (option, val))
+                if owner[1] != val:
+                    conflicts.append(f"{owner[0]} and {option} both write to {i:X}")
+    return conflicts
+
+
+def build_option_bundle(patches_dir: str) -> dict[str, PatchRecords]:
+    """
+    Compiles every IPS option with an available patch file into a bundle in the data folder,
+    and returns the compiled options. Options whose IPS file is missing are left out, and
+    are read from the file when patching if it's added later. Options with fixed writes are
+    never bundled, since they can't go stale. The bundle is loaded without reading the IPS
+    files, so it needs to be built again whenever one changes, see find_stale_options().
+
+    Raises:
+        ValueError: If two options write different values to the same byte.
+    """
+    options: BundledOptions = {}
+    for option in IPS_OPTIONS:
+        try:
+            source_hash = hash_option_source(patches_dir, option)
+            options[option] = (source_hash, read_option_source(patches_dir, option))
+        except FileNotFoundError:
+            continue
+    records = {option: records for option, (_, records) in options.items()}
+    # Fixed writes aren't bundled, but can still conflict with the IPS options
+    all_records = dict(records)
+    for option, writes in WRITE_OPTIONS.items():
+        all_records[option] = merge_records(list(writes))
+    conflicts = find_conflicts(all_records)
+    if conflicts:
+        raise ValueError("Option patches conflict:\n" + "\n".join(conflicts))
+    path = get_data_path("patches", patches_dir, BUNDLE_SUBFOLDER, BUNDLE_NAME)
+    with open(path, "wb") as f:
+        f.write(encode_option_bundle(options))
+    return records
+
+
+def find_stale_options(patches_dir: str) -> list[str]:
+    """
+    Returns descriptions of the IPS options that the bundle doesn't have the current records
+    of, because their patch file changed or was added since it was built.
+    """
+    bundled = _read_bundle(patches_dir)
+    stale: list[str] = []
+    for option in IPS_OPTIONS:
+        try:
+            source_hash = hash_option_source(patches_dir, option)
+        except FileNotFoundError:
+            # The bundle has the only copy of the option, if any
+            continue
+        if option not in bundled:
+            stale.append(f"{option} is not in the bundle")
+        elif bundled[option][0] != source_hash:
+            stale.append(f"{option} changed since the bundle was built")
+    return stale
+
+
+def encode_option_bundle(options: BundledOptions) -> bytes:
+    out = bytearray(_BUNDLE_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(options)))
+    for option, (source_hash, records) in options.items():
+        name = option.encode("ascii")
+        out += _BUNDLE_OPTION.pack(len(name), len(records), source_hash)
+        out += name
+        out += _encode_records(records)
+    return bytes(out)
+
+
+def _encode_records(records: PatchRecords) -> bytes:
+    out = bytearray()
+    for addr, data in records:
+        out += _BUNDLE_RECORD.pack(addr, len(data))
+        out += data
+    return bytes(out)
+
+
+def decode_option_bundle(bundle: bytes) -> BundledOptions:
+    """
+    Returns the options in a bundle.
+
+    Raises:
+        ValueError: If the bundle is not valid or has a different version.
+    """
+    try:
+        magic, version, count = _BUNDLE_HEADER.unpack_from(bundle, 0)
+        if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+            raise ValueError("Not a supported option patch bundle")
+        options: BundledOptions = {}
+        idx = _BUNDLE_HEADER.size
+        for _ in range(count):
+            name_len, record_count, source_hash = _BUNDLE_OPTION.unpack_from(bundle, idx)
+            idx += _BUNDLE_OPTION.size
+            name = bundle[idx : idx + name_len].decode("ascii")
+            idx += name_len
+            records = []
+            for _ in range(record_count):
+                addr, size = _BUNDLE_RECORD.unpack_from(bundle, idx)
+                idx += _BUNDLE_RECORD.size
+                if idx + size > len(bundle):
+                    raise ValueError("Option patch bundle is cut off")
+                if addr + size > SIZE_8MB:
+                    raise ValueError(f"{name} writes past the end of the ROM at {addr:X}")
+                records.append((addr, bundle[idx : idx + size]))
+                idx += size
+            options[name] = (source_hash, tuple(records))
+    except struct.error as e:
+        raise ValueError("Option patch bundle is cut off") from e
+    return options
+
+
+def _read_bundle(patches_dir: str) -> BundledOptions:
+    path = get_data_path("patches", patches_dir, BUNDLE_SUBFOLDER, BUNDLE_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "rb") as f:
+        bundle = f.read()
+    try:
+        return decode_option_bundle(bundle)
+    except ValueError:
+        # Options are read from their sources until an older or damaged bundle is rebuilt
+        return {}
+
+
+@cache
+def _load_bundle(patches_dir: str) -> BundledOptions:
+    return _read_bundle(patches_dir)
+
+
+@cache
+def get_option_records(patches_dir: str, option: str) -> PatchRecords:
+    """
+    Returns the records of an option, from the bundle if it has them, or else from the
+    option's source. IPS files of bundled options are not read, so the bundle is trusted
+    to be up to date. Either way, the records are only loaded once per process.
+    """
+    bundled = _load_bundle(patches_dir).get(option)
+    if bundled is not None:
+        return bundled[1]
+    return read_option_source(patches_dir, option)
+
+
+def apply_option_patch(rom: Rom, option: str) -> None:
+    for addr, data in get_option_records(_patches_dir(rom), option):
+        rom.write_bytes(addr, data)
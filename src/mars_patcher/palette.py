@@ -1,15 +1,16 @@
 import math
+import struct
 
 from mars_patcher.color_spaces import RgbBitSize, RgbColor
 from mars_patcher.rom import Rom
+from mars_patcher.tracing import traced
 
 
 class Palette:
     def __init__(self, rows: int, rom: Rom, addr: int):
         assert rows >= 1
         self.colors: list[RgbColor] = []
-        for i in range(rows * 16):
-            rgb = rom.read_16(addr + i * 2)
+        for rgb in rom.read_u16_array(addr, rows * 16):
             color = RgbColor.from_rgb(rgb, RgbBitSize.Rgb5)
             self.colors.append(color)
 
@@ -20,17 +21,12 @@ class Palette:
         return len(self.colors) // 16
 
     def byte_data(self) -> bytes:
-        arr = bytearray()
-        for color in self.colors:
-            val = color.rgb_15()
-            arr.append(val & 0xFF)
-            arr.append(val >> 8)
-        return bytes(arr)
+        return struct.pack(f"<{len(self.colors)}H", *(c.rgb_15() for c in self.colors))
 
     def write(self, rom: Rom, addr: int) -> None:
-        data = self.byte_data()
-        rom.write_bytes(addr, data)
+        rom.write_u16_array(addr, [color.rgb_15() for color in self.colors])
 
+    @traced("Palette.shift_hue_hsv", "palette")
     def shift_hue_hsv(self, shift: int, excluded_rows: set[int]) -> None:
         """
         Shifts hue by the provided amount, measured in degrees.
@@ -59,6 +55,7 @@ class Palette:
                 rgb.blue = min(int(rgb.blue * luma_ratio), 255)
                 self.colors[offset + i] = rgb
 
+    @traced("Palette.shift_hue_oklab", "palette")
     def shift_hue_oklab(self, shift: int, excluded_rows: set[int]) -> None:
         """
         Shifts hue by the provided amount, measured in degrees.
@@ -1,13 +1,16 @@
-import json
-from typing import Callable
+from __future__ import annotations
 
-from jsonschema import validate
+import inspect
+import json
+import time
+from contextlib import ExitStack, nullcontext
+from functools import cache
+from typing import TYPE_CHECKING, Any, Callable, NamedTuple
 
-from mars_patcher.auto_generated_types import MarsSchema
-from mars_patcher.connections import Connections
-from mars_patcher.credits import write_credits
+from mars_patcher.asset_cache import open_asset_pack
 from mars_patcher.data import get_data_path
 from mars_patcher.door_locks import remove_door_colors_on_minimap, set_door_locks
+from mars_patcher.flush import deferred_writes, flush
 from mars_patcher.item_patcher import ItemPatcher, set_required_metroid_count, set_tank_increments
 from mars_patcher.level_edits import apply_level_edits
 from mars_patcher.locations import LocationSettings
@@ -25,12 +28,23 @@ from mars_patcher.misc_patches import (
     skip_door_transitions,
     stereo_default,
 )
-from mars_patcher.navigation_text import NavigationText
-from mars_patcher.random_palettes import PaletteRandomizer, PaletteSettings
 from mars_patcher.rom import Rom
 from mars_patcher.room_names import write_room_names
+from mars_patcher.settings import PatchSettings
 from mars_patcher.starting import set_starting_items, set_starting_location
 from mars_patcher.text import write_seed_hash
+from mars_patcher.tracing import span
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable
+    from concurrent.futures import Executor
+
+    from jsonschema.protocols import Validator
+
+    from mars_patcher.auto_generated_types import MarsSchema
+    from mars_patcher.connections import Connections
+    from mars_patcher.profiling import PatchProfiler
+    from mars_patcher.tracing import Tracer
 
 
 def validate_patch_data(patch_data: dict) -> None:
@@ -40,155 +54,348 @@ def validate_patch_data(patch_data: dict) -> None:
     Raises:
         ValidationError: If the patch data does not satisfy the schema.
     """
+    from jsonschema.exceptions import best_match
+
+    # Same as jsonschema.validate(), but without rebuilding the validator every call
+    error = best_match(_get_validator().iter_errors(patch_data))
+    if error is not None:
+        raise error
+
+
+@cache
+def _get_validator() -> Validator:
+    """Loads the schema and builds a validator for it. Only done once per process."""
+    from jsonschema.validators import validator_for
+
     with open(get_data_path("schema.json")) as f:
-        schema = json.load(f)
-    validate(patch_data, schema)
+        schema: dict[str, Any] = json.load(f)
+    validator_cls = validator_for(schema)
+    validator_cls.check_schema(schema)
+    return validator_cls(schema)
 
 
-def patch(
-    input_path: str,
-    output_path: str,
-    patch_data: MarsSchema,
-    status_update: Callable[[str, float], None],
-) -> None:
+class PatchStage(NamedTuple):
+    """A single step of the patching process."""
+
+    message: str
+    """A message describing what the stage does, used for status updates."""
+    apply: Callable[[Rom], None]
+    """A function that applies the stage to a ROM."""
+
+
+def get_patch_stages(settings: PatchSettings) -> list[PatchStage]:
     """
-    Creates a new randomized Fusion game, based off of an input path, an output path,
-    a dictionary defining how the game should be randomized, and a status update function.
+    Returns the stages needed to patch a ROM with the provided settings, in the order
+    they need to be applied. Apply them inside flush.deferred_writes() like patch() does,
+    so loaded room layers and minimaps are shared within each stage, and written when the
+    stage ends; otherwise each stage writes its own as it goes.
 
     Args:
-        input_path: The path to an unmodified Metroid Fusion (U) ROM.
-        output_path: The path where the randomized Fusion ROM should be saved to.
-        patch_data: A dictionary defining how the game should be randomized.
-            This function assumes that it satisfies the needed schema. To validate it, use
-            validate_patch_data().
-        status_update: A function taking in a message (str) and a progress value (float).
+        settings: The parsed patch data. To parse it, use PatchSettings.from_json().
     """
+    # Modules for optional stages are imported when the stage is needed, to keep startup fast
+    stages: list[PatchStage] = []
 
-    # Load input rom
-    rom = Rom(input_path)
+    def add_stage(message: str) -> Callable[[Callable[[Rom], None]], Callable[[Rom], None]]:
+        def decorator(func: Callable[[Rom], None]) -> Callable[[Rom], None]:
+            def apply(rom: Rom) -> None:
+                func(rom)
+                # Write the stage's rooms and minimaps before later stages reserve free space
+                flush(rom)
+
+            stages.append(PatchStage(message, apply))
+            return func
+
+        return decorator
 
     # Apply base asm patch first
-    apply_base_patch(rom)
+    @add_stage("Applying base patch...")
+    def _base_patch(rom: Rom) -> None:
+        apply_base_patch(rom)
+        # Room layers and minimaps of the base image may already be decompressed
+        open_asset_pack(rom)
 
     # Softlock edits need to be done early to prevent later edits messing things up.
-    if patch_data.get("AntiSoftlockRoomEdits"):
-        apply_anti_softlock_edits(rom)
+    if settings.anti_softlock_edits:
+
+        @add_stage("Applying anti-softlock edits...")
+        def _anti_softlock(rom: Rom) -> None:
+            apply_anti_softlock_edits(rom)
 
     # Randomize palettes - palettes are randomized first in case the item
     # patcher needs to copy tilesets
-    if "Palettes" in patch_data:
-        status_update("Randomizing palettes...", -1)
-        pal_settings = PaletteSettings.from_json(patch_data["Palettes"])
-        pal_randomizer = PaletteRandomizer(rom, pal_settings)
-        pal_randomizer.randomize()
+    if (pal_settings := settings.palettes) is not None:
+
+        @add_stage("Randomizing palettes...")
+        def _palettes(rom: Rom) -> None:
+            from mars_patcher.random_palettes import PaletteRandomizer
+
+            pal_randomizer = PaletteRandomizer(rom, pal_settings)
+            pal_randomizer.randomize()
 
     # Load locations and set assignments
-    status_update("Writing item assignments...", -1)
-    loc_settings = LocationSettings.initialize()
-    loc_settings.set_assignments(patch_data["Locations"])
-    item_patcher = ItemPatcher(rom, loc_settings)
-    item_patcher.write_items()
+    @add_stage("Writing item assignments...")
+    def _items(rom: Rom) -> None:
+        loc_settings = LocationSettings.initialize()
+        loc_settings.set_assignments(settings.locations)
+        item_patcher = ItemPatcher(rom, loc_settings)
+        item_patcher.write_items()
 
-    # Required metroid count
-    set_required_metroid_count(rom, patch_data["RequiredMetroidCount"])
+        # Required metroid count
+        set_required_metroid_count(rom, settings.required_metroid_count)
 
     # Starting location
-    if "StartingLocation" in patch_data:
-        status_update("Writing starting location...", -1)
-        set_starting_location(rom, patch_data["StartingLocation"])
+    if (starting_location := settings.starting_location) is not None:
+
+        @add_stage("Writing starting location...")
+        def _starting_location(rom: Rom) -> None:
+            set_starting_location(rom, starting_location)
 
     # Starting items
-    if "StartingItems" in patch_data:
-        status_update("Writing starting items...", -1)
-        set_starting_items(rom, patch_data["StartingItems"])
+    if (starting_items := settings.starting_items) is not None:
+
+        @add_stage("Writing starting items...")
+        def _starting_items(rom: Rom) -> None:
+            set_starting_items(rom, starting_items)
 
     # Tank increments
-    if "TankIncrements" in patch_data:
-        status_update("Writing tank increments...", -1)
-        set_tank_increments(rom, patch_data["TankIncrements"])
+    if (tank_increments := settings.tank_increments) is not None:
 
-    # Elevator connections
-    conns = None
-    if "ElevatorConnections" in patch_data:
-        status_update("Writing elevator connections...", -1)
-        conns = Connections(rom)
-        conns.set_elevator_connections(patch_data["ElevatorConnections"])
+        @add_stage("Writing tank increments...")
+        def _tank_increments(rom: Rom) -> None:
+            set_tank_increments(rom, tank_increments)
 
-    # Sector shortcuts
-    if "SectorShortcuts" in patch_data:
-        status_update("Writing sector shortcuts...", -1)
+    # Elevator connections and sector shortcuts share area connection data
+    conns: Connections | None = None
+
+    def get_connections(rom: Rom) -> Connections:
+        from mars_patcher.connections import Connections
+
+        nonlocal conns
         if conns is None:
             conns = Connections(rom)
-        conns.set_shortcut_connections(patch_data["SectorShortcuts"])
+        return conns
+
+    if (elevators := settings.elevator_connections) is not None:
+
+        @add_stage("Writing elevator connections...")
+        def _elevators(rom: Rom) -> None:
+            get_connections(rom).set_elevator_connections(elevators)
+
+    # Sector shortcuts
+    if (shortcuts := settings.sector_shortcuts) is not None:
+
+        @add_stage("Writing sector shortcuts...")
+        def _shortcuts(rom: Rom) -> None:
+            get_connections(rom).set_shortcut_connections(shortcuts)
 
     # Door locks
-    if door_locks := patch_data.get("DoorLocks", []):
-        status_update("Writing door locks...", -1)
-        set_door_locks(rom, door_locks)
+    if settings.door_locks:
+
+        @add_stage("Writing door locks...")
+        def _door_locks(rom: Rom) -> None:
+            set_door_locks(rom, settings.door_locks)
 
     # Hints
-    if nav_text := patch_data.get("NavigationText", {}):
-        status_update("Writing navigation text...", -1)
-        navigation_text = NavigationText.from_json(nav_text)
-        navigation_text.write(rom)
+    if (navigation_text := settings.navigation_text) is not None:
 
-    if nav_locks := patch_data.get("NavStationLocks", {}):
-        status_update("Writing navigation locks...", -1)
-        NavigationText.apply_hint_security(rom, nav_locks)
+        @add_stage("Writing navigation text...")
+        def _nav_text(rom: Rom) -> None:
+            navigation_text.write(rom)
+
+    if settings.nav_station_locks:
+
+        @add_stage("Writing navigation locks...")
+        def _nav_locks(rom: Rom) -> None:
+            from mars_patcher.navigation_text import NavigationText
+
+            NavigationText.apply_hint_security(rom, settings.nav_station_locks)
 
     # Room Names
-    if room_names := patch_data.get("RoomNames", []):
-        status_update("Writing room names...", -1)
-        write_room_names(rom, room_names)
+    if settings.room_names:
+
+        @add_stage("Writing room names...")
+        def _room_names(rom: Rom) -> None:
+            write_room_names(rom, settings.room_names)
 
     # Credits
-    if credits_text := patch_data.get("CreditsText", []):
-        status_update("Writing credits text...", -1)
-        write_credits(rom, credits_text)
+    if settings.credits_text:
+
+        @add_stage("Writing credits text...")
+        def _credits(rom: Rom) -> None:
+            from mars_patcher.credits import write_credits
+
+            write_credits(rom, settings.credits_text)
 
     # Misc patches
+    @add_stage("Applying misc patches...")
+    def _misc(rom: Rom) -> None:
+        if settings.disable_demos:
+            disable_demos(rom)
+
+        if settings.skip_door_transitions:
+            skip_door_transitions(rom)
+
+        if settings.stereo_default:
+            stereo_default(rom)
+
+        if settings.disable_music:
+            disable_music(rom)
+
+        if settings.disable_sound_effects:
+            disable_sound_effects(rom)
+
+        if settings.missile_limit is not None:
+            change_missile_limit(rom, settings.missile_limit)
+
+        if settings.pbs_without_bombs:
+            apply_pbs_without_bombs(rom)
+
+        if settings.unexplored_map:
+            apply_unexplored_map(rom)
+
+        if settings.reveal_hidden_tiles:
+            apply_reveal_hidden_tiles(rom)
+
+    if settings.door_locks or settings.hide_doors_on_minimap:
+
+        @add_stage("Removing door colors on minimap...")
+        def _minimap_doors(rom: Rom) -> None:
+            remove_door_colors_on_minimap(rom)
+
+    if settings.level_edits:
+
+        @add_stage("Applying level edits...")
+        def _level_edits(rom: Rom) -> None:
+            apply_level_edits(rom, settings.level_edits)
+
+    if settings.minimap_edits:
+
+        @add_stage("Applying minimap edits...")
+        def _minimap_edits(rom: Rom) -> None:
+            apply_minimap_edits(rom, settings.minimap_edits)
+
+    @add_stage("Writing seed hash...")
+    def _seed_hash(rom: Rom) -> None:
+        write_seed_hash(rom, settings.seed_hash)
+
+    return stages
+
+
+def patch(
+    input_path: str,
+    output_path: str,
+    patch_data: MarsSchema | PatchSettings,
+    status_update: Callable[[str, float], None],
+    profiler: PatchProfiler | None = None,
+    tracer: Tracer | None = None,
+) -> None:
+    """
+    Creates a new randomized Fusion game, based off of an input path, an output path,
+    a dictionary defining how the game should be randomized, and a status update function.
+
+    Args:
+        input_path: The path to an unmodified Metroid Fusion (U) ROM.
+        output_path: The path where the randomized Fusion ROM should be saved to.
+        patch_data: A dictionary defining how the game should be randomized, or settings
+            already parsed from one. This function assumes that it satisfies the needed schema.
+            To validate it, use validate_patch_data().
+        status_update: A function taking in a message (str) and a progress value (float).
+            The progress value is the fraction of stages completed, from 0.0 to 1.0.
+        profiler: An optional profiler that records measurements for each stage.
+        tracer: An optional tracer that records spans for the patch and each stage.
+    """
+    with tracer.activate() if tracer is not None else nullcontext(), span("patch", "patch"):
+        # Load input rom
+        rom = Rom(input_path)
 
-    if patch_data.get("DisableDemos"):
-        disable_demos(rom)
+        stages = get_patch_stages(_get_settings(patch_data))
+        with deferred_writes(rom):
+            for i, stage in enumerate(stages):
+                status_update(stage.message, i / len(stages))
+                _apply_stage(stage, rom, profiler, tracer)
 
-    if patch_data.get("SkipDoorTransitions"):
-        skip_door_transitions(rom)
+        rom.save(output_path)
+    status_update(f"Output written to {output_path}", 1.0)
+    _print_issue_notice()
 
-    if patch_data.get("StereoDefault", True):
-        stereo_default(rom)
 
-    if patch_data.get("DisableMusic"):
-        disable_music(rom)
+async def patch_async(
+    input_path: str,
+    output_path: str,
+    patch_data: MarsSchema | PatchSettings,
+    status_update: Callable[[str, float], Awaitable[None] | None] | None = None,
+    executor: Executor | None = None,
+    profiler: PatchProfiler | None = None,
+    tracer: Tracer | None = None,
+) -> None:
+    """
+    Asynchronous version of patch(). Every stage runs in an executor, so the event loop is
+    not blocked while patching. Cancelling the task stops patching before the next stage;
+    a stage that is already running is allowed to finish, but nothing is written.
 
-    if patch_data.get("DisableSoundEffects"):
-        disable_sound_effects(rom)
+    Args:
+        input_path: The path to an unmodified Metroid Fusion (U) ROM.
+        output_path: The path where the randomized Fusion ROM should be saved to.
+        patch_data: A dictionary defining how the game should be randomized, or settings
+            already parsed from one. This function assumes that it satisfies the needed schema.
+            To validate it, use validate_patch_data().
+        status_update: An optional function taking in a message (str) and a progress value
+            (float), which may be a coroutine function. The progress value is the fraction of
+            stages completed, from 0.0 to 1.0.
+        executor: The executor to run stages in. Must run submitted calls in the current
+            process, as the stages share the loaded ROM. None uses the loop's default executor.
+        profiler: An optional profiler that records measurements for each stage.
+        tracer: An optional tracer that records spans for the patch and each stage.
+    """
+    import asyncio
 
-    if "MissileLimit" in patch_data:
-        change_missile_limit(rom, patch_data["MissileLimit"])
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter_ns()
 
-    if patch_data.get("PowerBombsWithoutBombs"):
-        apply_pbs_without_bombs(rom)
+    async def report(message: str, progress: float) -> None:
+        if status_update is None:
+            return
+        result = status_update(message, progress)
+        if inspect.isawaitable(result):
+            await result
 
-    if patch_data.get("UnexploredMap"):
-        apply_unexplored_map(rom)
+    # Load input rom
+    rom = await loop.run_in_executor(executor, Rom, input_path)
 
-    if patch_data.get("RevealHiddenTiles"):
-        apply_reveal_hidden_tiles(rom)
+    stages = get_patch_stages(_get_settings(patch_data))
+    with deferred_writes(rom):
+        for i, stage in enumerate(stages):
+            await report(stage.message, i / len(stages))
+            await loop.run_in_executor(executor, _apply_stage, stage, rom, profiler, tracer)
 
-    if patch_data.get("DoorLocks") or "HideDoorsOnMinimap" in patch_data:
-        remove_door_colors_on_minimap(rom)
+    await loop.run_in_executor(executor, rom.save, output_path)
+    if tracer is not None:
+        tracer.add_span("patch", "patch", start, time.perf_counter_ns(), {})
+    await report(f"Output written to {output_path}", 1.0)
+    _print_issue_notice()
 
-    if "LevelEdits" in patch_data:
-        apply_level_edits(rom, patch_data["LevelEdits"])
 
-    if "MinimapEdits" in patch_data:
-        apply_minimap_edits(rom, patch_data["MinimapEdits"])
+def _get_settings(patch_data: MarsSchema | PatchSettings) -> PatchSettings:
+    if isinstance(patch_data, PatchSettings):
+        return patch_data
+    return PatchSettings.from_json(patch_data)
 
-    write_seed_hash(rom, patch_data["SeedHash"])
 
-    rom.save(output_path)
-    status_update(f"Output written to {output_path}", -1)
+def _apply_stage(
+    stage: PatchStage, rom: Rom, profiler: PatchProfiler | None, tracer: Tracer | None
+) -> None:
+    # Stages may run on executor threads, which don't inherit the caller's context
+    with ExitStack() as stack:
+        if tracer is not None:
+            stack.enter_context(tracer.activate())
+        if profiler is not None:
+            stack.enter_context(profiler.profile_stage(stage.message, rom))
+        with span(stage.message, "stage"):
+            stage.apply(rom)
+
 
+def _print_issue_notice() -> None:
     # Remove once in public beta
     print("------")
     print("Report all issues to the Randovania Discord Server (https://discord.gg/M23gCxj6fw)")
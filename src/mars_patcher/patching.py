@@ -1,6 +1,11 @@
+import re
+from collections.abc import Iterable
 from enum import Enum
 from zlib import crc32
 
+from mars_patcher.rom import BytesLike
+from mars_patcher.tracing import traced
+
 
 class BpsDecodeError(Enum):
     INVALID_BPS = 0
@@ -18,6 +23,7 @@ class BpsDecoder:
             msg = "File already patched"
         raise ValueError(msg)
 
+    @traced("BpsDecoder.apply_patch", "patching")
     def apply_patch(self, patch: bytes, source: bytes, ignore_checksum: bool = False) -> bytearray:
         self.patch = patch
         self.source = source
@@ -148,17 +154,27 @@ class IpsDecoder:
         raise ValueError(msg)
 
     def apply_patch(self, patch: bytes, target: bytearray) -> None:
+        records = self.read_records(patch)
+        for addr, data in records:
+            if addr + len(data) > len(target):
+                self.error(IpsDecodeError.PAST_TARGET_END)
+        for addr, data in records:
+            target[addr : addr + len(data)] = data
+
+    def read_records(self, patch: bytes) -> list[tuple[int, bytes]]:
+        """Returns the (address, data) records of a patch in order, with RLE records expanded."""
         # Check signature
         patch_len = len(patch)
         if patch_len < 8 or patch[:5] != b"PATCH":
             self.error(IpsDecodeError.INVALID_IPS)
 
         # Records
+        records: list[tuple[int, bytes]] = []
         idx = 5
         while idx + 2 < patch_len:
             # Check EOF
             if patch[idx : idx + 3] == b"EOF":
-                return
+                return records
 
             # Get address and size
             addr = (patch[idx] << 16) | (patch[idx + 1] << 8) | patch[idx + 2]
@@ -173,23 +189,111 @@ class IpsDecoder:
                 if idx + 1 >= patch_len:
                     self.error(IpsDecodeError.ABRUPT_IPS_END, "entry cut off before RLE size")
                 rle_size = (patch[idx] << 8) | patch[idx + 1]
-                if addr + rle_size > len(target):
-                    self.error(IpsDecodeError.PAST_TARGET_END)
                 idx += 2
                 if idx >= patch_len:
                     self.error(IpsDecodeError.ABRUPT_IPS_END, "entry cut off before RLE byte")
-                rle_byte = patch[idx]
+                records.append((addr, bytes((patch[idx],)) * rle_size))
                 idx += 1
-                for i in range(addr, addr + rle_size):
-                    target[i] = rle_byte
             else:
                 if idx + size > patch_len:
                     self.error(
                         IpsDecodeError.ABRUPT_IPS_END, "entry cut off before end of data block"
                     )
-                if addr + size > len(target):
-                    self.error(IpsDecodeError.PAST_TARGET_END)
-                target[addr : addr + size] = patch[idx : idx + size]
+                records.append((addr, bytes(patch[idx : idx + size])))
                 idx += size
 
         self.error(IpsDecodeError.MISSING_EOF)
+        return records
+
+
+# IPS addresses are 3 bytes, and sizes are 2 bytes
+IPS_MAX_ADDR = 0x1000000
+IPS_MAX_SIZE = 0xFFFF
+# A record at this address would be read as the end of the patch
+_IPS_EOF_ADDR = 0x454F46
+# Address and size
+_IPS_HEADER_SIZE = 5
+# Header, RLE size and RLE byte
+_IPS_RLE_RECORD_SIZE = 8
+# Runs of the same byte at least this long may be cheaper as RLE records
+_IPS_MIN_RLE_RUN = _IPS_RLE_RECORD_SIZE - _IPS_HEADER_SIZE + 1
+_IPS_RUN = re.compile(rb"(.)\1{%d,}" % (_IPS_MIN_RLE_RUN - 1), re.DOTALL)
+
+
+class IpsEncoder:
+    def create_patch(self, target: BytesLike, ranges: Iterable[tuple[int, int]]) -> bytes:
+        """
+        Returns an IPS patch that writes the (start, end) address ranges of the target.
+        Ranges closer together than a record header are written as one record, and runs
+        of the same byte are written as RLE records when that's smaller.
+
+        Raises:
+            ValueError: If a range is outside the target, or can't be addressed by IPS.
+        """
+        patch = bytearray(b"PATCH")
+        for start, end in self.merge_ranges(ranges):
+            if end > len(target):
+                raise ValueError(f"Range {start:X}-{end:X} is past the end of the target")
+            self._write_span(patch, target, start, end)
+        patch += b"EOF"
+        return bytes(patch)
+
+    def merge_ranges(self, ranges: Iterable[tuple[int, int]]) -> list[tuple[int, int]]:
+        """
+        Returns the ranges sorted, with ranges that overlap or are separated by no more
+        than a record header merged, since writing the gap costs no more than a header.
+        """
+        merged: list[tuple[int, int]] = []
+        for start, end in sorted(ranges):
+            if start >= end:
+                continue
+            if start < 0 or end > IPS_MAX_ADDR:
+                raise ValueError(f"Range {start:X}-{end:X} can't be addressed by IPS")
+            if merged and start - merged[-1][1] <= _IPS_HEADER_SIZE:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+    def _write_span(self, patch: bytearray, target: BytesLike, start: int, end: int) -> None:
+        pos = start
+        for m in _IPS_RUN.finditer(target, start, end):
+            run_start, run_end = m.span()
+            # Each side of the run that splits off data needs another record header
+            min_run = _IPS_MIN_RLE_RUN
+            if run_start > pos:
+                min_run += _IPS_HEADER_SIZE
+            if run_end < end:
+                min_run += _IPS_HEADER_SIZE
+            if run_end - run_start < min_run:
+                continue
+            self._write_data(patch, target, pos, run_start)
+            self._write_rle(patch, target, run_start, run_end)
+            pos = run_end
+        self._write_data(patch, target, pos, end)
+
+    def _write_data(self, patch: bytearray, target: BytesLike, start: int, end: int) -> None:
+        pos = start
+        while pos < end:
+            if pos == _IPS_EOF_ADDR:
+                # Start a byte earlier, which writes that byte's current value
+                pos -= 1
+            size = min(end - pos, IPS_MAX_SIZE)
+            patch += pos.to_bytes(3, "big")
+            patch += size.to_bytes(2, "big")
+            patch += target[pos : pos + size]
+            pos += size
+
+    def _write_rle(self, patch: bytearray, target: BytesLike, start: int, end: int) -> None:
+        pos = start
+        while pos < end:
+            if pos == _IPS_EOF_ADDR:
+                self._write_data(patch, target, pos, pos + 1)
+                pos += 1
+                continue
+            size = min(end - pos, IPS_MAX_SIZE)
+            patch += pos.to_bytes(3, "big")
+            patch += bytes(2)
+            patch += size.to_bytes(2, "big")
+            patch.append(target[pos])
+            pos += size
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from functools import wraps
+from typing import TYPE_CHECKING, Any, Callable, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from os import PathLike
+
+    from mars_patcher.rom import Rom
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Rom methods that are counted, along with a function returning how many bytes they write
+_ROM_READS = (
+    "read_8",
+    "read_16",
+    "read_32",
+    "read_ptr",
+    "read_ptr_table",
+    "read_struct_array",
+    "read_u16_array",
+    "read_bytes",
+    "read_ascii",
+    # Writes through views can't be counted, so views count as a single read
+    "view_u16",
+    "view_u32",
+)
+_ROM_WRITES: dict[str, Callable[..., int]] = {
+    "write_8": lambda addr, val: 1,
+    "write_16": lambda addr, val: 2,
+    "write_32": lambda addr, val: 4,
+    "write_ptr": lambda addr, val: 4,
+    "write_bytes": lambda data_addr, vals, val_addr=0, size=None: (
+        len(vals) - val_addr if size is None else size
+    ),
+    "write_u16_array": lambda addr, vals: len(vals) * 2,
+    "write_16_list": lambda addr, vals: len(vals) * 2,
+    "copy_bytes": lambda src_addr, dst_addr, size: size,
+}
+
+
+@dataclass
+class CallStats:
+    """Number of calls made to an instrumented function and the total time spent in it."""
+
+    count: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class StageProfile:
+    """Measurements taken while running a single patch stage."""
+
+    message: str
+    seconds: float = 0.0
+    peak_memory: int = 0
+    """Peak memory allocated during the stage in bytes, as traced by tracemalloc."""
+    rom_reads: int = 0
+    rom_writes: int = 0
+    bytes_written: int = 0
+    """Number of bytes written through Rom write methods."""
+    calls: dict[str, CallStats] = field(default_factory=dict)
+    """Stats for instrumented functions (compression and decompression), by name."""
+    repoints_avoided: int = 0
+    """Compressed writes that fit in place after compressing them again with a slower encoder."""
+    repoints: int = 0
+    """Compressed writes that were repointed to free space."""
+
+
+@dataclass
+class ProfileReport:
+    """Measurements for every stage of a patch, in the order the stages ran."""
+
+    stages: list[StageProfile] = field(default_factory=list)
+
+    def total_seconds(self) -> float:
+        return sum(s.seconds for s in self.stages)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"total_seconds": self.total_seconds(), "stages": [asdict(s) for s in self.stages]}
+
+    def write_json(self, path: str | PathLike[str]) -> None:
+        """Writes the report to a JSON file at the specified path."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+_current_stage: ContextVar[StageProfile | None] = ContextVar("_current_stage", default=None)
+
+
+def profiled(name: str) -> Callable[[F], F]:
+    """
+    Decorator that records the number of calls and time spent in a function while a stage
+    is being profiled. Adds a single context variable lookup when profiling is disabled.
+    """
+
+    def decorator(func: F) -> F:
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            stage = _current_stage.get()
+            if stage is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats = stage.calls.get(name)
+                if stats is None:
+                    stats = stage.calls[name] = CallStats()
+                stats.count += 1
+                stats.seconds += time.perf_counter() - start
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+class PatchProfiler:
+    """
+    Collects timing, memory and ROM access measurements for each patch stage.
+    Pass an instance to patch() and read the results from `report` afterwards.
+    """
+
+    def __init__(self) -> None:
+        self.report = ProfileReport()
+
+    @contextmanager
+    def profile_stage(self, message: str, rom: Rom) -> Iterator[StageProfile]:
+        stage = StageProfile(message)
+        self.report.stages.append(stage)
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        else:
+            tracemalloc.reset_peak()
+        mem_start = tracemalloc.get_traced_memory()[0]
+        # Imported here since compression is instrumented by this module
+        from mars_patcher.compression_cache import get_fit_stats
+
+        fit_stats = get_fit_stats(rom)
+        avoided_start, repoints_start = fit_stats.repoints_avoided, fit_stats.repoints
+        token = _current_stage.set(stage)
+        _instrument_rom(rom, stage)
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage.seconds = time.perf_counter() - start
+            _uninstrument_rom(rom)
+            stage.repoints_avoided = fit_stats.repoints_avoided - avoided_start
+            stage.repoints = fit_stats.repoints - repoints_start
+            _current_stage.reset(token)
+            stage.peak_memory = max(tracemalloc.get_traced_memory()[1] - mem_start, 0)
+            if started_tracing:
+                tracemalloc.stop()
+
+
+def _instrument_rom(rom: Rom, stage: StageProfile) -> None:
+    """Shadows the ROM's read/write methods with counting wrappers. Calls made from
+    within another counted method (like read_ptr calling read_32) are not counted twice."""
+    depth = 0
+
+    def wrap(name: str, count_bytes: Callable[..., int] | None) -> None:
+        method = getattr(rom, name)
+
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            nonlocal depth
+            if depth == 0:
+                if count_bytes is None:
+                    stage.rom_reads += 1
+                else:
+                    stage.rom_writes += 1
+                    stage.bytes_written += count_bytes(*args, **kwargs)
+            depth += 1
+            try:
+                return method(*args, **kwargs)
+            finally:
+                depth -= 1
+
+        setattr(rom, name, wrapper)
+
+    for name in _ROM_READS:
+        wrap(name, None)
+    for name, count_bytes in _ROM_WRITES.items():
+        wrap(name, count_bytes)
+
+
+def _uninstrument_rom(rom: Rom) -> None:
+    for name in (*_ROM_READS, *_ROM_WRITES):
+        rom.__dict__.pop(name, None)
@@ -10,11 +10,10 @@ def randomize_enemies(rom: Rom) -> None:
     enemy_types = {k: v[1] for k, v in ENEMY_TYPES.items()}
 
     # Get graphics info for each enemy
-    size_addr = sprite_vram_sizes(rom)
+    sizes = rom.read_struct_array(sprite_vram_sizes(rom), "<I", rom.game_data.sprite_count - 0x10)
     gfx_rows = {}
     for en_id in enemy_types:
-        size = rom.read_32(size_addr + (en_id - 0x10) * 4)
-        gfx_rows[en_id] = size // 0x800
+        gfx_rows[en_id] = sizes[en_id - 0x10][0] // 0x800
 
     # Get replacement pools
     replacements: dict[EnemyType, list[int]] = {t: [] for t in EnemyType}
@@ -31,9 +30,7 @@ def randomize_enemies(rom: Rom) -> None:
         # Ground, Ceiling, Wall, and Flying cannot replace others
 
     # Randomize spritesets
-    ss_ptrs = spriteset_ptrs(rom)
-    for i in range(spriteset_count(rom)):
-        spriteset_addr = rom.read_ptr(ss_ptrs + i * 4)
+    for spriteset_addr in rom.read_ptr_table(spriteset_ptrs(rom), spriteset_count(rom)):
         used_gfx_rows: dict[int, int] = {}
         spriteset = get_spriteset(rom, spriteset_addr)
         for j, (en_id, gfx_row) in enumerate(spriteset):
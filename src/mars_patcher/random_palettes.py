@@ -1,12 +1,13 @@
+from __future__ import annotations
+
 import random
+from dataclasses import dataclass
 from enum import Enum
+from typing import TYPE_CHECKING, ClassVar
+
+from frozendict import frozendict
 
 import mars_patcher.constants.game_data as gd
-from mars_patcher.auto_generated_types import (
-    MarsschemaPalettes,
-    MarsschemaPalettesColorspace,
-    MarsschemaPalettesRandomize,
-)
 from mars_patcher.constants.palettes import (
     ENEMY_GROUPS,
     EXCLUDED_ENEMIES,
@@ -17,6 +18,13 @@ from mars_patcher.constants.palettes import (
 from mars_patcher.palette import Palette
 from mars_patcher.rom import Game, Rom
 
+if TYPE_CHECKING:
+    from mars_patcher.auto_generated_types import (
+        MarsschemaPalettes,
+        MarsschemaPalettesColorspace,
+        MarsschemaPalettesRandomize,
+    )
+
 
 class PaletteType(Enum):
     TILESETS = 1
@@ -25,51 +33,47 @@ class PaletteType(Enum):
     BEAMS = 4
 
 
+@dataclass(frozen=True, slots=True)
 class PaletteSettings:
-    PAL_TYPE_ENUMS = {
+    PAL_TYPE_ENUMS: ClassVar[dict[str, PaletteType]] = {
         "Tilesets": PaletteType.TILESETS,
         "Enemies": PaletteType.ENEMIES,
         "Samus": PaletteType.SAMUS,
         "Beams": PaletteType.BEAMS,
     }
 
-    def __init__(
-        self,
-        seed: int,
-        pal_types: dict[PaletteType, tuple[int, int]],  # TODO: change this tuple(int, int)
-        color_space: MarsschemaPalettesColorspace,
-        symmetric: bool,
-    ):
-        self.seed = seed
-        self.pal_types = pal_types
-        self.color_space: MarsschemaPalettesColorspace = color_space
-        self.symmetric = symmetric
+    seed: int
+    pal_types: frozendict[PaletteType, tuple[int, int]]  # TODO: change this tuple(int, int)
+    color_space: MarsschemaPalettesColorspace
+    symmetric: bool
 
     @classmethod
-    def from_json(cls, data: MarsschemaPalettes) -> "PaletteSettings":
+    def from_json(cls, data: MarsschemaPalettes) -> PaletteSettings:
         seed = data.get("Seed", random.randint(0, 2**31 - 1))
-        random.seed(seed)
+        rng = random.Random(seed)
         pal_types = {}
         for type_name, hue_data in data["Randomize"].items():
             pal_type = cls.PAL_TYPE_ENUMS[type_name]
-            hue_range = cls.get_hue_range(hue_data)
+            hue_range = cls.get_hue_range(hue_data, rng)
             pal_types[pal_type] = hue_range
         color_space = data.get("ColorSpace", "Oklab")
         symmetric = data.get("Symmetric", True)
-        return cls(seed, pal_types, color_space, symmetric)
+        return cls(seed, frozendict(pal_types), color_space, symmetric)
 
     @classmethod
-    def get_hue_range(cls, data: MarsschemaPalettesRandomize) -> tuple[int, int]:
+    def get_hue_range(
+        cls, data: MarsschemaPalettesRandomize, rng: random.Random
+    ) -> tuple[int, int]:
         hue_min = data.get("HueMin")
         hue_max = data.get("HueMax")
         if hue_min is None or hue_max is None:
             if hue_max is not None:
-                hue_min = random.randint(0, hue_max)
+                hue_min = rng.randint(0, hue_max)
             elif hue_min is not None:
-                hue_max = random.randint(hue_min, 360)
+                hue_max = rng.randint(hue_min, 360)
             else:
-                hue_min = random.randint(0, 360)
-                hue_max = random.randint(hue_min, 360)
+                hue_min = rng.randint(0, 360)
+                hue_max = rng.randint(hue_min, 360)
         if hue_min > hue_max:
             raise ValueError("HueMin cannot be greater than HueMax")
         return hue_min, hue_max
@@ -81,6 +85,8 @@ class PaletteRandomizer:
     def __init__(self, rom: Rom, settings: PaletteSettings):
         self.rom = rom
         self.settings = settings
+        # Use a separate generator so patching on multiple threads stays deterministic
+        self.rng = random.Random(settings.seed)
         if settings.color_space == "HSV":
             self.shift_func = self.shift_palette_hsv
         elif settings.color_space == "Oklab":
@@ -98,13 +104,13 @@ class PaletteRandomizer:
 
     def get_hue_shift(self, hue_range: tuple[int, int]) -> int:
         """Returns a hue shift in a random direction between hue_min and hue_max."""
-        shift = random.randint(hue_range[0], hue_range[1])
-        if self.settings.symmetric and random.random() < 0.5:
+        shift = self.rng.randint(hue_range[0], hue_range[1])
+        if self.settings.symmetric and self.rng.random() < 0.5:
             shift = 360 - shift
         return shift
 
     def randomize(self) -> None:
-        random.seed(self.settings.seed)
+        self.rng.seed(self.settings.seed)
         self.randomized_pals: set[int] = set()
         pal_types = self.settings.pal_types
         if PaletteType.TILESETS in pal_types:
@@ -141,16 +147,14 @@ class PaletteRandomizer:
 
     def randomize_tilesets(self, hue_range: tuple[int, int]) -> None:
         rom = self.rom
-        ts_addr = gd.tileset_entries(rom)
-        ts_count = gd.tileset_count(rom)
-        anim_pal_count = gd.anim_palette_count(rom)
+        game_data = rom.game_data
+        ts_addr = game_data.tileset_entries
+        ts_count = game_data.tileset_count
+        anim_pal_count = game_data.anim_palette_count
         anim_pal_to_randomize = set(range(anim_pal_count))
 
-        for _ in range(ts_count):
-            # Get tileset palette address
-            pal_ptr = ts_addr + 4
-            pal_addr = rom.read_ptr(pal_ptr)
-            ts_addr += 0x14
+        # Get tileset palette addresses
+        for pal_addr in rom.read_ptr_table(ts_addr + 4, ts_count, 0x14):
             if pal_addr in self.randomized_pals:
                 continue
             # Get excluded palette rows
@@ -178,7 +182,7 @@ class PaletteRandomizer:
 
     def randomize_anim_palette(self, anim_pal_id: int, shift: int) -> None:
         rom = self.rom
-        addr = gd.anim_palette_entries(rom) + anim_pal_id * 8
+        addr = rom.game_data.anim_palette_entries + anim_pal_id * 8
         pal_addr = rom.read_ptr(addr + 4)
         if pal_addr in self.randomized_pals:
             return
@@ -191,7 +195,7 @@ class PaletteRandomizer:
     def randomize_enemies(self, hue_range: tuple[int, int]) -> None:
         rom = self.rom
         excluded = EXCLUDED_ENEMIES[rom.game]
-        sp_count = gd.sprite_count(rom)
+        sp_count = rom.game_data.sprite_count
         to_randomize = set(range(0x10, sp_count))
         to_randomize -= excluded
 
@@ -212,7 +216,7 @@ class PaletteRandomizer:
     def randomize_enemy(self, sprite_id: int, shift: int) -> None:
         rom = self.rom
         sprite_gfx_id = sprite_id - 0x10
-        pal_ptr = gd.sprite_palette_ptrs(rom)
+        pal_ptr = rom.game_data.sprite_palette_ptrs
         pal_addr = rom.read_ptr(pal_ptr + sprite_gfx_id * 4)
         if pal_addr in self.randomized_pals:
             return
@@ -225,7 +229,7 @@ class PaletteRandomizer:
                 vram_size = rom.read_32(vram_size_addr + sprite_gfx_id * 4)
                 rows = vram_size // 0x800
         elif rom.is_zm():
-            gfx_ptr = gd.sprite_graphics_ptrs(rom)
+            gfx_ptr = rom.game_data.sprite_graphics_ptrs
             gfx_addr = rom.read_ptr(gfx_ptr + sprite_gfx_id * 4)
             rows = (rom.read_32(gfx_addr) >> 8) // 0x800
         else:
@@ -238,11 +242,11 @@ class PaletteRandomizer:
             self.fix_nettori(shift)
 
     def get_sprite_addr(self, sprite_id: int) -> int:
-        addr = gd.sprite_palette_ptrs(self.rom) + (sprite_id - 0x10) * 4
+        addr = self.rom.game_data.sprite_palette_ptrs + (sprite_id - 0x10) * 4
         return self.rom.read_ptr(addr)
 
     def get_tileset_addr(self, sprite_id: int) -> int:
-        addr = gd.tileset_entries(self.rom) + sprite_id * 0x14 + 4
+        addr = self.rom.game_data.tileset_entries + sprite_id * 0x14 + 4
         return self.rom.read_ptr(addr)
 
     def fix_nettori(self, shift: int) -> None:
@@ -1,14 +1,23 @@
+import struct
+import sys
+from collections.abc import Sequence
 from enum import Enum
 from os import PathLike
-from typing import Union
+from typing import TYPE_CHECKING, Any, Union
 
 from mars_patcher.constants.reserved_space import ReservedConstants
 
+if TYPE_CHECKING:
+    from mars_patcher.constants.game_data import GameData
+
 BytesLike = Union[bytes, bytearray]
 
 SIZE_8MB = 0x800000
 ROM_OFFSET = 0x8000000
 
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+
 
 class Game(Enum):
     """The possible GBA games."""
@@ -40,6 +49,7 @@ class Rom:
     Attributes:
         game: An enum indicating the current game that is loaded.
         region: An enum indicating the region of the currently loaded game.
+        game_data: The addresses and counts of the game data of the loaded game and region.
         data: A bytearray containing the data from a loaded game.
         free_space_addr: An integer keeping track of the current known address where free space in
                          the game is contained.
@@ -85,7 +95,24 @@ class Rom:
     def __init__(self, path: str):
         # Read file
         with open(path, "rb") as f:
-            self.data = bytearray(f.read())
+            data = bytearray(f.read())
+        self._load(data)
+
+    @classmethod
+    def from_bytes(cls, data: BytesLike) -> "Rom":
+        """
+        Creates a ROM from data already in memory, checked the same way as a ROM file.
+        The data is copied, so the ROM can be modified without changing it.
+        """
+        rom = cls.__new__(cls)
+        rom._load(bytearray(data))
+        return rom
+
+    def _load(self, data: bytearray) -> None:
+        # Game data refers to the Game and Region enums, so it's imported here
+        from mars_patcher.constants.game_data import get_game_data
+
+        self.data = data
         # Check length
         if len(self.data) != SIZE_8MB:
             raise ValueError("ROM should be 8MB")
@@ -100,6 +127,7 @@ class Rom:
         assert isinstance(region, Region)
         self.game = game
         self.region = region
+        self.game_data: GameData = get_game_data(game, region)
 
         # For now we only allow MF U
         if self.game == Game.ZM:
@@ -125,17 +153,49 @@ class Rom:
         return self.data[addr]
 
     def read_16(self, addr: int) -> int:
-        """Reads two bytes from the specified address, and returns the read value."""
-        return self.data[addr] | (self.data[addr + 1] << 8)
+        """
+        Reads two bytes from the specified address, and returns the read value.
+        The address does not need to be aligned.
+        """
+        val: int = _U16.unpack_from(self.data, addr)[0]
+        return val
 
     def read_32(self, addr: int) -> int:
-        """Reads four bytes from the specified address, and returns the read value."""
-        return (
-            self.data[addr]
-            | (self.data[addr + 1] << 8)
-            | (self.data[addr + 2] << 16)
-            | (self.data[addr + 3] << 24)
-        )
+        """
+        Reads four bytes from the specified address, and returns the read value.
+        The address does not need to be aligned.
+        """
+        val: int = _U32.unpack_from(self.data, addr)[0]
+        return val
+
+    def read_u16_array(self, addr: int, count: int) -> list[int]:
+        """Reads count 16-bit numbers from the specified address, and returns the read values."""
+        return list(struct.unpack_from(f"<{count}H", self.data, addr))
+
+    def view_u16(self, addr: int, count: int) -> memoryview:
+        """
+        Returns a view of count 16-bit numbers at the specified address, which must be
+        aligned to 2. The view shares memory with the data, so reading and writing it
+        doesn't copy anything. The data can't be resized while the view is in use, so it
+        should be released when done, for example by using it in a with statement.
+        """
+        return self._view(addr, count, 2).cast("H")
+
+    def view_u32(self, addr: int, count: int) -> memoryview:
+        """
+        Returns a view of count 32-bit numbers at the specified address, which must be
+        aligned to 4. See view_u16().
+        """
+        return self._view(addr, count, 4).cast("I")
+
+    def _view(self, addr: int, count: int, size: int) -> memoryview:
+        if addr % size != 0:
+            raise ValueError(f"Address {addr:X} is not aligned to {size}")
+        end = addr + count * size
+        if addr < 0 or end > len(self.data):
+            raise ValueError(f"View of {count} values at {addr:X} is outside the ROM")
+        _check_byte_order()
+        return memoryview(self.data)[addr:end]
 
     def read_ptr(self, addr: int) -> int:
         """
@@ -152,6 +212,44 @@ class Rom:
             raise ValueError(f"Invalid pointer {val:X} at {addr:X}")
         return val - ROM_OFFSET
 
+    def read_struct_array(
+        self, addr: int, fmt: Union[str, struct.Struct], count: int
+    ) -> list[tuple[Any, ...]]:
+        """
+        Reads count consecutive structs from the specified address, and returns the
+        unpacked values of each one. The format is a struct module format string or a
+        compiled Struct, and should specify the byte order (usually little endian, "<").
+        """
+        if isinstance(fmt, str):
+            fmt = struct.Struct(fmt)
+        end = addr + fmt.size * count
+        if addr < 0 or end > len(self.data):
+            raise ValueError(f"Array of {count} structs at {addr:X} is outside the ROM")
+        with memoryview(self.data) as view:
+            return list(fmt.iter_unpack(view[addr:end]))
+
+    def read_ptr_table(self, addr: int, count: int, stride: int = 4) -> list[int]:
+        """
+        Reads count pointers from the specified address, spaced stride bytes apart, and
+        returns the read addresses. Each is adjusted like read_ptr(). Use a stride larger
+        than 4 to read a pointer at the same offset of each entry in an array of structs.
+
+        Raises:
+            ValueError: If any pointer that was read does not point to the region where
+                        the GBA loads ROMs.
+        """
+        if stride == 4:
+            end = addr + count * 4
+            if addr < 0 or end > len(self.data):
+                raise ValueError(f"Table of {count} pointers at {addr:X} is outside the ROM")
+            vals: Sequence[int] = struct.unpack_from(f"<{count}I", self.data, addr)
+        else:
+            vals = [v for (v,) in self.read_struct_array(addr, f"<I{stride - 4}x", count)]
+        if count > 0 and min(vals) < ROM_OFFSET:
+            i = next(i for i, val in enumerate(vals) if val < ROM_OFFSET)
+            raise ValueError(f"Invalid pointer {vals[i]:X} at {addr + i * stride:X}")
+        return [val - ROM_OFFSET for val in vals]
+
     def read_bytes(self, addr: int, size: int) -> bytearray:
         """
         Reads a specified amount of bytes from a given address, and returns
@@ -172,18 +270,18 @@ class Rom:
         self.data[addr] = val & 0xFF
 
     def write_16(self, addr: int, val: int) -> None:
-        """Writes a number as two bytes (short) to a specified address."""
-        val &= 0xFFFF
-        self.data[addr] = val & 0xFF
-        self.data[addr + 1] = val >> 8
+        """
+        Writes a number as two bytes (short) to a specified address.
+        The address does not need to be aligned.
+        """
+        _U16.pack_into(self.data, addr, val & 0xFFFF)
 
     def write_32(self, addr: int, val: int) -> None:
-        """Writes a number as four bytes (int) to a specified address."""
-        val &= 0xFFFFFFFF
-        self.data[addr] = val & 0xFF
-        self.data[addr + 1] = (val >> 8) & 0xFF
-        self.data[addr + 2] = (val >> 16) & 0xFF
-        self.data[addr + 3] = val >> 24
+        """
+        Writes a number as four bytes (int) to a specified address.
+        The address does not need to be aligned.
+        """
+        _U32.pack_into(self.data, addr, val & 0xFFFFFFFF)
 
     def write_ptr(self, addr: int, val: int) -> None:
         """
@@ -212,13 +310,22 @@ class Rom:
         val_end = val_addr + size
         self.data[data_addr:data_end] = vals[val_addr:val_end]
 
+    def write_u16_array(self, addr: int, vals: Sequence[int]) -> int:
+        """
+        Writes numbers as 16-bit integers to a specified address, all at once.
+        Returns the ending address.
+
+        Raises:
+            struct.error: If any value is not within 16-bit range, or the values don't fit
+                          in the ROM.
+        """
+        struct.pack_into(f"<{len(vals)}H", self.data, addr, *vals)
+        return addr + len(vals) * 2
+
     def write_16_list(self, addr: int, vals: list[int]) -> int:
         """Writes a list of numbers as 16-bit integers. Does not check if the
         values are within 16-bit range. Returns the ending address."""
-        for val in vals:
-            self.write_16(addr, val)
-            addr += 2
-        return addr
+        return self.write_u16_array(addr, [val & 0xFFFF for val in vals])
 
     def copy_bytes(self, src_addr: int, dst_addr: int, size: int) -> None:
         """Copies a specified amount of bytes from the source address to the destination address."""
@@ -242,3 +349,18 @@ class Rom:
         """Saves the currently loaded data to a specified path."""
         with open(path, "wb") as f:
             f.write(self.data)
+
+
+def view_u16_buffer(data: bytearray) -> memoryview:
+    """
+    Returns a view of the 16-bit numbers in a buffer of little endian data, such as
+    decompressed room or minimap data. See Rom.view_u16().
+    """
+    _check_byte_order()
+    return memoryview(data).cast("H")
+
+
+def _check_byte_order() -> None:
+    # Casting uses the native byte order, while the GBA is little endian
+    if sys.byteorder != "little":
+        raise NotImplementedError("Views are only supported on little endian machines")
@@ -1,15 +1,25 @@
 from __future__ import annotations
 
+from array import array
 from typing import TYPE_CHECKING
+from weakref import WeakKeyDictionary
 
-from mars_patcher.compress import comp_rle, decomp_rle
+from mars_patcher.asset_cache import load_asset
+from mars_patcher.compression_cache import RLE, compress_cached, compress_to_fit
 from mars_patcher.constants.game_data import area_room_entry_ptrs
+from mars_patcher.rom import view_u16_buffer
+from mars_patcher.tracing import span
 
 if TYPE_CHECKING:
+    from collections.abc import Sequence
     from types import TracebackType
 
     from mars_patcher.rom import Rom
 
+# Block layers shared by load_block_layer(), by ROM and data address. A ROM is only in
+# here while its writes are deferred, see flush.deferred_writes()
+_loaded_layers: WeakKeyDictionary[Rom, dict[int, BlockLayer]] = WeakKeyDictionary()
+
 
 class RoomEntry:
     def __init__(self, rom: Rom, area: int, room: int):
@@ -43,17 +53,25 @@ class RoomEntry:
     def default_spriteset(self) -> int:
         return self.rom.read_8(self.addr + 0x24)
 
+    # Layers are shared while writes are deferred, see load_block_layer()
     def load_bg1(self) -> BlockLayer:
-        return BlockLayer(self.rom, self.bg1_ptr())
+        return load_block_layer(self.rom, self.bg1_ptr())
 
     def load_bg2(self) -> BlockLayer:
-        return BlockLayer(self.rom, self.bg2_ptr())
+        return load_block_layer(self.rom, self.bg2_ptr())
 
     def load_clip(self) -> BlockLayer:
-        return BlockLayer(self.rom, self.clip_ptr())
+        return load_block_layer(self.rom, self.clip_ptr())
 
 
 class BlockLayer:
+    """
+    A room's BG1, BG2 or clipdata layer.
+
+    Block values are exposed as a flat array of 16-bit values through `blocks`, which views
+    `block_data` directly. Like the ROM's views, it's only supported on little endian hosts.
+    """
+
     def __enter__(self) -> BlockLayer:
         # We don't need to do anything
         return self
@@ -64,45 +82,188 @@ class BlockLayer:
         exc_val: BaseException | None,
         exc_tb: TracebackType | None,
     ) -> None:
-        self.write()
+        # Shared layers are written when the deferred writes are flushed
+        if not self.is_shared():
+            self.write()
 
     def __init__(self, rom: Rom, ptr: int):
-        addr = rom.read_ptr(ptr)
-        self.rom = rom
-        self.pointer = ptr
-        self.width = rom.read_8(addr)
-        self.height = rom.read_8(addr + 1)
-        self.block_data, self.comp_len = decomp_rle(rom.data, addr + 2)
+        with span("BlockLayer.load", "room", pointer=ptr):
+            addr = rom.read_ptr(ptr)
+            self.rom = rom
+            self.pointer = ptr
+            # Every pointer to the data, which are all repointed together
+            self.pointers = [ptr]
+            self.addr = addr
+            self.width = rom.read_8(addr)
+            self.height = rom.read_8(addr + 1)
+            self.block_data, self.comp_len = load_asset(rom, addr + 2, RLE)
+            self.blocks = view_u16_buffer(self.block_data)
+            self._written_data = bytes(self.block_data)
+
+    def is_shared(self) -> bool:
+        """Returns True if the layer is shared while the ROM's writes are deferred."""
+        return _loaded_layers.get(self.rom, {}).get(self.addr) is self
+
+    def is_dirty(self) -> bool:
+        """Returns True if any block changed since the layer was loaded or last written."""
+        return self.block_data != self._written_data
+
+    def grid(self) -> memoryview:
+        """Returns a 2D view of the block values, indexed with `[y, x]`."""
+        return self.blocks.cast("B").cast("H", (self.height, self.width))
 
     def get_block_value(self, x: int, y: int) -> int:
-        idx = (y * self.width + x) * 2
-        if idx >= len(self.block_data):
+        idx = y * self.width + x
+        if idx >= len(self.blocks):
             raise IndexError(
                 f"Block coordinate ({x}, {y}) is out of bounds!"
                 f"Room size: ({self.width}, {self.height})"
             )
-        return self.block_data[idx] | self.block_data[idx + 1] << 8
+        return self.blocks[idx]
 
     def set_block_value(self, x: int, y: int, value: int) -> None:
-        idx = (y * self.width + x) * 2
-        if idx >= len(self.block_data):
+        idx = y * self.width + x
+        if idx >= len(self.blocks):
             raise IndexError(
                 f"Block coordinate ({x}, {y}) is out of bounds!"
                 f"Room size: ({self.width}, {self.height})"
             )
-        self.block_data[idx] = value & 0xFF
-        self.block_data[idx + 1] = value >> 8
+        self.blocks[idx] = value
+
+    def _check_rect(self, x: int, y: int, width: int, height: int) -> None:
+        if x < 0 or y < 0 or x + width > self.width or y + height > self.height:
+            raise IndexError(
+                f"Block rectangle ({x}, {y}, {width}, {height}) is out of bounds!"
+                f"Room size: ({self.width}, {self.height})"
+            )
+
+    def fill_rect(self, x: int, y: int, width: int, height: int, value: int) -> None:
+        """Sets every block in a rectangle to the same value."""
+        self._check_rect(x, y, width, height)
+        row = array("H", [value]) * width
+        for idx in range(y * self.width + x, (y + height) * self.width, self.width):
+            self.blocks[idx : idx + width] = row
+
+    def set_column(self, x: int, y: int, values: Sequence[int]) -> None:
+        """Sets consecutive blocks going down from (x, y) to the provided values."""
+        self._check_rect(x, y, 1, len(values))
+        start = y * self.width + x
+        end = start + len(values) * self.width
+        self.blocks[start : end : self.width] = array("H", values)
+
+    def set_row(self, x: int, y: int, values: Sequence[int]) -> None:
+        """Sets consecutive blocks going right from (x, y) to the provided values."""
+        self._check_rect(x, y, len(values), 1)
+        start = y * self.width + x
+        self.blocks[start : start + len(values)] = array("H", values)
+
+    def copy_rect(
+        self,
+        src: BlockLayer,
+        src_x: int,
+        src_y: int,
+        width: int,
+        height: int,
+        dst_x: int,
+        dst_y: int,
+    ) -> None:
+        """Copies a rectangle of blocks from another layer (or this one) to (dst_x, dst_y)."""
+        src._check_rect(src_x, src_y, width, height)
+        self._check_rect(dst_x, dst_y, width, height)
+        rows = [
+            src.blocks[idx : idx + width].tobytes()
+            for idx in range(src_y * src.width + src_x, (src_y + height) * src.width, src.width)
+        ]
+        for i, row in enumerate(rows):
+            idx = (dst_y + i) * self.width + dst_x
+            self.blocks[idx : idx + width] = memoryview(row).cast("H")
 
     def write(self) -> None:
-        comp_data = comp_rle(self.block_data)
-        comp_len = len(comp_data)
-        if comp_len > self.comp_len:
-            # Repoint data
-            addr = self.rom.reserve_free_space(comp_len + 2)
-            self.rom.write_ptr(self.pointer, addr)
-        else:
-            addr = self.rom.read_ptr(self.pointer)
-        self.rom.write_8(addr, self.width)
-        self.rom.write_8(addr + 1, self.height)
-        self.rom.write_bytes(addr + 2, comp_data)
-        self.comp_len = comp_len
+        """Compresses and writes the block data, even if no blocks changed."""
+        self.write_compressed(compress_cached(RLE, self.block_data))
+
+    def write_compressed(self, comp_data: bytes | bytearray) -> None:
+        """
+        Writes block data that was already compressed. If it grew, it's compressed again with
+        a slower encoder, and only repointed if it still doesn't fit.
+        """
+        with span("BlockLayer.write", "room", pointer=self.pointer):
+            comp_data = compress_to_fit(self.rom, RLE, self.block_data, comp_data, self.comp_len)
+            comp_len = len(comp_data)
+            addr = self.addr
+            if comp_len > self.comp_len:
+                # Repoint data
+                addr = self.addr = self.rom.reserve_free_space(comp_len + 2)
+                for ptr in self.pointers:
+                    self.rom.write_ptr(ptr, addr)
+            self.rom.write_8(addr, self.width)
+            self.rom.write_8(addr + 1, self.height)
+            self.rom.write_bytes(addr + 2, comp_data)
+            self.comp_len = comp_len
+            self._written_data = bytes(self.block_data)
+
+
+def load_block_layer(rom: Rom, ptr: int) -> BlockLayer:
+    """
+    Returns the block layer at the provided pointer. While the ROM's writes are deferred
+    (see flush.deferred_writes()), the layer is shared by every caller patching the ROM, so
+    it's only decompressed once, and it's written when the deferred writes are flushed
+    instead of when leaving a `with` block. Rooms whose pointers point to the same data get
+    the same layer, and writing it repoints all of them. Otherwise, a new layer is returned,
+    which is written when leaving a `with` block.
+    """
+    layers = _loaded_layers.get(rom)
+    if layers is None:
+        return BlockLayer(rom, ptr)
+    addr = rom.read_ptr(ptr)
+    layer = layers.get(addr)
+    if layer is None:
+        layer = layers[addr] = BlockLayer(rom, ptr)
+    elif ptr not in layer.pointers:
+        layer.pointers.append(ptr)
+    return layer
+
+
+def start_sharing_block_layers(rom: Rom) -> bool:
+    """
+    Makes load_block_layer() share layers of the ROM until stop_sharing_block_layers() is
+    called. Returns False if they were already shared.
+    """
+    if rom in _loaded_layers:
+        return False
+    _loaded_layers[rom] = {}
+    return True
+
+
+def stop_sharing_block_layers(rom: Rom) -> None:
+    """Stops sharing layers of the ROM. Shared layers that weren't written are discarded."""
+    _loaded_layers.pop(rom, None)
+
+
+def pending_block_layers(rom: Rom) -> dict[int, BlockLayer]:
+    """
+    Returns the shared layers of the ROM that changed but aren't written yet, by the first
+    pointer they were loaded from.
+    """
+    layers = _loaded_layers.get(rom, {}).values()
+    return {layer.pointer: layer for layer in layers if layer.is_dirty()}
+
+
+def pop_loaded_block_layers(rom: Rom) -> list[BlockLayer]:
+    """
+    Returns the shared layers of the ROM in load order, and forgets them. Layers loaded
+    later are decompressed again from the ROM.
+    """
+    layers = _loaded_layers.get(rom)
+    if layers is None:
+        return []
+    loaded = list(layers.values())
+    layers.clear()
+    return loaded
+
+
+def write_block_layers(rom: Rom) -> None:
+    """Writes every shared layer of the ROM that changed, and forgets them."""
+    for layer in pop_loaded_block_layers(rom):
+        if layer.is_dirty():
+            layer.write()
@@ -1,22 +1,42 @@
-from mars_patcher.auto_generated_types import Areaid, MarsschemaRoomnamesItem, Typeu8
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
 from mars_patcher.constants.reserved_space import ReservedConstants
-from mars_patcher.rom import Rom
 from mars_patcher.text import MessageType, encode_text
 
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from mars_patcher.auto_generated_types import MarsschemaRoomnamesItem
+    from mars_patcher.rom import Rom
+
 ROOM_NAMES_TABLE_ADDR = ReservedConstants.ROOM_NAMES_TABLE_ADDR
 
 
+@dataclass(frozen=True, slots=True)
+class RoomName:
+    area: int
+    room: int
+    name: str
+
+    @classmethod
+    def from_json(cls, data: MarsschemaRoomnamesItem) -> RoomName:
+        return cls(data["Area"], data["Room"], data["Name"])
+
+
 # Write Room Names to ROM
 # Assembly has:
 # - A list that contains pointers to area room names
 # - Area Room names are indexed by room id. This means some entries
 #   are never used, but this allows for easy lookup
-def write_room_names(rom: Rom, data: list[MarsschemaRoomnamesItem]) -> None:
-    seen_rooms: set[tuple[Areaid, Typeu8]] = set()
-    for room_name_entry in data:
-        area_id = room_name_entry["Area"]
-        room_id = room_name_entry["Room"]
-        room_name = room_name_entry["Name"]
+def write_room_names(rom: Rom, room_names: Sequence[RoomName]) -> None:
+    seen_rooms: set[tuple[int, int]] = set()
+    for room_name_entry in room_names:
+        area_id = room_name_entry.area
+        room_id = room_name_entry.room
+        room_name = room_name_entry.name
 
         # Check that the room wasn't already set
         assert (area_id, room_id) not in seen_rooms, "Duplicate room name provided."
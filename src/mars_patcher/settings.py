@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from frozendict import frozendict
+
+from mars_patcher.door_locks import parse_door_lock_data
+from mars_patcher.item_patcher import TankIncrements
+from mars_patcher.level_edits import parse_level_edits
+from mars_patcher.locations import LocationAssignments
+from mars_patcher.minimap import parse_minimap_edits
+from mars_patcher.room_names import RoomName
+from mars_patcher.starting import StartingItems, StartingLocation
+
+if TYPE_CHECKING:
+    from mars_patcher.auto_generated_types import MarsSchema
+    from mars_patcher.connections import ElevatorConnections, SectorShortcuts
+    from mars_patcher.credits import CreditsLine
+    from mars_patcher.door_locks import HatchLock
+    from mars_patcher.level_edits import LayerEdits
+    from mars_patcher.minimap import MinimapEdits
+    from mars_patcher.navigation_text import NavigationText, NavRoom, NavStationLockType
+    from mars_patcher.random_palettes import PaletteSettings
+
+
+@dataclass(frozen=True, slots=True)
+class PatchSettings:
+    """
+    Every option used when patching a ROM, parsed from patch data in a single step.
+    Instances are immutable, hashable and picklable. Options that are not set are None or
+    empty.
+    """
+
+    seed_hash: str
+    locations: LocationAssignments
+    required_metroid_count: int
+    starting_location: StartingLocation | None = None
+    starting_items: StartingItems | None = None
+    tank_increments: TankIncrements | None = None
+    elevator_connections: ElevatorConnections | None = None
+    sector_shortcuts: SectorShortcuts | None = None
+    door_locks: frozendict[tuple[int, int], HatchLock] = frozendict()
+    palettes: PaletteSettings | None = None
+    navigation_text: NavigationText | None = None
+    nav_station_locks: frozendict[NavRoom, NavStationLockType] = frozendict()
+    room_names: tuple[RoomName, ...] = ()
+    credits_text: tuple[CreditsLine, ...] = ()
+    anti_softlock_edits: bool = False
+    disable_demos: bool = False
+    skip_door_transitions: bool = False
+    stereo_default: bool = True
+    disable_music: bool = False
+    disable_sound_effects: bool = False
+    missile_limit: int | None = None
+    pbs_without_bombs: bool = False
+    unexplored_map: bool = False
+    reveal_hidden_tiles: bool = False
+    hide_doors_on_minimap: bool = False
+    level_edits: tuple[LayerEdits, ...] = ()
+    minimap_edits: tuple[MinimapEdits, ...] = ()
+
+    @classmethod
+    def from_json(cls, data: MarsSchema) -> PatchSettings:
+        """
+        Parses patch data into settings. This function assumes that the data satisfies the
+        needed schema. To validate it, use validate_patch_data().
+        """
+        # Modules for optional settings are imported when needed, to keep startup fast
+        palettes = None
+        if "Palettes" in data:
+            from mars_patcher.random_palettes import PaletteSettings
+
+            palettes = PaletteSettings.from_json(data["Palettes"])
+
+        elevator_connections = None
+        sector_shortcuts = None
+        if "ElevatorConnections" in data or "SectorShortcuts" in data:
+            from mars_patcher.connections import ElevatorConnections, SectorShortcuts
+
+            if "ElevatorConnections" in data:
+                elevator_connections = ElevatorConnections.from_json(data["ElevatorConnections"])
+            if "SectorShortcuts" in data:
+                sector_shortcuts = SectorShortcuts.from_json(data["SectorShortcuts"])
+
+        navigation_text = None
+        nav_station_locks: frozendict[NavRoom, NavStationLockType] = frozendict()
+        if data.get("NavigationText") or data.get("NavStationLocks"):
+            from mars_patcher.navigation_text import NavigationText
+
+            if nav_text := data.get("NavigationText"):
+                navigation_text = NavigationText.from_json(nav_text)
+            if nav_locks := data.get("NavStationLocks"):
+                nav_station_locks = NavigationText.parse_hint_security(nav_locks)
+
+        credits_text: tuple[CreditsLine, ...] = ()
+        if lines := data.get("CreditsText"):
+            from mars_patcher.credits import CreditsLine
+
+            credits_text = tuple(CreditsLine.from_json(line) for line in lines)
+
+        return cls(
+            seed_hash=data["SeedHash"],
+            locations=LocationAssignments.from_json(data["Locations"]),
+            required_metroid_count=data["RequiredMetroidCount"],
+            starting_location=(
+                StartingLocation.from_json(data["StartingLocation"])
+                if "StartingLocation" in data
+                else None
+            ),
+            starting_items=(
+                StartingItems.from_json(data["StartingItems"]) if "StartingItems" in data else None
+            ),
+            tank_increments=(
+                TankIncrements.from_json(data["TankIncrements"])
+                if "TankIncrements" in data
+                else None
+            ),
+            elevator_connections=elevator_connections,
+            sector_shortcuts=sector_shortcuts,
+            door_locks=parse_door_lock_data(data.get("DoorLocks", [])),
+            palettes=palettes,
+            navigation_text=navigation_text,
+            nav_station_locks=nav_station_locks,
+            room_names=tuple(RoomName.from_json(r) for r in data.get("RoomNames", [])),
+            credits_text=credits_text,
+            anti_softlock_edits=data.get("AntiSoftlockRoomEdits", False),
+            disable_demos=data.get("DisableDemos", False),
+            skip_door_transitions=data.get("SkipDoorTransitions", False),
+            stereo_default=data.get("StereoDefault", True),
+            disable_music=data.get("DisableMusic", False),
+            disable_sound_effects=data.get("DisableSoundEffects", False),
+            missile_limit=data.get("MissileLimit"),
+            pbs_without_bombs=data.get("PowerBombsWithoutBombs", False),
+            unexplored_map=data.get("UnexploredMap", False),
+            reveal_hidden_tiles=data.get("RevealHiddenTiles", False),
+            # The door colors are removed whenever the option is present, even if it's false
+            hide_doors_on_minimap="HideDoorsOnMinimap" in data,
+            level_edits=parse_level_edits(data.get("LevelEdits", {})),
+            minimap_edits=parse_minimap_edits(data.get("MinimapEdits", {})),
+        )
@@ -1,17 +1,86 @@
-from mars_patcher.auto_generated_types import MarsschemaStartingitems, MarsschemaStartinglocation
-from mars_patcher.constants.game_data import area_doors_ptrs, spriteset_ptrs, starting_equipment
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from mars_patcher.constants.game_data import spriteset_ptrs, starting_equipment
 from mars_patcher.constants.items import BEAM_FLAGS, MISSILE_BOMB_FLAGS, SUIT_MISC_FLAGS
 from mars_patcher.constants.reserved_space import ReservedConstants
-from mars_patcher.rom import Rom
+from mars_patcher.door_table import load_door_table
 from mars_patcher.room_entry import RoomEntry
 
+if TYPE_CHECKING:
+    from mars_patcher.auto_generated_types import (
+        MarsschemaStartingitems,
+        MarsschemaStartinglocation,
+    )
+    from mars_patcher.rom import Rom
+
 # Keep in sync with base patch
 STARTING_LOC_ADDR = ReservedConstants.STARTING_LOCATION_ADDR
 
 
-def set_starting_location(rom: Rom, data: MarsschemaStartinglocation) -> None:
-    area = data["Area"]
-    room = data["Room"]
+@dataclass(frozen=True, slots=True)
+class StartingLocation:
+    area: int
+    room: int
+    block_x: int
+    block_y: int
+
+    @classmethod
+    def from_json(cls, data: MarsschemaStartinglocation) -> StartingLocation:
+        return cls(data["Area"], data["Room"], data["BlockX"], data["BlockY"])
+
+
+@dataclass(frozen=True, slots=True)
+class StartingItems:
+    """Starting health, ammo and status flags, in the form they are written to the ROM."""
+
+    energy: int
+    missiles: int
+    power_bombs: int
+    beam_status: int
+    missile_bomb_status: int
+    suit_misc_status: int
+    level_status: int
+    map_status: int
+
+    @classmethod
+    def from_json(cls, data: MarsschemaStartingitems) -> StartingItems:
+        def get_ability_flags(ability_flags: dict[str, int]) -> int:
+            status = 0
+            for ability, flag in ability_flags.items():
+                if ability in abilities:
+                    status |= flag
+            return status
+
+        # Get ability status flags
+        abilities = data.get("Abilities", [])
+        # Get security level flags
+        levels = data.get("SecurityLevels", [0])
+        level_status = 0
+        for level in levels:
+            level_status |= 1 << level
+        # Get downloaded map flags
+        maps = data.get("DownloadedMaps", range(7))
+        map_status = 0
+        for map in maps:
+            map_status |= 1 << map
+        return cls(
+            data.get("Energy", 99),
+            data.get("Missiles", 10),
+            data.get("PowerBombs", 10),
+            get_ability_flags(BEAM_FLAGS),
+            get_ability_flags(MISSILE_BOMB_FLAGS),
+            get_ability_flags(SUIT_MISC_FLAGS),
+            level_status,
+            map_status,
+        )
+
+
+def set_starting_location(rom: Rom, location: StartingLocation) -> None:
+    area = location.area
+    room = location.room
     # Don't do anything for area 0 room 0
     if area == 0 and room == 0:
         return
@@ -23,8 +92,8 @@ def set_starting_location(rom: Rom, data: MarsschemaStartinglocation) -> None:
         x_pos, y_pos = pos
     else:
         # Convert block coordinates to actual position
-        x_pos = data["BlockX"] * 64 + 31
-        y_pos = data["BlockY"] * 64 + 63
+        x_pos = location.block_x * 64 + 31
+        y_pos = location.block_y * 64 + 63
     # Write to rom
     rom.write_8(STARTING_LOC_ADDR, area)
     rom.write_8(STARTING_LOC_ADDR + 1, room)
@@ -34,15 +103,7 @@ def set_starting_location(rom: Rom, data: MarsschemaStartinglocation) -> None:
 
 
 def find_door_in_room(rom: Rom, area: int, room: int) -> int:
-    door_addr = rom.read_ptr(area_doors_ptrs(rom) + area * 4)
-    door = None
-    for d in range(256):
-        if rom.read_8(door_addr) == 0:
-            break
-        if rom.read_8(door_addr + 1) == room:
-            door = d
-            break
-        door_addr += 0xC
+    door = load_door_table(rom).find_door_in_room(area, room)
     if door is None:
         raise ValueError(f"No door found for area {area} room {room:X}")
     return door
@@ -81,43 +142,16 @@ def find_save_pad_position(rom: Rom, area: int, room: int) -> tuple[int, int] |
     return None
 
 
-def set_starting_items(rom: Rom, data: MarsschemaStartingitems) -> None:
-    def get_ability_flags(ability_flags: dict[str, int]) -> int:
-        status = 0
-        for ability, flag in ability_flags.items():
-            if ability in abilities:
-                status |= flag
-        return status
-
-    # Get health/ammo amounts
-    energy = data.get("Energy", 99)
-    missiles = data.get("Missiles", 10)
-    power_bombs = data.get("PowerBombs", 10)
-    # Get ability status flags
-    abilities = data.get("Abilities", [])
-    beam_status = get_ability_flags(BEAM_FLAGS)
-    missile_bomb_status = get_ability_flags(MISSILE_BOMB_FLAGS)
-    suit_misc_status = get_ability_flags(SUIT_MISC_FLAGS)
-    # Get security level flags
-    levels = data.get("SecurityLevels", [0])
-    level_status = 0
-    for level in levels:
-        level_status |= 1 << level
-    # Get downloaded map flags
-    maps = data.get("DownloadedMaps", range(7))
-    map_status = 0
-    for map in maps:
-        map_status |= 1 << map
-    # Write to rom
+def set_starting_items(rom: Rom, items: StartingItems) -> None:
     addr = starting_equipment(rom)
-    rom.write_16(addr, energy)
-    rom.write_16(addr + 2, energy)
-    rom.write_16(addr + 4, missiles)
-    rom.write_16(addr + 6, missiles)
-    rom.write_8(addr + 8, power_bombs)
-    rom.write_8(addr + 9, power_bombs)
-    rom.write_8(addr + 0xA, beam_status)
-    rom.write_8(addr + 0xB, missile_bomb_status)
-    rom.write_8(addr + 0xC, suit_misc_status)
-    rom.write_8(addr + 0xD, level_status)
-    rom.write_8(addr + 0xE, map_status)
+    rom.write_16(addr, items.energy)
+    rom.write_16(addr + 2, items.energy)
+    rom.write_16(addr + 4, items.missiles)
+    rom.write_16(addr + 6, items.missiles)
+    rom.write_8(addr + 8, items.power_bombs)
+    rom.write_8(addr + 9, items.power_bombs)
+    rom.write_8(addr + 0xA, items.beam_status)
+    rom.write_8(addr + 0xB, items.missile_bomb_status)
+    rom.write_8(addr + 0xC, items.suit_misc_status)
+    rom.write_8(addr + 0xD, items.level_status)
+    rom.write_8(addr + 0xE, items.map_status)
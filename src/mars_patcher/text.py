@@ -5,6 +5,7 @@ from functools import cache
 from mars_patcher.constants.game_data import character_widths, file_screen_text_ptrs
 from mars_patcher.data import get_data_path
 from mars_patcher.rom import Region, Rom
+from mars_patcher.tracing import traced
 
 SPACE_CHAR = 0x40
 SPACE_TAG = 0x8000
@@ -38,6 +39,17 @@ class Language(Enum):
     SPANISH = 6
 
 
+LANG_ENUMS = {
+    "JapaneseKanji": Language.JAPANESE_KANJI,
+    "JapaneseHiragana": Language.JAPANESE_HIRAGANA,
+    "English": Language.ENGLISH,
+    "German": Language.GERMAN,
+    "French": Language.FRENCH,
+    "Italian": Language.ITALIAN,
+    "Spanish": Language.SPANISH,
+}
+
+
 class MessageType(Enum):
     """Message types for encoding."""
 
@@ -106,6 +118,7 @@ def center_text(rom: Rom, char_vals: list[int], max_width: int) -> None:
             line_start = index
 
 
+@traced("encode_text", "text")
 def encode_text(
     rom: Rom,
     message_type: MessageType,
@@ -220,19 +233,17 @@ def encode_text(
 
 def write_seed_hash(rom: Rom, seed_hash: str) -> None:
     char_map = get_char_map(rom.region)
-    lang_ptrs = file_screen_text_ptrs(rom)
-    for lang in Language:
+    lang_ptrs = rom.read_ptr_table(file_screen_text_ptrs(rom), len(Language))
+    for text_ptrs in lang_ptrs:
         # Get address of first text entry
-        text_ptrs = rom.read_ptr(lang_ptrs + lang.value * 4)
         addr = rom.read_ptr(text_ptrs)
         # Find newline after "SAMUS DATA"
         try:
-            line_len = next(i for i in range(20) if rom.read_16(addr + i * 2) == NEWLINE)
-        except StopIteration:
+            line_len = rom.read_u16_array(addr, 20).index(NEWLINE)
+        except ValueError:
             raise ValueError("Invalid file screen text data")
         pad_left = (line_len - 8) // 2
         pad_right = line_len - 8 - pad_left
         # Overwrite with seed hash
         string = (" " * pad_left) + seed_hash + (" " * pad_right)
-        for i, c in enumerate(string):
-            rom.write_16(addr + i * 2, char_map[c])
+        rom.write_u16_array(addr, [char_map[c] for c in string])
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import wraps
+from typing import TYPE_CHECKING, Any, Callable, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from os import PathLike
+    from types import TracebackType
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class Tracer:
+    """
+    Records nested spans and exports them in the Chrome trace event format, which can be
+    loaded in Perfetto or chrome://tracing.
+
+    All spans are recorded on a single track, since the stages of a patch run one after
+    another even when they run on different executor threads.
+    """
+
+    def __init__(self) -> None:
+        self.events: list[dict[str, Any]] = []
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+        self._origin = time.perf_counter_ns()
+
+    def add_span(
+        self, name: str, category: str, start_ns: int, end_ns: int, args: dict[str, Any]
+    ) -> None:
+        """Adds a complete event, with the start and end given by perf_counter_ns()."""
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start_ns - self._origin) / 1000,
+            "dur": (end_ns - start_ns) / 1000,
+            "pid": self.pid,
+            "tid": self.tid,
+        }
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    @contextmanager
+    def activate(self) -> Iterator[Tracer]:
+        """Makes this tracer record spans for the current context."""
+        token = _current_tracer.set(self)
+        try:
+            yield self
+        finally:
+            _current_tracer.reset(token)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"traceEvents": self.events, "displayTimeUnit": "ms"}
+
+    def write_json(self, path: str | PathLike[str]) -> None:
+        """Writes the recorded spans to a JSON file at the specified path."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+
+
+_current_tracer: ContextVar[Tracer | None] = ContextVar("_current_tracer", default=None)
+_NULL_SPAN: AbstractContextManager[None] = nullcontext()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "category", "args", "start")
+
+    def __init__(self, tracer: Tracer, name: str, category: str, args: dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = 0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter_ns()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        end = time.perf_counter_ns()
+        self.tracer.add_span(self.name, self.category, self.start, end, self.args)
+
+
+def span(name: str, category: str = "", **args: Any) -> AbstractContextManager[None]:
+    """
+    Returns a context manager that records a span while a tracer is active.
+    When no tracer is active, a shared no-op context manager is returned.
+    """
+    tracer = _current_tracer.get()
+    if tracer is None:
+        return _NULL_SPAN
+    return _Span(tracer, name, category, args)
+
+
+def traced(name: str, category: str = "") -> Callable[[F], F]:
+    """Decorator that records a span for every call while a tracer is active."""
+
+    def decorator(func: F) -> F:
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            tracer = _current_tracer.get()
+            if tracer is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                tracer.add_span(name, category, start, time.perf_counter_ns(), {})
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
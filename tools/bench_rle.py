@@ -0,0 +1,108 @@
+"""
+Measures RLE compression time and size over every room layer in the game.
+
+Each BG1, BG2 and clipdata layer is decompressed from the ROM and compressed again with
+comp_rle(), and with the previous encoder (fixed minimum run lengths of 3 and 4) for
+comparison. Every output is checked to decompress to the original data.
+
+Usage: python tools/bench_rle.py ROM_PATH [--base-patch] [--runs N] [--json OUT]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+from typing import Callable
+
+from mars_patcher.compress import _comp_rle_pass, _get_runs, comp_rle, decomp_rle
+from mars_patcher.door_table import DELETED_DOOR_ROOM, DoorTable
+from mars_patcher.rom import Rom
+from mars_patcher.room_entry import RoomEntry
+
+
+def comp_rle_fixed(input: bytes | bytearray) -> bytearray:
+    """The previous encoder, which writes every run of 3 (or 4) values or more as a run."""
+    output = bytearray()
+    for p in range(2):
+        values, counts = _get_runs(input, p)
+        output += min((_comp_rle_pass(values, counts, r, 3 + r) for r in range(2)), key=len)
+    return output
+
+
+def load_layers(rom: Rom) -> list[tuple[bytearray, int]]:
+    """Returns the data of every distinct room layer, with the size of its compressed data."""
+    addrs = set()
+    # Every room has at least one door
+    for area, room in DoorTable(rom).room_doors:
+        if room == DELETED_DOOR_ROOM:
+            continue
+        entry = RoomEntry(rom, area, room)
+        addrs.update((entry.bg1_addr(), entry.bg2_addr(), entry.clip_addr()))
+    # Skip the width and height
+    return [decomp_rle(rom.data, addr + 2) for addr in sorted(addrs)]
+
+
+def measure(
+    encoder: Callable[[bytes | bytearray], bytearray],
+    layers: list[tuple[bytearray, int]],
+    runs: int,
+) -> tuple[float, int]:
+    """Returns the median time to compress every layer in seconds, and the total size."""
+    times = []
+    size = 0
+    for _ in range(runs):
+        size = 0
+        start = time.perf_counter()
+        for data, _ in layers:
+            size += len(encoder(data))
+        times.append(time.perf_counter() - start)
+    for data, _ in layers:
+        comp_data = encoder(data)
+        if decomp_rle(comp_data, 0) != (data, len(comp_data)):
+            raise RuntimeError(f"{encoder.__name__} output does not decompress to the input")
+    return statistics.median(times), size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("rom_path", type=str, help="Path to a GBA ROM file")
+    parser.add_argument(
+        "--base-patch", action="store_true", help="Apply the base patch before measuring"
+    )
+    parser.add_argument("--runs", type=int, default=5, help="Number of times to compress")
+    parser.add_argument("--json", type=str, help="Write the results to a json file")
+    args = parser.parse_args()
+
+    rom = Rom(args.rom_path)
+    if args.base_patch:
+        from mars_patcher.misc_patches import apply_base_patch
+
+        apply_base_patch(rom)
+    layers = load_layers(rom)
+
+    results: dict[str, object] = {
+        "layers": len(layers),
+        "uncompressed_bytes": sum(len(data) for data, _ in layers),
+        "rom_bytes": sum(comp_len for _, comp_len in layers),
+    }
+    for name, encoder in (("comp_rle", comp_rle), ("fixed", comp_rle_fixed)):
+        seconds, size = measure(encoder, layers, args.runs)
+        results[f"{name}_seconds"] = seconds
+        results[f"{name}_bytes"] = size
+
+    print(f"layers: {results['layers']} ({results['uncompressed_bytes']} bytes uncompressed)")
+    print(f"in ROM: {results['rom_bytes']} bytes")
+    for name in ("comp_rle", "fixed"):
+        seconds = results[f"{name}_seconds"]
+        assert isinstance(seconds, float)
+        print(f"{name}: {results[f'{name}_bytes']} bytes, {seconds * 1000:.1f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Measures CLI startup and patch data validation time.
+
+Import time is measured the same way as `python -X importtime`, in fresh interpreters.
+Validation is timed for the first call (which loads the schema and builds the validator)
+and for later calls (which reuse it).
+
+Usage: python tools/bench_startup.py [--patch-data PATH] [--runs N] [--json OUT]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+IMPORT_TARGET = "mars_patcher.cli"
+
+VALIDATION_SCRIPT = """
+import json, sys, time
+from jsonschema.exceptions import ValidationError
+from mars_patcher.patcher import validate_patch_data
+
+path = sys.argv[1]
+if path:
+    with open(path, encoding="utf-8") as f:
+        patch_data = json.load(f)
+else:
+    patch_data = {"SeedHash": "AAAAAAAA"}
+times = []
+for _ in range(int(sys.argv[2])):
+    start = time.perf_counter()
+    try:
+        validate_patch_data(patch_data)
+    except ValidationError:
+        pass
+    times.append(time.perf_counter() - start)
+print(json.dumps(times))
+"""
+
+
+def measure_import_time(module: str) -> tuple[float, dict[str, float]]:
+    """Returns the cumulative import time of a module in seconds, along with the
+    cumulative time of each mars_patcher module it imported."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0.0
+    modules: dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        seconds = int(cumulative) / 1_000_000
+        name = name.strip()
+        if name == module:
+            total = seconds
+        if name.startswith("mars_patcher"):
+            modules[name] = seconds
+    return total, modules
+
+
+def measure_validation(patch_data_path: str | None, calls: int) -> list[float]:
+    result = subprocess.run(
+        [sys.executable, "-c", VALIDATION_SCRIPT, patch_data_path or "", str(calls)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--patch-data", type=str, help="Patch data json file to validate")
+    parser.add_argument("--runs", type=int, default=10, help="Number of fresh interpreters")
+    parser.add_argument("--json", type=str, help="Write the results to a json file")
+    args = parser.parse_args()
+
+    import_times = []
+    module_times: dict[str, list[float]] = {}
+    for _ in range(args.runs):
+        total, modules = measure_import_time(IMPORT_TARGET)
+        import_times.append(total)
+        for name, seconds in modules.items():
+            module_times.setdefault(name, []).append(seconds)
+
+    first_calls = []
+    later_calls = []
+    for _ in range(args.runs):
+        times = measure_validation(args.patch_data, 5)
+        first_calls.append(times[0])
+        later_calls.extend(times[1:])
+
+    results = {
+        "import_seconds": statistics.median(import_times),
+        "validation_first_call_seconds": statistics.median(first_calls),
+        "validation_later_call_seconds": statistics.median(later_calls),
+        "module_import_seconds": {
+            name: statistics.median(times) for name, times in module_times.items()
+        },
+    }
+
+    print(f"import {IMPORT_TARGET}: {results['import_seconds'] * 1000:.1f} ms")
+    print(f"validation (first call): {results['validation_first_call_seconds'] * 1000:.1f} ms")
+    print(f"validation (later calls): {results['validation_later_call_seconds'] * 1000:.1f} ms")
+    print("slowest mars_patcher imports (cumulative):")
+    slowest = sorted(results["module_import_seconds"].items(), key=lambda x: -x[1])[:10]
+    for name, seconds in slowest:
+        print(f"  {name}: {seconds * 1000:.1f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
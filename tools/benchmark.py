@@ -0,0 +1,502 @@
+"""
+Benchmarks the codecs, patch decoders, text encoding, palette math and full patching.
+
+Benchmarks run against a synthetic image from synthetic_rom.py by default, or against a
+ROM file. With a ROM file, the base patch is applied first if it's available, and the full
+patch benchmarks call patch() with the file. The synthetic image stands in for a ROM with
+the base patch already applied, so its full patch benchmarks run every stage after it.
+
+Each benchmark runs on a fresh copy of the ROM. The median time of the runs is reported,
+and can be compared against the results of an earlier run, saved with --json. Benchmarks
+more than a threshold slower than the baseline are reported as regressions, and make the
+script exit with status 1.
+
+Usage: python tools/benchmark.py [ROM_PATH] [--seed N] [--runs N] [--only NAME ...]
+       [--json OUT] [--baseline PATH] [--threshold FRACTION] [--threshold-for NAME=FRACTION]
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import fnmatch
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Callable
+
+from bench_rle import load_layers
+from patch_corpus import CORPUS_NAMES, make_patch_data, missing_patch_files
+from synthetic_rom import build_synthetic_rom
+
+import mars_patcher.constants.game_data as gd
+from mars_patcher.compress import comp_lz77, comp_rle, decomp_lz77, decomp_rle
+from mars_patcher.compression_cache import CompressionCache, set_compression_cache
+from mars_patcher.data import get_data_path
+from mars_patcher.patching import BpsDecoder, IpsDecoder, IpsEncoder
+from mars_patcher.rom import Rom
+
+DEFAULT_THRESHOLD = 0.1
+
+# Typical of the base patch: new code and data in the free space at the end of the ROM,
+# and small edits to existing code
+BPS_EDIT_COUNT = 2000
+BPS_BLOCK_SIZE = 0x40000
+IPS_RECORD_COUNT = 2000
+IPS_RLE_RECORD_COUNT = 200
+
+LONG_NAV_TEXT = " ".join(
+    [
+        "Samus, the [COLOR=2]Speed Booster[/COLOR] is in [COLOR=3]Sector 3 (PYR)[/COLOR].",
+        "Travel through the [COLOR=1]Main Deck[/COLOR] elevator, then go past the area",
+        "with the lava to find it. The [COLOR=2]Varia Suit[/COLOR] is guarded by a",
+        "[COLOR=3]Core-X[/COLOR] in Sector 1 (SRX). Proceed with caution.",
+    ]
+    * 4
+)
+
+
+@dataclass
+class Context:
+    """Data shared by every benchmark."""
+
+    data: bytearray
+    """Image the ROM of each run is loaded from, with the base patch applied."""
+    rom_path: str | None
+    """Path of the ROM file, or None if the image is synthetic."""
+    source: bytearray
+    """Image before the base patch. Synthetic images are their own source."""
+    base_patch: bytes | None
+    """The base patch, if the source is a ROM file and the patch is available."""
+    seed: int
+
+
+# Prepares a benchmark, and returns a function that runs it once on a fresh ROM
+Setup = Callable[[Context], Callable[[Rom], object]]
+
+
+@dataclass(frozen=True, slots=True)
+class Benchmark:
+    name: str
+    setup: Setup
+
+
+BENCHMARKS: list[Benchmark] = []
+
+
+def benchmark(name: str) -> Callable[[Setup], Setup]:
+    def decorator(func: Setup) -> Setup:
+        BENCHMARKS.append(Benchmark(name, func))
+        return func
+
+    return decorator
+
+
+def load_lz77_data(rom: Rom) -> list[bytearray]:
+    """Returns the data of every minimap, and graphics from the data directory."""
+    ptrs = gd.minimap_ptrs(rom)
+    data = [
+        decomp_lz77(rom.data, rom.read_ptr(ptrs + id * 4))[0] for id in range(gd.minimap_count(rom))
+    ]
+    with open(get_data_path("main_hub.gfx.lz"), "rb") as f:
+        data.append(decomp_lz77(f.read(), 0)[0])
+    return data
+
+
+def encode_bps_int(num: int) -> bytes:
+    output = bytearray()
+    while True:
+        x = num & 0x7F
+        num >>= 7
+        if num == 0:
+            output.append(0x80 | x)
+            return bytes(output)
+        output.append(x)
+        num -= 1
+
+
+def make_bps_patch(source: bytes | bytearray, seed: int) -> bytes:
+    """
+    Returns a BPS patch for the source, with random edits, data copied from elsewhere in
+    the source, and a block of new data at the end.
+    """
+    rng = random.Random(seed)
+    size = len(source)
+    block_start = size - BPS_BLOCK_SIZE * 2
+    edits = sorted(rng.sample(range(0x1000, block_start, 0x100), BPS_EDIT_COUNT))
+    actions = bytearray()
+    target = bytearray()
+    source_offset = 0
+    for addr in edits:
+        # Source read up to the edit
+        actions += encode_bps_int((addr - len(target) - 1) << 2)
+        target += source[len(target) : addr]
+        length = rng.randint(1, 0x40)
+        if rng.random() < 0.25:
+            # Source copy
+            copy_from = rng.randrange(0, size - length)
+            relative = copy_from - source_offset
+            actions += encode_bps_int(((length - 1) << 2) | 2)
+            actions += encode_bps_int((abs(relative) << 1) | (relative < 0))
+            target += source[copy_from : copy_from + length]
+            source_offset = copy_from + length
+        else:
+            # Target read
+            new_data = rng.randbytes(length)
+            actions += encode_bps_int(((length - 1) << 2) | 1)
+            actions += new_data
+            target += new_data
+    actions += encode_bps_int((block_start - len(target) - 1) << 2)
+    target += source[len(target) : block_start]
+    new_data = rng.randbytes(BPS_BLOCK_SIZE)
+    actions += encode_bps_int(((BPS_BLOCK_SIZE - 1) << 2) | 1)
+    actions += new_data
+    target += new_data
+    actions += encode_bps_int((size - len(target) - 1) << 2)
+    target += source[len(target) :]
+
+    patch = bytearray(b"BPS1")
+    patch += encode_bps_int(size) + encode_bps_int(size) + encode_bps_int(0)
+    patch += actions
+    patch += zlib.crc32(source).to_bytes(4, "little")
+    patch += zlib.crc32(target).to_bytes(4, "little")
+    patch += zlib.crc32(patch).to_bytes(4, "little")
+    return bytes(patch)
+
+
+def make_ips_patch(size: int, seed: int) -> bytes:
+    """Returns an IPS patch with random data records and RLE records."""
+    rng = random.Random(seed)
+    patch = bytearray(b"PATCH")
+    records = [(False, addr) for addr in rng.sample(range(0, size - 0x100), IPS_RECORD_COUNT)]
+    for addr in rng.sample(range(0, size - 0x1000), IPS_RLE_RECORD_COUNT):
+        records.append((True, addr))
+    for rle, addr in sorted(records):
+        # Addresses that spell EOF end the patch
+        if addr == 0x454F46:
+            continue
+        patch += addr.to_bytes(3, "big")
+        if rle:
+            patch += bytes(2) + rng.randint(1, 0x1000).to_bytes(2, "big")
+            patch.append(rng.getrandbits(8))
+        else:
+            length = rng.randint(1, 0x100)
+            patch += length.to_bytes(2, "big") + rng.randbytes(length)
+    patch += b"EOF"
+    return bytes(patch)
+
+
+@benchmark("comp_rle")
+def _comp_rle(ctx: Context) -> Callable[[Rom], object]:
+    layers = [data for data, _ in load_layers(Rom.from_bytes(ctx.data))]
+    return lambda rom: [comp_rle(layer) for layer in layers]
+
+
+@benchmark("decomp_rle")
+def _decomp_rle(ctx: Context) -> Callable[[Rom], object]:
+    layers = load_layers(Rom.from_bytes(ctx.data))
+    comp_layers = [comp_rle(data) for data, _ in layers]
+    return lambda rom: [decomp_rle(comp_data, 0) for comp_data in comp_layers]
+
+
+@benchmark("comp_lz77")
+def _comp_lz77(ctx: Context) -> Callable[[Rom], object]:
+    data = load_lz77_data(Rom.from_bytes(ctx.data))
+    return lambda rom: [comp_lz77(d) for d in data]
+
+
+@benchmark("decomp_lz77")
+def _decomp_lz77(ctx: Context) -> Callable[[Rom], object]:
+    comp_data = [comp_lz77(d) for d in load_lz77_data(Rom.from_bytes(ctx.data))]
+    return lambda rom: [decomp_lz77(d, 0) for d in comp_data]
+
+
+@benchmark("BpsDecoder.apply_patch")
+def _bps(ctx: Context) -> Callable[[Rom], object]:
+    if ctx.base_patch is not None:
+        patch, source = ctx.base_patch, bytes(ctx.source)
+    else:
+        patch, source = make_bps_patch(ctx.source, ctx.seed), bytes(ctx.source)
+    return lambda rom: BpsDecoder().apply_patch(patch, source)
+
+
+@benchmark("IpsDecoder.apply_patch")
+def _ips(ctx: Context) -> Callable[[Rom], object]:
+    patch = make_ips_patch(len(ctx.data), ctx.seed)
+    return lambda rom: IpsDecoder().apply_patch(patch, rom.data)
+
+
+@benchmark("IpsEncoder.create_patch")
+def _ips_encode(ctx: Context) -> Callable[[Rom], object]:
+    decoder = IpsDecoder()
+    patch = make_ips_patch(len(ctx.data), ctx.seed)
+    target = bytearray(ctx.data)
+    decoder.apply_patch(patch, target)
+    ranges = [(addr, addr + len(data)) for addr, data in decoder.read_records(patch)]
+    return lambda rom: IpsEncoder().create_patch(target, ranges)
+
+
+@benchmark("encode_text")
+def _encode_text(ctx: Context) -> Callable[[Rom], object]:
+    from mars_patcher.navigation_text import NavRoom
+    from mars_patcher.text import MessageType, encode_text
+
+    def run(rom: Rom) -> object:
+        return [encode_text(rom, MessageType.CONTINUOUS, LONG_NAV_TEXT) for _ in NavRoom]
+
+    return run
+
+
+def _tileset_palettes(rom: Rom) -> list[tuple[int, int]]:
+    # Tileset palettes have 13 rows
+    return [
+        (rom.read_ptr(gd.tileset_entries(rom) + id * 0x14 + 4), 13)
+        for id in range(gd.tileset_count(rom))
+    ]
+
+
+@benchmark("Palette.shift_hue_oklab")
+def _shift_hue_oklab(ctx: Context) -> Callable[[Rom], object]:
+    from mars_patcher.palette import Palette
+
+    def run(rom: Rom) -> object:
+        for addr, rows in _tileset_palettes(rom):
+            Palette(rows, rom, addr).shift_hue_oklab(120, set())
+        return None
+
+    return run
+
+
+@benchmark("Palette.shift_hue_hsv")
+def _shift_hue_hsv(ctx: Context) -> Callable[[Rom], object]:
+    from mars_patcher.palette import Palette
+
+    def run(rom: Rom) -> object:
+        for addr, rows in _tileset_palettes(rom):
+            Palette(rows, rom, addr).shift_hue_hsv(120, set())
+        return None
+
+    return run
+
+
+@benchmark("set_door_locks")
+def _set_door_locks(ctx: Context) -> Callable[[Rom], object]:
+    from mars_patcher.door_locks import set_door_locks
+    from mars_patcher.settings import PatchSettings
+
+    settings = PatchSettings.from_json(make_patch_data("typical", ctx.seed))  # type: ignore[arg-type]
+    return lambda rom: set_door_locks(rom, settings.door_locks)
+
+
+@benchmark("ItemPatcher.write_items")
+def _write_items(ctx: Context) -> Callable[[Rom], object]:
+    from mars_patcher.item_patcher import ItemPatcher
+    from mars_patcher.locations import LocationSettings
+    from mars_patcher.settings import PatchSettings
+
+    settings = PatchSettings.from_json(make_patch_data("typical", ctx.seed))  # type: ignore[arg-type]
+    loc_settings = LocationSettings.initialize()
+    loc_settings.set_assignments(settings.locations)
+    return lambda rom: ItemPatcher(rom, loc_settings).write_items()
+
+
+def _patch_benchmark(name: str) -> Setup:
+    def setup(ctx: Context) -> Callable[[Rom], object]:
+        from mars_patcher.flush import deferred_writes
+        from mars_patcher.patcher import get_patch_stages, patch
+        from mars_patcher.settings import PatchSettings
+
+        patch_data = make_patch_data(name, ctx.seed)
+        missing = missing_patch_files(patch_data)
+        if missing:
+            raise FileNotFoundError(f"Missing patch files: {', '.join(missing)}")
+
+        rom_path = ctx.rom_path
+        if rom_path is not None and ctx.base_patch is not None:
+            out_dir = tempfile.mkdtemp()
+
+            def run_file(rom: Rom) -> object:
+                out_path = os.path.join(out_dir, "out.gba")
+                # patch() prints a notice when done
+                with contextlib.redirect_stdout(io.StringIO()):
+                    patch(rom_path, out_path, patch_data, lambda message, progress: None)  # type: ignore[arg-type]
+                return None
+
+            return run_file
+
+        def run_stages(rom: Rom) -> object:
+            settings = PatchSettings.from_json(patch_data)  # type: ignore[arg-type]
+            # The image already has the base patch applied
+            with deferred_writes(rom):
+                for stage in get_patch_stages(settings)[1:]:
+                    stage.apply(rom)
+            return None
+
+        return run_stages
+
+    return setup
+
+
+for _name in CORPUS_NAMES:
+    BENCHMARKS.append(Benchmark(f"patch:{_name}", _patch_benchmark(_name)))
+
+
+def load_context(rom_path: str | None, seed: int) -> Context:
+    if rom_path is None:
+        data = build_synthetic_rom(seed)
+        return Context(data, None, data, None, seed)
+
+    from mars_patcher.misc_patches import apply_base_patch
+
+    rom = Rom(rom_path)
+    source = rom.data
+    try:
+        apply_base_patch(rom)
+    except FileNotFoundError:
+        print("Base patch not found, benchmarking the ROM without it", file=sys.stderr)
+        return Context(source, rom_path, source, None, seed)
+    path = get_data_path("patches", "mf_u", "asm", "m4rs.bps")
+    with open(path, "rb") as f:
+        base_patch = f.read()
+    return Context(rom.data, rom_path, source, base_patch, seed)
+
+
+def measure(bench: Benchmark, ctx: Context, runs: int) -> list[float]:
+    """Returns the time of each run in seconds. A run that isn't timed happens first."""
+    run = bench.setup(ctx)
+    times = []
+    for i in range(runs + 1):
+        rom = Rom.from_bytes(ctx.data)
+        # Start each run with an empty cache, like a new process
+        set_compression_cache(CompressionCache())
+        start = time.perf_counter()
+        run(rom)
+        elapsed = time.perf_counter() - start
+        if i > 0:
+            times.append(elapsed)
+    return times
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    threshold: float,
+    thresholds: dict[str, float],
+) -> list[str]:
+    """Prints the change from the baseline, and returns the names of regressed benchmarks."""
+    regressions = []
+    print("compared to baseline:")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"  {name}: not in baseline")
+            continue
+        ratio = result["median_seconds"] / base["median_seconds"]
+        limit = thresholds.get(name, threshold)
+        status = ""
+        if ratio > 1 + limit:
+            status = f"  REGRESSION (threshold {limit:+.0%})"
+            regressions.append(name)
+        print(f"  {name}: {ratio - 1:+.1%}{status}")
+    return regressions
+
+
+def parse_thresholds(values: list[str]) -> dict[str, float]:
+    thresholds = {}
+    for value in values:
+        name, sep, fraction = value.rpartition("=")
+        if not sep:
+            raise ValueError(f"Expected NAME=FRACTION, got '{value}'")
+        thresholds[name] = float(fraction)
+    return thresholds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("rom_path", type=str, nargs="?", help="Path to a GBA ROM file")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for generated data")
+    parser.add_argument("--runs", type=int, default=5, help="Number of timed runs")
+    parser.add_argument(
+        "--only", type=str, nargs="+", help="Only run benchmarks matching these patterns"
+    )
+    parser.add_argument("--list", action="store_true", help="List the benchmarks and exit")
+    parser.add_argument("--json", type=str, help="Write the results to a json file")
+    parser.add_argument("--baseline", type=str, help="Results json file to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Fraction slower than the baseline that counts as a regression",
+    )
+    parser.add_argument(
+        "--threshold-for",
+        type=str,
+        action="append",
+        default=[],
+        metavar="NAME=FRACTION",
+        help="Threshold for a single benchmark",
+    )
+    args = parser.parse_args()
+
+    benchmarks = BENCHMARKS
+    if args.only:
+        benchmarks = [
+            b for b in benchmarks if any(fnmatch.fnmatchcase(b.name, p) for p in args.only)
+        ]
+    if args.list:
+        for bench in benchmarks:
+            print(bench.name)
+        return
+    thresholds = parse_thresholds(args.threshold_for)
+
+    ctx = load_context(args.rom_path, args.seed)
+    results: dict[str, dict[str, float]] = {}
+    skipped: dict[str, str] = {}
+    for bench in benchmarks:
+        try:
+            times = measure(bench, ctx, args.runs)
+        except FileNotFoundError as e:
+            skipped[bench.name] = str(e)
+            print(f"{bench.name}: skipped ({e})")
+            continue
+        results[bench.name] = {
+            "median_seconds": statistics.median(times),
+            "min_seconds": min(times),
+        }
+        print(f"{bench.name}: {results[bench.name]['median_seconds'] * 1000:.1f} ms")
+
+    output = {
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "rom": args.rom_path or f"synthetic (seed {args.seed})",
+        },
+        "runs": args.runs,
+        "benchmarks": results,
+        "skipped": skipped,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["environment"]["rom"] != output["environment"]["rom"]:
+            print("Warning: the baseline was measured with a different ROM", file=sys.stderr)
+        regressions = compare(results, baseline["benchmarks"], args.threshold, thresholds)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Compiles the option patches into one bundle that the patcher loads once per process.
+
+The IPS patches of options like stereo_default and anti_softlock are compiled into
+(address, data) records and saved next to the assembly patches. Options that write
+different values to the same byte are an error, since the result would depend on the order
+they're applied in, and this includes the fixed writes of options like disable_demos. Options
+whose patch file is missing are left out of the bundle, and are read from the file if it's
+added later. The patcher loads bundled options without reading their patch files, so run
+this again after changing any of the patches; pull-assembly-patches.py runs it after
+fetching them. With --check, nothing is written, and it fails if the bundle is out of date.
+
+Usage: python tools/build_option_patches.py [--patches-dir DIR] [--check]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+
+from mars_patcher.option_patches import BUNDLE_NAME, build_option_bundle, find_stale_options
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--patches-dir", type=str, default="mf_u", help="Folder of the patches in data/patches"
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Fail if the bundle is out of date instead of building it",
+    )
+    args = parser.parse_args()
+
+    if args.check:
+        stale = find_stale_options(args.patches_dir)
+        if stale:
+            sys.exit(f"{BUNDLE_NAME} is out of date:\n" + "\n".join(stale))
+        print(f"{BUNDLE_NAME} is up to date")
+        return
+
+    try:
+        options = build_option_bundle(args.patches_dir)
+    except ValueError as e:
+        sys.exit(str(e))
+    for option, records in options.items():
+        size = sum(len(data) for _, data in records)
+        print(f"{option}: {len(records)} records, {size} bytes")
+    print(f"Wrote {len(options)} options to {BUNDLE_NAME}")
+
+
+if __name__ == "__main__":
+    main()
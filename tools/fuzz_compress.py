@@ -0,0 +1,589 @@
+"""
+Fuzzes the RLE and LZ77 codecs and the IPS encoder, checking that everything compressed
+decompresses to the input.
+
+Inputs are generated from a seed: random data, data with few distinct values, and inputs
+built to hit the edges of each format. For RLE, these are runs and literal stretches around
+the 1 and 2 byte length limits, odd numbers of values, and inputs with an odd number of
+bytes, which the format can't store and decomp_rle() must reject. For LZ77, these are
+repeats just inside and outside the 4 KB window, matches around the maximum length, runs
+that copy from one byte back, and inputs that wrap the match finder's ring buffer. For IPS,
+these are runs around the lengths where an RLE record becomes smaller than writing the run as
+data, at the start, middle and end of the input.
+
+Besides the round trip, comp_rle_best() and comp_lz77_best() are checked to never be larger
+than comp_rle() and comp_lz77(), iter_comp_lz77() to match comp_lz77(), and IPS patches to
+never be larger than one written with only data records. Output sizes are
+compared with reference encoders: the previous RLE encoder by default, or the functions of
+an older compress.py passed with --reference, whose decoders must also read the new output.
+
+Each codec runs for a fixed time budget, and its compression and decompression throughput
+is reported. Like benchmark.py, results can be saved with --json and compared against with
+--baseline. Failing inputs are saved with --save-failures and can be checked again with
+--replay. The script exits with status 1 on any failure or throughput regression.
+
+Usage: python tools/fuzz_compress.py [--seed N] [--seconds S] [--codec NAME ...]
+       [--reference PATH] [--save-failures DIR] [--replay PATH ...]
+       [--json OUT] [--baseline PATH] [--threshold FRACTION]
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from bench_rle import comp_rle_fixed
+
+from mars_patcher.compress import (
+    MAX_MATCH_SIZE,
+    MAX_WINDOW_SIZE,
+    MIN_MATCH_SIZE,
+    comp_lz77,
+    comp_lz77_best,
+    comp_rle,
+    comp_rle_best,
+    decomp_lz77,
+    decomp_rle,
+    iter_comp_lz77,
+)
+from mars_patcher.patching import IPS_MAX_SIZE, IpsDecoder, IpsEncoder
+
+Encoder = Callable[[bytes], "bytes | bytearray"]
+Decoder = Callable[[bytes | bytearray, int], tuple[bytearray, int]]
+Generator = Callable[[random.Random], bytes]
+
+# Fraction of throughput lost compared to the baseline that counts as a regression. Inputs
+# are random, so this is looser than the benchmark threshold
+DEFAULT_THRESHOLD = 0.2
+# Largest size of most generated inputs
+MAX_INPUT_SIZE = 0x3000
+# Run and literal lengths around the limits of 1 and 2 byte RLE lengths
+RLE_EDGE_LENS = (1, 2, 3, 4, 0x7E, 0x7F, 0x80, 0x81, 0xFE, 0xFF, 0x100, 0x7FFE, 0x7FFF, 0x8000)
+# Size of the ring buffer of positions in the LZ77 match finder
+LZ77_RING_SIZE = 0x2000
+# Run lengths around where IPS RLE records become smaller, with data on neither, one or
+# both sides
+IPS_RUN_LENS = (1, 2, 3, 4, 5, 7, 8, 9, 10, 12, 13, 14, 15, 0xFFFF, 0x10000)
+
+
+def _interleave(low: bytes, high: bytes) -> bytes:
+    """Returns the bytes of two RLE passes of equal length, as they are before compression."""
+    output = bytearray(len(low) * 2)
+    output[0::2] = low
+    output[1::2] = high
+    return bytes(output)
+
+
+def _random_bytes(rng: random.Random, size: int) -> bytes:
+    return rng.randbytes(size)
+
+
+def _literals(rng: random.Random, size: int) -> bytes:
+    """Returns values that never repeat the one before them."""
+    output = bytearray()
+    prev = -1
+    for _ in range(size):
+        val = rng.randrange(0xFF)
+        if val >= prev:
+            val += 1
+        val &= 0xFF
+        output.append(val)
+        prev = val
+    return bytes(output)
+
+
+def gen_random(rng: random.Random) -> bytes:
+    return _random_bytes(rng, rng.randrange(1, MAX_INPUT_SIZE))
+
+
+def gen_tiny(rng: random.Random) -> bytes:
+    return _random_bytes(rng, rng.randrange(1, 9))
+
+
+def gen_small_alphabet(rng: random.Random) -> bytes:
+    alphabet = _random_bytes(rng, rng.randrange(1, 5))
+    return bytes(rng.choices(alphabet, k=rng.randrange(1, MAX_INPUT_SIZE)))
+
+
+def gen_tilemap(rng: random.Random) -> bytes:
+    """Returns 16-bit values in rows, with repeated rows and tiles, like a room layer."""
+    width = rng.randrange(1, 0x40)
+    tiles = [rng.randrange(0x400) for _ in range(rng.randrange(1, 16))]
+    rows: list[bytes] = []
+    for _ in range(rng.randrange(1, 0x40)):
+        if rows and rng.random() < 0.4:
+            rows.append(rng.choice(rows))
+            continue
+        row = bytearray()
+        val = rng.choice(tiles)
+        for _ in range(width):
+            if rng.random() < 0.3:
+                val = rng.choice(tiles)
+            row += val.to_bytes(2, "little")
+        rows.append(bytes(row))
+    return b"".join(rows)
+
+
+def _rle_pass(rng: random.Random, size: int) -> bytes:
+    """Returns the data of an RLE pass, made of runs and literal stretches of edge lengths."""
+    output = bytearray()
+    while len(output) < size:
+        length = rng.choice(RLE_EDGE_LENS[:10]) if rng.random() < 0.9 else rng.randrange(1, 8)
+        if rng.random() < 0.5:
+            output += bytes((rng.randrange(0x100),)) * length
+        else:
+            output += _literals(rng, length)
+    return bytes(output[:size])
+
+
+def gen_rle_edges(rng: random.Random) -> bytes:
+    size = rng.randrange(1, MAX_INPUT_SIZE // 2)
+    return _interleave(_rle_pass(rng, size), _rle_pass(rng, size))
+
+
+def gen_rle_long_runs(rng: random.Random) -> bytes:
+    """Returns passes with a run or literal stretch around the limit of 2 byte lengths."""
+    length = rng.choice(RLE_EDGE_LENS[-3:]) + rng.randrange(-1, 2)
+    low = bytes((rng.randrange(0x100),)) * length
+    high = _literals(rng, length) if rng.random() < 0.5 else low
+    return _interleave(low, high)
+
+
+def gen_rle_odd_values(rng: random.Random) -> bytes:
+    """Returns an odd number of 16-bit values, with runs of odd lengths."""
+    count = rng.randrange(0, MAX_INPUT_SIZE // 4) * 2 + 1
+    passes = []
+    for _ in range(2):
+        output = bytearray()
+        while len(output) < count:
+            output += bytes((rng.randrange(0x100),)) * (rng.randrange(0, 0x50) * 2 + 1)
+        passes.append(bytes(output[:count]))
+    return _interleave(passes[0], passes[1])
+
+
+def gen_rle_odd_bytes(rng: random.Random) -> bytes:
+    return _random_bytes(rng, rng.randrange(0, MAX_INPUT_SIZE // 2) * 2 + 1)
+
+
+def gen_lz77_window(rng: random.Random) -> bytes:
+    """Returns a block repeated just inside or outside the window, with random data between."""
+    block = _random_bytes(rng, rng.randrange(MIN_MATCH_SIZE, MAX_MATCH_SIZE + 2))
+    distance = MAX_WINDOW_SIZE + rng.randrange(-2, 3)
+    prefix = _random_bytes(rng, rng.randrange(0, 0x100))
+    filler = _random_bytes(rng, distance - len(block))
+    suffix = _random_bytes(rng, rng.randrange(0, 0x10))
+    return prefix + block + filler + block + suffix
+
+
+def gen_lz77_max_match(rng: random.Random) -> bytes:
+    """Returns repeats around the maximum match length, including runs of one byte."""
+    period = rng.choice((1, 2, 3, MAX_MATCH_SIZE - 1, MAX_MATCH_SIZE, MAX_MATCH_SIZE + 1))
+    pattern = _random_bytes(rng, period)
+    output = bytearray(_random_bytes(rng, rng.randrange(0, 4)))
+    for _ in range(rng.randrange(1, 20)):
+        copies = MAX_MATCH_SIZE * rng.randrange(1, 4) + rng.randrange(-1, 2)
+        output += (pattern * (copies // period + 2))[:copies]
+        # Break the repeat so the next match has to start again
+        output += _literals(rng, rng.randrange(1, 3))
+    return bytes(output)
+
+
+def gen_lz77_ring_wrap(rng: random.Random) -> bytes:
+    """Returns repetitive data longer than the match finder's ring buffer."""
+    size = LZ77_RING_SIZE * rng.randrange(1, 3) + rng.randrange(-4, 5)
+    alphabet = _random_bytes(rng, rng.randrange(2, 6))
+    return bytes(rng.choices(alphabet, k=size))
+
+
+def gen_ips_runs(rng: random.Random) -> bytes:
+    output = bytearray()
+    # Start with a run or with data, to cover runs at the start
+    run = rng.random() < 0.5
+    for _ in range(rng.randint(1, 6)):
+        if run:
+            output += bytes([rng.getrandbits(8)]) * rng.choice(IPS_RUN_LENS)
+        else:
+            output += _literals(rng, rng.choice((1, 2, 3, 8, 0x40)))
+        run = not run
+    return bytes(output)
+
+
+COMMON_GENERATORS: dict[str, Generator] = {
+    "random": gen_random,
+    "tiny": gen_tiny,
+    "small_alphabet": gen_small_alphabet,
+    "tilemap": gen_tilemap,
+}
+RLE_GENERATORS: dict[str, Generator] = {
+    **COMMON_GENERATORS,
+    "rle_edges": gen_rle_edges,
+    "rle_long_runs": gen_rle_long_runs,
+    "rle_odd_values": gen_rle_odd_values,
+    "rle_odd_bytes": gen_rle_odd_bytes,
+}
+LZ77_GENERATORS: dict[str, Generator] = {
+    **COMMON_GENERATORS,
+    "lz77_window": gen_lz77_window,
+    "lz77_max_match": gen_lz77_max_match,
+    "lz77_ring_wrap": gen_lz77_ring_wrap,
+}
+
+
+IPS_GENERATORS: dict[str, Generator] = {
+    **COMMON_GENERATORS,
+    "ips_runs": gen_ips_runs,
+}
+
+
+def _iter_comp_lz77_small_chunks(input: bytes) -> bytes:
+    return b"".join(iter_comp_lz77(memoryview(input), chunk_size=0x40))
+
+
+def ips_encode(input: bytes) -> bytes:
+    return IpsEncoder().create_patch(input, [(0, len(input))])
+
+
+def ips_data_records(input: bytes) -> bytes:
+    """Returns an IPS patch that writes the input with only data records."""
+    patch = bytearray(b"PATCH")
+    for addr in range(0, len(input), IPS_MAX_SIZE):
+        chunk = input[addr : addr + IPS_MAX_SIZE]
+        patch += addr.to_bytes(3, "big") + len(chunk).to_bytes(2, "big") + chunk
+    patch += b"EOF"
+    return bytes(patch)
+
+
+def ips_decode(patch: bytes | bytearray, addr: int) -> tuple[bytearray, int]:
+    """Applies a patch to zeros, as long as the last address it writes."""
+    records = IpsDecoder().read_records(bytes(patch[addr:]))
+    output = bytearray(max((a + len(data) for a, data in records), default=0))
+    IpsDecoder().apply_patch(bytes(patch[addr:]), output)
+    return output, len(patch) - addr
+
+
+@dataclass(frozen=True)
+class Codec:
+    name: str
+    comp: Encoder
+    decomp: Decoder
+    generators: dict[str, Generator]
+    # Encoder whose output this one's is never larger than
+    not_larger_than: Encoder | None = None
+    # Encoder whose output this one's is always equal to
+    same_as: Encoder | None = None
+
+
+CODECS = {
+    c.name: c
+    for c in (
+        Codec("comp_rle", comp_rle, decomp_rle, RLE_GENERATORS),
+        Codec("comp_rle_best", comp_rle_best, decomp_rle, RLE_GENERATORS, comp_rle),
+        Codec("comp_lz77", comp_lz77, decomp_lz77, LZ77_GENERATORS),
+        Codec("comp_lz77_best", comp_lz77_best, decomp_lz77, LZ77_GENERATORS, comp_lz77),
+        Codec(
+            "iter_comp_lz77",
+            _iter_comp_lz77_small_chunks,
+            decomp_lz77,
+            LZ77_GENERATORS,
+            same_as=comp_lz77,
+        ),
+        Codec("ips_encode", ips_encode, ips_decode, IPS_GENERATORS, ips_data_records),
+    )
+}
+
+
+@dataclass(frozen=True)
+class Reference:
+    """An encoder to compare output sizes with, and optionally a decoder to read the output."""
+
+    label: str
+    comp: Encoder
+    decomp: Decoder | None = None
+
+
+def load_references(path: str | None) -> dict[str, Reference]:
+    """
+    Returns the reference for each codec. Without a path, RLE is compared with the previous
+    encoder. With a path to an older compress.py, each codec is compared with the function
+    of the same name, if it has one, and its output must be readable by the old decoders.
+    """
+    if path is None:
+        fixed = Reference("fixed run lengths", comp_rle_fixed)
+        return {"comp_rle": fixed, "comp_rle_best": fixed}
+
+    spec = importlib.util.spec_from_file_location("reference_compress", path)
+    if spec is None or spec.loader is None:
+        raise ValueError(f"Can't load {path}")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    label = os.path.basename(path)
+    references = {}
+    for name, codec in CODECS.items():
+        decoder_name = "decomp_rle" if codec.decomp is decomp_rle else "decomp_lz77"
+        # Streaming output is the same as comp_lz77()
+        encoder_name = "comp_lz77" if name == "iter_comp_lz77" else name
+        if hasattr(module, encoder_name):
+            references[name] = Reference(
+                f"{label} {encoder_name}",
+                getattr(module, encoder_name),
+                getattr(module, decoder_name, None),
+            )
+    return references
+
+
+@dataclass
+class Result:
+    cases: int = 0
+    input_bytes: int = 0
+    comp_bytes: int = 0
+    comp_seconds: float = 0.0
+    decomp_seconds: float = 0.0
+    reference_bytes: int = 0
+    larger_than_reference: int = 0
+    failures: list[dict[str, Any]] = field(default_factory=list)
+
+
+def _expect_rejected(codec: Codec, comp_data: bytes | bytearray) -> str | None:
+    """Returns an error if the data is decompressed, for inputs the format can't store."""
+    try:
+        codec.decomp(comp_data, 0)
+    except (ValueError, IndexError):
+        return None
+    return "output of an odd number of bytes was not rejected"
+
+
+def check_case(codec: Codec, data: bytes, reference: Reference | None, result: Result) -> list[str]:
+    """Compresses one input, checks it and adds its measurements. Returns the errors found."""
+    start = time.perf_counter()
+    try:
+        comp_data = codec.comp(data)
+    except Exception as e:
+        return [f"compressing raised {type(e).__name__}: {e}"]
+    result.comp_seconds += time.perf_counter() - start
+
+    if codec.decomp is decomp_rle and len(data) % 2 != 0:
+        # RLE stores two passes of equal length, so an odd number of bytes can't round trip
+        error = _expect_rejected(codec, comp_data)
+        return [error] if error else []
+
+    result.cases += 1
+    result.input_bytes += len(data)
+    result.comp_bytes += len(comp_data)
+    errors = []
+    start = time.perf_counter()
+    try:
+        decomp = codec.decomp(comp_data, 0)
+    except Exception as e:
+        errors.append(f"decompressing raised {type(e).__name__}: {e}")
+    else:
+        result.decomp_seconds += time.perf_counter() - start
+        if decomp[0] != data:
+            errors.append("output does not decompress to the input")
+        elif decomp[1] != len(comp_data):
+            errors.append(f"compressed size read as {decomp[1]}, expected {len(comp_data)}")
+
+    if codec.not_larger_than is not None:
+        other = codec.not_larger_than(data)
+        if len(comp_data) > len(other):
+            name = codec.not_larger_than.__name__
+            errors.append(f"output is {len(comp_data)} bytes, but {name}() gives {len(other)}")
+    if codec.same_as is not None and bytes(comp_data) != bytes(codec.same_as(data)):
+        errors.append(f"output differs from {codec.same_as.__name__}()")
+
+    if reference is not None:
+        ref_size = len(reference.comp(data))
+        result.reference_bytes += ref_size
+        if len(comp_data) > ref_size:
+            result.larger_than_reference += 1
+        if reference.decomp is not None:
+            try:
+                if reference.decomp(comp_data, 0)[0] != data:
+                    errors.append(f"{reference.label} decoder reads different data")
+            except Exception as e:
+                errors.append(f"{reference.label} decoder raised {type(e).__name__}: {e}")
+    return errors
+
+
+def fuzz_codec(
+    codec: Codec,
+    seed: int,
+    seconds: float,
+    reference: Reference | None,
+    failures_dir: str | None,
+) -> Result:
+    """
+    Checks generated inputs until the time budget is spent. Every generator is used at least
+    once, and case i of a codec is the same for the same seed.
+    """
+    result = Result()
+    names = list(codec.generators)
+    start = time.perf_counter()
+    case = 0
+    while case < len(names) or time.perf_counter() - start < seconds:
+        gen_name = names[case % len(names)]
+        rng = random.Random(f"{seed}:{codec.name}:{case}")
+        data = codec.generators[gen_name](rng)
+        errors = check_case(codec, data, reference, result)
+        if errors:
+            failure = {"case": case, "generator": gen_name, "size": len(data), "errors": errors}
+            if failures_dir is not None:
+                path = os.path.join(failures_dir, f"{codec.name}-{seed}-{case}.bin")
+                with open(path, "wb") as f:
+                    f.write(data)
+                failure["path"] = path
+            result.failures.append(failure)
+        case += 1
+    return result
+
+
+def _mb_per_s(size: int, seconds: float) -> float:
+    return size / seconds / 1e6 if seconds > 0 else 0.0
+
+
+def summarize(result: Result) -> dict[str, Any]:
+    summary: dict[str, Any] = {
+        "cases": result.cases,
+        "input_bytes": result.input_bytes,
+        "comp_bytes": result.comp_bytes,
+        "comp_mb_per_s": _mb_per_s(result.input_bytes, result.comp_seconds),
+        "decomp_mb_per_s": _mb_per_s(result.input_bytes, result.decomp_seconds),
+        "failures": result.failures,
+    }
+    if result.reference_bytes:
+        summary["reference_bytes"] = result.reference_bytes
+        summary["larger_than_reference"] = result.larger_than_reference
+    return summary
+
+
+def print_summary(name: str, summary: dict[str, Any], reference: Reference | None) -> None:
+    print(
+        f"{name}: {summary['cases']} cases, "
+        f"comp {summary['comp_mb_per_s']:.3f} MB/s, "
+        f"decomp {summary['decomp_mb_per_s']:.3f} MB/s"
+    )
+    if reference is not None and summary.get("reference_bytes"):
+        change = summary["comp_bytes"] / summary["reference_bytes"] - 1
+        print(
+            f"  size {summary['comp_bytes']} vs {summary['reference_bytes']} "
+            f"({reference.label}, {change:+.2%}), "
+            f"larger on {summary['larger_than_reference']} inputs"
+        )
+    for failure in summary["failures"]:
+        where = f" (saved to {failure['path']})" if "path" in failure else ""
+        print(
+            f"  FAIL case {failure['case']} ({failure['generator']}, "
+            f"{failure['size']} bytes){where}"
+        )
+        for error in failure["errors"]:
+            print(f"    {error}")
+
+
+def compare(
+    results: dict[str, dict[str, Any]], baseline: dict[str, dict[str, Any]], threshold: float
+) -> list[str]:
+    """Prints the throughput change from the baseline, and returns the regressed codecs."""
+    regressions = []
+    print("compared to baseline:")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"  {name}: not in baseline")
+            continue
+        changes = []
+        for key in ("comp_mb_per_s", "decomp_mb_per_s"):
+            ratio = result[key] / base[key] if base[key] else 1.0
+            status = ""
+            if ratio < 1 - threshold:
+                status = " REGRESSION"
+                if name not in regressions:
+                    regressions.append(name)
+            changes.append(f"{key.split('_')[0]} {ratio - 1:+.1%}{status}")
+        print(f"  {name}: {', '.join(changes)}")
+    return regressions
+
+
+def replay(paths: list[str], codecs: list[Codec], references: dict[str, Reference]) -> bool:
+    """Checks saved inputs with each codec, and returns if they all pass."""
+    passed = True
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        for codec in codecs:
+            errors = check_case(codec, data, references.get(codec.name), Result())
+            print(f"{path} {codec.name}: {'FAIL' if errors else 'ok'}")
+            for error in errors:
+                print(f"  {error}")
+            passed = passed and not errors
+    return passed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--seed", type=int, default=0, help="Seed for generated inputs")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Time budget for each codec")
+    parser.add_argument(
+        "--codec", type=str, nargs="+", choices=list(CODECS), help="Only fuzz these codecs"
+    )
+    parser.add_argument("--reference", type=str, help="Path to an older compress.py")
+    parser.add_argument("--save-failures", type=str, help="Directory to save failing inputs to")
+    parser.add_argument("--replay", type=str, nargs="+", help="Check saved inputs and exit")
+    parser.add_argument("--json", type=str, help="Write the results to a json file")
+    parser.add_argument("--baseline", type=str, help="Results json file to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Fraction of throughput lost from the baseline that counts as a regression",
+    )
+    args = parser.parse_args()
+
+    codecs = [CODECS[name] for name in args.codec] if args.codec else list(CODECS.values())
+    references = load_references(args.reference)
+    if args.replay:
+        if not replay(args.replay, codecs, references):
+            sys.exit(1)
+        return
+    if args.save_failures:
+        os.makedirs(args.save_failures, exist_ok=True)
+
+    results: dict[str, dict[str, Any]] = {}
+    for codec in codecs:
+        reference = references.get(codec.name)
+        result = fuzz_codec(codec, args.seed, args.seconds, reference, args.save_failures)
+        results[codec.name] = summarize(result)
+        print_summary(codec.name, results[codec.name], reference)
+
+    output = {
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+        },
+        "seed": args.seed,
+        "seconds": args.seconds,
+        "codecs": results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+
+    failed = any(r["failures"] for r in results.values())
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline["codecs"], args.threshold):
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Records and checks the exact output of patching, to prove that optimizations change nothing.
+
+`record` patches each entry of a corpus and saves a hash of the ROM after every stage,
+along with the address ranges each stage changed and a hash of each range. Stages write
+their room layers and minimaps when they end, and any changed ones not written yet are
+hashed too. `check` patches the corpus again and compares against a saved record. For each
+entry that differs, it prints the first stage whose output diverged and the address ranges
+(or room layers and minimaps) that differ. Entries are patched in parallel.
+
+The corpus is the representative patch data from patch_corpus.py, and any patch data files
+passed with --patch-data. Stages run on the synthetic image from synthetic_rom.py by
+default, starting after the base patch since the image stands in for a base-patched ROM.
+With a ROM file, every stage runs, the same as patch().
+
+Usage: python tools/golden.py record OUT [ROM_PATH] [--patch-data PATH ...] [--jobs N]
+       python tools/golden.py check RECORD [ROM_PATH] [--patch-data PATH ...] [--jobs N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache
+from typing import Any
+
+from patch_corpus import CORPUS_NAMES, make_patch_data, missing_patch_files
+from synthetic_rom import build_synthetic_rom
+
+from mars_patcher.rom import Rom
+
+RECORD_VERSION = 1
+
+# Size of the blocks compared before looking for changed bytes
+BLOCK_SIZE = 0x1000
+# Changed bytes closer than this are part of the same range
+RANGE_GAP = 0x10
+# Number of differing ranges printed for a stage
+MAX_RANGES_SHOWN = 10
+
+
+def data_hash(data: bytes | bytearray | memoryview) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def changed_ranges(before: bytes, after: bytes | bytearray) -> list[tuple[int, int]]:
+    """Returns the `(start, end)` address ranges that differ between two images."""
+    ranges: list[tuple[int, int]] = []
+    size = min(len(before), len(after))
+    for block in range(0, size, BLOCK_SIZE):
+        block_end = min(block + BLOCK_SIZE, size)
+        if before[block:block_end] == after[block:block_end]:
+            continue
+        for addr in range(block, block_end):
+            if before[addr] == after[addr]:
+                continue
+            if ranges and addr - ranges[-1][1] < RANGE_GAP:
+                ranges[-1] = (ranges[-1][0], addr + 1)
+            else:
+                ranges.append((addr, addr + 1))
+    if len(before) != len(after):
+        ranges.append((size, max(len(before), len(after))))
+    return ranges
+
+
+@cache
+def _synthetic_data(seed: int) -> bytes:
+    return bytes(build_synthetic_rom(seed))
+
+
+def load_corpus(patch_data_paths: list[str], seed: int) -> dict[str, dict[str, Any]]:
+    """Returns the patch data of every corpus entry that can be patched, by name."""
+    corpus: dict[str, dict[str, Any]] = {}
+    for name in CORPUS_NAMES:
+        corpus[name] = make_patch_data(name, seed)
+    for path in patch_data_paths:
+        with open(path, encoding="utf-8") as f:
+            corpus[os.path.basename(path)] = json.load(f)
+    for name, patch_data in list(corpus.items()):
+        missing = missing_patch_files(patch_data)
+        if missing:
+            print(f"{name}: skipped (missing patch files: {', '.join(missing)})")
+            del corpus[name]
+    return corpus
+
+
+def pending_hashes(rom: Rom) -> dict[str, str]:
+    """
+    Returns hashes of the room layers and minimaps that changed but are not written yet.
+    Stages share loaded layers and minimaps, which are written to the ROM when they end.
+    """
+    from mars_patcher.minimap import pending_minimaps
+    from mars_patcher.room_entry import pending_block_layers
+
+    hashes = {}
+    for ptr, layer in pending_block_layers(rom).items():
+        hashes[f"room layer at pointer 0x{ptr:06X}"] = data_hash(layer.block_data)
+    for id, minimap in pending_minimaps(rom).items():
+        hashes[f"minimap {id}"] = data_hash(minimap.tile_data)
+    return hashes
+
+
+def record_entry(patch_data: dict[str, Any], rom_path: str | None, seed: int) -> dict[str, Any]:
+    """Patches a ROM and returns the hashes of its data after each stage."""
+    from mars_patcher.compression_cache import CompressionCache, set_compression_cache
+    from mars_patcher.flush import deferred_writes
+    from mars_patcher.patcher import get_patch_stages
+    from mars_patcher.settings import PatchSettings
+
+    # Each entry starts with an empty cache, like a new process
+    set_compression_cache(CompressionCache())
+    stages = get_patch_stages(PatchSettings.from_json(patch_data))  # type: ignore[arg-type]
+    if rom_path is None:
+        rom = Rom.from_bytes(_synthetic_data(seed))
+        # The synthetic image already has the base patch applied
+        stages = stages[1:]
+    else:
+        rom = Rom(rom_path)
+
+    stage_records = []
+    # Stages share loaded room layers and minimaps within each stage, the same as patch()
+    with deferred_writes(rom):
+        for stage in stages:
+            before = bytes(rom.data)
+            stage.apply(rom)
+            ranges = changed_ranges(before, rom.data)
+            stage_records.append(
+                {
+                    "message": stage.message,
+                    "hash": data_hash(rom.data),
+                    "ranges": [
+                        [start, end, data_hash(rom.data[start:end])] for start, end in ranges
+                    ],
+                    "pending": pending_hashes(rom),
+                }
+            )
+    return {"stages": stage_records, "output": data_hash(rom.data)}
+
+
+def record_corpus(
+    corpus: dict[str, dict[str, Any]], rom_path: str | None, seed: int, jobs: int | None
+) -> dict[str, Any]:
+    names = list(corpus)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(record_entry, corpus[n], rom_path, seed) for n in names]
+        entries = {name: future.result() for name, future in zip(names, futures)}
+    return {
+        "version": RECORD_VERSION,
+        "rom": rom_path or f"synthetic (seed {seed})",
+        "seed": seed,
+        "entries": entries,
+    }
+
+
+def _format_range(start: int, end: int) -> str:
+    return f"0x{start:06X}-0x{end:06X}"
+
+
+def diff_entry(expected: dict[str, Any], actual: dict[str, Any]) -> list[str]:
+    """Returns lines describing where an entry's output first diverged, or nothing if equal."""
+    if expected["output"] == actual["output"] and expected["stages"] == actual["stages"]:
+        return []
+    for i, (exp, act) in enumerate(zip(expected["stages"], actual["stages"])):
+        if exp["message"] != act["message"]:
+            return [f"stage {i} is '{act['message']}', expected '{exp['message']}'"]
+        if exp == act:
+            continue
+        lines = [f"diverged at stage {i} '{act['message']}'"]
+        diffs = []
+        exp_ranges = {(s, e): h for s, e, h in exp["ranges"]}
+        act_ranges = {(s, e): h for s, e, h in act["ranges"]}
+        for start, end in sorted(exp_ranges.keys() | act_ranges.keys()):
+            exp_hash = exp_ranges.get((start, end))
+            act_hash = act_ranges.get((start, end))
+            if exp_hash == act_hash:
+                continue
+            if exp_hash is None:
+                change = "newly written"
+            elif act_hash is None:
+                change = "no longer written"
+            else:
+                change = "written with different data"
+            diffs.append(f"  {_format_range(start, end)}: {change}")
+        for name in sorted(exp["pending"].keys() | act["pending"].keys()):
+            if exp["pending"].get(name) != act["pending"].get(name):
+                diffs.append(f"  {name}: changed differently (not written yet)")
+        if not diffs:
+            # Stages only record what they changed, so an earlier difference carried over
+            diffs.append("  data changed by earlier stages differs")
+        lines.extend(diffs[:MAX_RANGES_SHOWN])
+        if len(diffs) > MAX_RANGES_SHOWN:
+            lines.append(f"  ... and {len(diffs) - MAX_RANGES_SHOWN} more differences")
+        return lines
+    if len(expected["stages"]) != len(actual["stages"]):
+        return [f"ran {len(actual['stages'])} stages, expected {len(expected['stages'])}"]
+    return ["output differs"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("command", choices=("record", "check"), help="What to do")
+    parser.add_argument("record_path", type=str, help="Path of the record json file")
+    parser.add_argument("rom_path", type=str, nargs="?", help="Path to a GBA ROM file")
+    parser.add_argument(
+        "--patch-data", type=str, nargs="+", default=[], help="Extra patch data json files"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed for generated data")
+    parser.add_argument("--jobs", type=int, help="Number of processes. Defaults to CPU count")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        corpus = load_corpus(args.patch_data, args.seed)
+        record = record_corpus(corpus, args.rom_path, args.seed, args.jobs)
+        with open(args.record_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=1)
+        print(f"Recorded {len(record['entries'])} entries to {args.record_path}")
+        return
+
+    with open(args.record_path, encoding="utf-8") as f:
+        expected = json.load(f)
+    if expected.get("version") != RECORD_VERSION:
+        sys.exit(f"Unsupported record version in {args.record_path}")
+    corpus = load_corpus(args.patch_data, expected["seed"])
+    actual = record_corpus(corpus, args.rom_path, expected["seed"], args.jobs)
+    if actual["rom"] != expected["rom"]:
+        print("Warning: the record was made with a different ROM", file=sys.stderr)
+
+    failed = False
+    for name, entry in actual["entries"].items():
+        exp_entry = expected["entries"].get(name)
+        if exp_entry is None:
+            print(f"{name}: not in record")
+            continue
+        lines = diff_entry(exp_entry, entry)
+        if lines:
+            failed = True
+            print(f"{name}: MISMATCH")
+            for line in lines:
+                print(f"  {line}")
+        else:
+            print(f"{name}: ok")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
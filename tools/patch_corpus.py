@@ -0,0 +1,220 @@
+"""
+Representative patch data for benchmarks and output checks.
+
+Each entry is generated from locations.json and a seed, so the corpus needs no files and
+is the same on every machine. "minimal" only has the required options, "typical" has the
+options most seeds use, and "full" uses every option except the ones that apply patches
+built from the asm repository. "full_asm" adds those, so it's the only entry that needs
+them to be in the data directory.
+
+Usage: python tools/patch_corpus.py OUT_DIR [--seed N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+from typing import Any
+
+from mars_patcher.connections import (
+    ELEVATOR_BOTTOMS,
+    ELEVATOR_TOPS,
+    SHORTCUT_LEFT_DOORS,
+    SHORTCUT_RIGHT_DOORS,
+)
+from mars_patcher.data import get_data_path
+from mars_patcher.door_locks import EXCLUDED_DOORS, HATCH_LOCK_ENUMS
+from mars_patcher.navigation_text import NavigationText
+from mars_patcher.text import LANG_ENUMS
+
+CORPUS_NAMES = ("minimal", "typical", "full", "full_asm")
+
+# Major locations are listed in locations.json, but only these can be changed
+MAJOR_LOCATION_COUNT = 20
+MINOR_ITEMS = ("MissileTank", "EnergyTank", "PowerBombTank", "InfantMetroid", "IceTrap")
+ITEM_SPRITES = ("Anonymous", "ShinyMissileTank", "ShinyPowerBombTank")
+HINT_LOCKS = ("OPEN", "LOCKED", "GREY", "BLUE", "GREEN", "YELLOW", "RED")
+DOORS_PER_AREA = 0xB0
+
+# Options that apply patches built from the asm repository: File name
+ASM_PATCH_OPTIONS = {
+    "AntiSoftlockRoomEdits": "anti_softlock.ips",
+    "PowerBombsWithoutBombs": "bombless_pbs.ips",
+    "UnexploredMap": "unhidden_map.ips",
+}
+
+NAV_TEXT = (
+    "Samus, the [COLOR=2]Speed Booster[/COLOR] is in [COLOR=3]Sector 3 (PYR)[/COLOR]. "
+    "Travel through the [COLOR=1]Main Deck[/COLOR] elevator, then go past the area with "
+    "the lava to find it. Proceed with caution."
+)
+
+
+def _locations(rng: random.Random, messages: bool) -> dict[str, Any]:
+    with open(get_data_path("locations.json"), encoding="utf-8") as f:
+        locations = json.load(f)
+    message = {
+        "Languages": {
+            "English": "Custom message for an item.\nIt has two lines.",
+            "German": "Eigene Nachricht fuer einen Gegenstand.",
+        },
+        "Centered": True,
+    }
+    majors = []
+    for i, loc in enumerate(locations["MajorLocations"][:MAJOR_LOCATION_COUNT]):
+        major = {"Source": loc["Source"], "Item": loc["Original"]}
+        if messages and i % 5 == 0:
+            major["ItemMessages"] = message
+        majors.append(major)
+    minors = []
+    for i, loc in enumerate(locations["MinorLocations"]):
+        minor = {
+            "Area": loc["Area"],
+            "Room": loc["Room"],
+            "BlockX": loc["BlockX"],
+            "BlockY": loc["BlockY"],
+            "Item": rng.choice(MINOR_ITEMS),
+        }
+        if messages and i % 7 == 0:
+            minor["ItemSprite"] = rng.choice(ITEM_SPRITES)
+            minor["ItemMessages"] = message
+        minors.append(minor)
+    return {"MajorLocations": majors, "MinorLocations": minors}
+
+
+def _elevator_connections(rng: random.Random) -> dict[str, Any]:
+    bottoms = list(ELEVATOR_BOTTOMS)
+    tops = list(ELEVATOR_TOPS)
+    rng.shuffle(bottoms)
+    rng.shuffle(tops)
+    return {
+        "ElevatorTops": dict(zip(ELEVATOR_TOPS, bottoms)),
+        "ElevatorBottoms": dict(zip(ELEVATOR_BOTTOMS, tops)),
+    }
+
+
+def _sector_shortcuts(rng: random.Random) -> dict[str, Any]:
+    left = list(range(1, 7))
+    right = list(range(1, 7))
+    rng.shuffle(left)
+    rng.shuffle(right)
+    return {"LeftAreas": left, "RightAreas": right}
+
+
+def _door_locks(rng: random.Random) -> list[dict[str, Any]]:
+    # Elevator and shortcut doors can't be locked
+    fixed = {(area, door) for area, door, _ in ELEVATOR_TOPS.values()}
+    fixed |= {(area, door) for area, door, _ in ELEVATOR_BOTTOMS.values()}
+    for i, (left, right) in enumerate(zip(SHORTCUT_LEFT_DOORS, SHORTCUT_RIGHT_DOORS)):
+        fixed |= {(i + 1, left), (i + 1, right)}
+    fixed |= EXCLUDED_DOORS
+    locks = list(HATCH_LOCK_ENUMS)
+    return [
+        {"Area": area, "Door": door, "LockType": rng.choice(locks)}
+        for area in range(7)
+        for door in range(DOORS_PER_AREA)
+        if (area, door) not in fixed and rng.random() < 0.5
+    ]
+
+
+def _navigation_text(languages: list[str]) -> dict[str, Any]:
+    terminals = {name: NAV_TEXT for name in NavigationText.NAV_ROOM_ENUMS}
+    ship_text = {"InitialText": NAV_TEXT, "ConfirmText": "Proceed to the ship?"}
+    return {lang: {"NavigationTerminals": terminals, "ShipText": ship_text} for lang in languages}
+
+
+def make_patch_data(name: str, seed: int = 0) -> dict[str, Any]:
+    """Returns the corpus entry with the provided name. The same seed gives the same data."""
+    if name not in CORPUS_NAMES:
+        raise ValueError(f"Unknown corpus entry '{name}'")
+    if name == "full_asm":
+        full_data = make_patch_data("full", seed)
+        for option in ASM_PATCH_OPTIONS:
+            full_data[option] = True
+        return full_data
+    rng = random.Random(f"{name}:{seed}")
+    full = name == "full"
+    data: dict[str, Any] = {
+        "SeedHash": f"{rng.getrandbits(32):08X}",
+        "Locations": _locations(rng, messages=name != "minimal"),
+        "RequiredMetroidCount": rng.randint(0, 20),
+    }
+    if name == "minimal":
+        return data
+
+    data["StartingItems"] = {"Energy": 299, "Missiles": 20, "PowerBombs": 5}
+    data["TankIncrements"] = {"MissileTank": 5, "EnergyTank": 100, "PowerBombTank": 2}
+    data["ElevatorConnections"] = _elevator_connections(rng)
+    data["SectorShortcuts"] = _sector_shortcuts(rng)
+    data["DoorLocks"] = _door_locks(rng)
+    data["Palettes"] = {
+        "Seed": rng.getrandbits(31),
+        "Randomize": {
+            kind: {"HueMin": 30, "HueMax": 330}
+            for kind in ("Tilesets", "Enemies", "Samus", "Beams")
+        },
+        "ColorSpace": "Oklab" if not full else "HSV",
+    }
+    data["NavigationText"] = _navigation_text(["English"] if not full else list(LANG_ENUMS))
+    data["NavStationLocks"] = {
+        name: rng.choice(HINT_LOCKS) for name in NavigationText.NAV_ROOM_ENUMS
+    }
+    data["DisableDemos"] = True
+    data["SkipDoorTransitions"] = True
+    data["HideDoorsOnMinimap"] = True
+    if not full:
+        return data
+
+    data["StartingLocation"] = {"Area": 1, "Room": 4, "BlockX": 10, "BlockY": 6}
+    data["RoomNames"] = [
+        {"Area": area, "Room": room, "Name": f"Synthetic Room {area}-{room:02X}"}
+        for area in range(7)
+        for room in range(0, 0x40, 3)
+    ]
+    data["CreditsText"] = [
+        {"LineType": "Blue", "Text": "RANDOMIZER"},
+        {"LineType": "White1", "Text": "Benchmark corpus", "BlankLines": 2},
+    ]
+    data["DisableMusic"] = True
+    data["DisableSoundEffects"] = True
+    data["MissileLimit"] = 3
+    data["RevealHiddenTiles"] = True
+    data["LevelEdits"] = {
+        "1": {
+            "4": {
+                "BG1": [{"X": 3, "Y": 3, "Value": 5}],
+                "Clipdata": [{"X": 3, "Y": 3, "Value": 0x10}],
+            }
+        }
+    }
+    data["MinimapEdits"] = {"2": [{"X": 3, "Y": 4, "Tile": 0x40, "Palette": 2}]}
+    return data
+
+
+def missing_patch_files(patch_data: dict[str, Any]) -> list[str]:
+    """Returns the asm patch files the patch data needs that are not in the data directory."""
+    missing = []
+    for option, filename in ASM_PATCH_OPTIONS.items():
+        path = get_data_path("patches", "mf_u", "asm", filename)
+        if patch_data.get(option) and not os.path.isfile(path):
+            missing.append(filename)
+    return missing
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("out_dir", type=str, help="Directory to write the json files to")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the generated data")
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    for name in CORPUS_NAMES:
+        path = os.path.join(args.out_dir, f"{name}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(make_patch_data(name, args.seed), f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+"""
+Builds a synthetic 8 MB Metroid Fusion (U) image for benchmarks and tests.
+
+The image has the header of the real game, and well-formed data at every address the
+patcher reads: room entries with RLE layers, LZ77 minimaps, door lists, area connections,
+hatch lock events, palettes, tilesets, sprites, spritesets, sounds, text, character widths
+and the reserved space tables of the base patch. Every room, door and location used by the
+patcher's constants and locations.json exists, so each patch stage can run end-to-end
+without copyrighted data.
+
+The image stands in for a ROM that already has the base patch applied, since the reserved
+space tables only exist after it. Skip the "Applying base patch..." stage when patching it.
+
+Usage: python tools/synthetic_rom.py OUT_PATH [--seed N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import struct
+from array import array
+
+import mars_patcher.constants.game_data as gd
+from mars_patcher.compress import comp_lz77, comp_rle
+from mars_patcher.connections import (
+    ELEVATOR_BOTTOMS,
+    ELEVATOR_TOPS,
+    SHORTCUT_LEFT_DOORS,
+    SHORTCUT_RIGHT_DOORS,
+)
+from mars_patcher.constants.palettes import NETTORI_EXTRA_PALS
+from mars_patcher.constants.reserved_space import ReservedConstants
+from mars_patcher.data import get_data_path
+from mars_patcher.door_locks import CLIP_VALUES, HatchLock
+from mars_patcher.door_table import DOOR_ENTRY, MAX_DOORS_PER_AREA
+from mars_patcher.item_patcher import TANK_BG1_START, TANK_TILE
+from mars_patcher.minimap import MINIMAP_DIM
+from mars_patcher.navigation_text import NavRoom
+from mars_patcher.rom import ROM_OFFSET, SIZE_8MB, Region, Rom
+from mars_patcher.text import KANJI_START, NEWLINE, Language, get_char_map
+
+TITLE = b"METROID4USA\0AMTE"
+TITLE_ADDR = 0xA0
+
+# Start and end of the area that tables point into. Nothing the patcher reads or writes
+# directly is in this range for MF U
+DATA_START = 0x600000
+DATA_END = 0x73C000
+
+ROOMS_PER_AREA = 0x60
+# Each room has a door on its left and right side
+DOORS_PER_ROOM = 2
+ROOM_ENTRY_SIZE = 0x3C
+TILESET_ENTRY_SIZE = 0x14
+ROOM_WIDTH = 0x30
+ROOM_HEIGHT = 0x20
+# Y position of the top of every hatch
+HATCH_Y = 4
+HATCH_HEIGHT = 4
+SAVE_PAD_SPRITE = 0x1F
+MESSAGE_COUNT = 0x100
+MIN_SPRITE_ID = 0x10
+
+
+class Allocator:
+    """Places data in the synthetic image, aligned to 4 bytes."""
+
+    def __init__(self, data: bytearray, start: int, end: int):
+        self.data = data
+        self.addr = start
+        self.end = end
+
+    def add(self, payload: bytes | bytearray) -> int:
+        addr = self.addr
+        end = addr + len(payload)
+        if end > self.end:
+            raise RuntimeError("Synthetic ROM data does not fit")
+        self.data[addr:end] = payload
+        self.addr = (end + 3) & ~3
+        return addr
+
+
+def write_ptr(data: bytearray, addr: int, target: int) -> None:
+    struct.pack_into("<I", data, addr, target + ROM_OFFSET)
+
+
+def random_colors(rng: random.Random, count: int) -> bytes:
+    return array("H", (rng.getrandbits(15) for _ in range(count))).tobytes()
+
+
+def random_blocks(
+    rng: random.Random, count: int, values: tuple[int, ...], max_run: int = 12
+) -> array[int]:
+    """Returns blocks made of runs of random values, like level data."""
+    blocks = array("H")
+    while len(blocks) < count:
+        blocks.extend([rng.choice(values)] * rng.randint(1, max_run))
+    del blocks[count:]
+    return blocks
+
+
+def room_sizes() -> dict[tuple[int, int], tuple[int, int]]:
+    """Returns the size of rooms that need to be larger than the default to fit items."""
+    with open(get_data_path("locations.json"), encoding="utf-8") as f:
+        locations = json.load(f)
+    sizes: dict[tuple[int, int], tuple[int, int]] = {}
+    for loc in locations["MinorLocations"]:
+        area_room = (loc["Area"], loc["Room"])
+        width, height = sizes.get(area_room, (ROOM_WIDTH, ROOM_HEIGHT))
+        sizes[area_room] = (max(width, loc["BlockX"] + 2), max(height, loc["BlockY"] + 2))
+    return sizes
+
+
+def build_layer(
+    rng: random.Random,
+    width: int,
+    height: int,
+    values: tuple[int, ...],
+    columns: dict[int, list[int]] | None = None,
+) -> bytes:
+    """
+    Returns an RLE layer, preceded by its width and height. Columns map X positions to
+    the values of the hatch blocks in them.
+    """
+    blocks = random_blocks(rng, width * height, values)
+    for x, hatch_vals in (columns or {}).items():
+        for i, val in enumerate(hatch_vals):
+            blocks[(HATCH_Y + i) * width + x] = val
+    return bytes((width, height)) + comp_rle(blocks.tobytes())
+
+
+def build_rooms(rom: Rom, alloc: Allocator, rng: random.Random) -> None:
+    data = rom.data
+    sizes = room_sizes()
+    # Shared by rooms, since nothing reads them
+    dummy = alloc.add(bytes(0x40))
+    capped = CLIP_VALUES[HatchLock.LEVEL_0]
+    for area in range(gd.area_count(rom)):
+        entries = bytearray(ROOMS_PER_AREA * ROOM_ENTRY_SIZE)
+        for room in range(ROOMS_PER_AREA):
+            width, height = sizes.get((area, room), (ROOM_WIDTH, ROOM_HEIGHT))
+            # Both doors have capped hatches, in slots 0 and 1
+            hatch_xs = (1, width - 2)
+            clip_columns = {x: [capped[slot]] * HATCH_HEIGHT for slot, x in enumerate(hatch_xs)}
+            bg1_columns = {x: [0x10 + y * 0x10 for y in range(HATCH_HEIGHT)] for x in hatch_xs}
+            bg1 = alloc.add(build_layer(rng, width, height, (0, 0, 0x41, 0x42, 0x43), bg1_columns))
+            bg2 = alloc.add(build_layer(rng, width, height, (0, 0x101, 0x102, 0x1B5)))
+            clip = alloc.add(build_layer(rng, width, height, (0, 0, 0x10, 0x11), clip_columns))
+            # Sprite layout entries are Y, X and properties. The first one uses the first
+            # sprite of the spriteset, which is a save pad in some spritesets
+            layout = bytes((2, 2, 1, 5, 6, 2, 0xFF, 0xFF, 0xFF))
+            layout_addr = alloc.add(layout)
+
+            offset = room * ROOM_ENTRY_SIZE
+            entries[offset] = room % gd.tileset_count(rom)
+            for ptr_offset in range(0x4, 0x20, 4):
+                write_ptr(entries, offset + ptr_offset, dummy)
+            write_ptr(entries, offset + 0xC, bg1)
+            write_ptr(entries, offset + 0x10, bg2)
+            write_ptr(entries, offset + 0x14, clip)
+            write_ptr(entries, offset + 0x20, layout_addr)
+            entries[offset + 0x24] = room % gd.spriteset_count(rom)
+        write_ptr(data, gd.area_room_entry_ptrs(rom) + area * 4, alloc.add(entries))
+
+
+def build_doors(rom: Rom, alloc: Allocator) -> None:
+    data = rom.data
+    sizes = room_sizes()
+    door_count = min(ROOMS_PER_AREA * DOORS_PER_ROOM, MAX_DOORS_PER_AREA - 1)
+    for area in range(gd.area_count(rom)):
+        doors = bytearray()
+        for door in range(door_count):
+            room, side = divmod(door, DOORS_PER_ROOM)
+            width, _ = sizes.get((area, room), (ROOM_WIDTH, ROOM_HEIGHT))
+            # Left doors lead to the previous room's right door, and the other way around
+            if side == 0:
+                x, x_exit, dest = 0, 2, max(door - 1, 0)
+            else:
+                x, x_exit, dest = width - 1, -2, min(door + 1, door_count - 1)
+            y_end = HATCH_Y + HATCH_HEIGHT - 1
+            # Type 4 is a lockable hatch
+            doors += DOOR_ENTRY.pack(4, room, x, x, HATCH_Y, y_end, dest, x_exit, 0)
+        # End of list
+        doors += bytes(DOOR_ENTRY.size)
+        write_ptr(data, gd.area_doors_ptrs(rom) + area * 4, alloc.add(doors))
+
+
+def build_area_connections(rom: Rom) -> None:
+    data = rom.data
+    conns: list[tuple[int, int, int]] = []
+    for area, door, in_list in (*ELEVATOR_TOPS.values(), *ELEVATOR_BOTTOMS.values()):
+        if in_list:
+            conns.append((area, door, 0 if area != 0 else 1))
+    for i, (left, right) in enumerate(zip(SHORTCUT_LEFT_DOORS, SHORTCUT_RIGHT_DOORS)):
+        conns.append((i + 1, left, i))
+        conns.append((i + 1, right, i + 2 if i < 5 else 1))
+    count = gd.area_connections_count(rom)
+    door = 0x10
+    while len(conns) < count:
+        conns.append((len(conns) % 7, door, (len(conns) + 1) % 7))
+        door += 1
+    addr = gd.area_connections(rom)
+    for area_conn in conns[:count]:
+        data[addr : addr + 3] = bytes(area_conn)
+        addr += 3
+    data[addr : addr + 3] = b"\xff\xff\xff"
+
+
+def build_hatch_lock_events(rom: Rom) -> None:
+    data = rom.data
+    addr = gd.hatch_lock_events(rom)
+    for i in range(gd.hatch_lock_event_count(rom)):
+        area = i % 7
+        room = 1 + i
+        # Event, area, room + 1, hatch flags and padding
+        data[addr : addr + 5] = bytes((0x10 + i, area, room + 1, 0b11, 0))
+        addr += 5
+
+
+def build_minimaps(rom: Rom, alloc: Allocator, rng: random.Random) -> None:
+    data = rom.data
+    ptrs = gd.minimap_ptrs(rom)
+    for id in range(gd.minimap_count(rom)):
+        tiles = random_blocks(rng, MINIMAP_DIM * MINIMAP_DIM, (0x140, 0x141, 0x2042, 0xA0))
+        write_ptr(data, ptrs + id * 4, alloc.add(comp_lz77(tiles.tobytes())))
+
+
+def build_graphics(rom: Rom, alloc: Allocator, rng: random.Random) -> None:
+    data = rom.data
+    # Tilesets: the patcher reads the palette and the RLE tilemap
+    dummy = alloc.add(bytes(0x20))
+    tilemap = bytearray(2 + (TANK_BG1_START + 0x10) * 8)
+    for i, tile in enumerate(TANK_TILE):
+        tilemap[2 + (TANK_BG1_START + i) * 8] = tile
+    tilemap_addr = alloc.add(tilemap)
+    addr = gd.tileset_entries(rom)
+    for _ in range(gd.tileset_count(rom)):
+        for ptr_offset in range(0, TILESET_ENTRY_SIZE, 4):
+            write_ptr(data, addr + ptr_offset, dummy)
+        write_ptr(data, addr + 4, alloc.add(random_colors(rng, 13 * 16)))
+        write_ptr(data, addr + 0xC, tilemap_addr)
+        addr += TILESET_ENTRY_SIZE
+
+    # Animated palettes
+    addr = gd.anim_palette_entries(rom)
+    for _ in range(gd.anim_palette_count(rom)):
+        rows = rng.randint(1, 4)
+        data[addr + 2] = rows
+        write_ptr(data, addr + 4, alloc.add(random_colors(rng, rows * 16)))
+        addr += 8
+
+    # Sprites: VRAM sizes decide how many palette rows each sprite has
+    sizes = gd.sprite_vram_sizes(rom)
+    pals = gd.sprite_palette_ptrs(rom)
+    gfx = gd.sprite_graphics_ptrs(rom)
+    for i in range(gd.sprite_count(rom) - MIN_SPRITE_ID):
+        rows = rng.randint(1, 4)
+        struct.pack_into("<I", data, sizes + i * 4, rows * 0x800)
+        write_ptr(data, pals + i * 4, alloc.add(random_colors(rng, rows * 16)))
+        write_ptr(data, gfx + i * 4, dummy)
+
+    # Spritesets: sprite ID and graphics row pairs, ending with 0
+    ptrs = gd.spriteset_ptrs(rom)
+    for i in range(gd.spriteset_count(rom)):
+        first = SAVE_PAD_SPRITE if i % 4 == 0 else 0x20 + i % 0x40
+        spriteset = bytes((first, 0, 0x30 + i % 0x20, 1, 0, 0))
+        write_ptr(data, ptrs + i * 4, alloc.add(spriteset))
+
+    # Palettes at fixed addresses
+    palettes = [
+        *gd.samus_palettes(rom),
+        *gd.helmet_cursor_palettes(rom),
+        *gd.beam_palettes(rom),
+        *gd.sax_palettes(rom),
+        *NETTORI_EXTRA_PALS,
+    ]
+    for addr, rows in palettes:
+        colors = random_colors(rng, rows * 16)
+        data[addr : addr + len(colors)] = colors
+
+
+def build_text(rom: Rom, alloc: Allocator) -> None:
+    data = rom.data
+    char_map = get_char_map(Region.U)
+    end_message = alloc.add(struct.pack("<H", 0xFF00))
+    # Widths of every character before the kanji
+    widths = gd.character_widths(rom)
+    data[widths : widths + KANJI_START] = bytes(6 + i % 3 for i in range(KANJI_START))
+
+    for lang in Language:
+        # Item messages, with the table address stored in the reserved space
+        table = bytearray(MESSAGE_COUNT * 4)
+        for i in range(MESSAGE_COUNT):
+            write_ptr(table, i * 4, end_message)
+        lookup = ReservedConstants.MESSAGE_TABLE_LOOKUP_ADDR + lang.value * 4
+        write_ptr(data, lookup, alloc.add(table))
+
+        # Navigation text pointers, two per room and ship text
+        nav_count = max(r.value for r in NavRoom) + 1
+        table = bytearray(nav_count * 8)
+        for i in range(nav_count * 2):
+            write_ptr(table, i * 4, end_message)
+        write_ptr(data, gd.navigation_text_ptrs(rom) + lang.value * 4, alloc.add(table))
+
+        # File screen text, starting with "SAMUS DATA" and a newline
+        text = [char_map[c] for c in "SAMUS DATA"] + [NEWLINE, 0xFF00]
+        text_addr = alloc.add(array("H", text).tobytes())
+        text_ptrs = bytearray(4)
+        write_ptr(text_ptrs, 0, text_addr)
+        write_ptr(data, gd.file_screen_text_ptrs(rom) + lang.value * 4, alloc.add(text_ptrs))
+
+
+def build_reserved_space(rom: Rom, alloc: Allocator) -> None:
+    data = rom.data
+    with open(get_data_path("locations.json"), encoding="utf-8") as f:
+        locations = json.load(f)
+    minors = sorted(
+        locations["MinorLocations"], key=lambda loc: (loc["Area"], loc["Room"], loc["BlockX"])
+    )
+
+    # Minor location entries: area, room, unused, X, Y, item, item sprite, message
+    entries = bytearray()
+    # Area: {Room: Index of its first entry}
+    room_starts: dict[int, dict[int, int]] = {area: {} for area in range(7)}
+    for i, loc in enumerate(minors):
+        room_starts[loc["Area"]].setdefault(loc["Room"], i)
+        entries += bytes((loc["Area"], loc["Room"], 0, loc["BlockX"], loc["BlockY"], 0, 0, 0))
+    write_ptr(data, ReservedConstants.MINOR_LOCS_ARRAY_ADDR, alloc.add(entries))
+
+    # Per area: 16 sorted room IDs, padded with 0xFF, then the index of each room's entries
+    for area, starts in room_starts.items():
+        rooms = sorted(starts)
+        table = bytearray(b"\xff" * 16 + bytes(16))
+        for i, room in enumerate(rooms):
+            table[i] = room
+            table[16 + i] = starts[room]
+        write_ptr(data, ReservedConstants.MINOR_LOCS_TABLE_ADDR + area * 4, alloc.add(table))
+
+    # Room names, indexed by room ID
+    for area in range(gd.area_count(rom)):
+        names = bytes(ROOMS_PER_AREA * 4)
+        write_ptr(data, ReservedConstants.ROOM_NAMES_TABLE_ADDR + area * 4, alloc.add(names))
+
+
+def build_sounds(rom: Rom, alloc: Allocator) -> None:
+    data = rom.data
+    # Each sound's header starts with its track count, which is what the patcher changes
+    headers = alloc.add(b"\x01" * gd.sound_count(rom) * 4)
+    addr = gd.sound_data_entries(rom)
+    for i in range(gd.sound_count(rom)):
+        write_ptr(data, addr + i * 8, headers + i * 4)
+
+
+def build_synthetic_rom(seed: int = 0) -> bytearray:
+    """Returns the data of a synthetic MF U image. The same seed gives the same data."""
+    rng = random.Random(seed)
+    header = bytearray(SIZE_8MB)
+    header[TITLE_ADDR : TITLE_ADDR + len(TITLE)] = TITLE
+    # Game data addresses are looked up from the ROM's game and region
+    rom = Rom.from_bytes(header)
+    alloc = Allocator(rom.data, DATA_START, DATA_END)
+    build_rooms(rom, alloc, rng)
+    build_doors(rom, alloc)
+    build_area_connections(rom)
+    build_hatch_lock_events(rom)
+    build_minimaps(rom, alloc, rng)
+    build_graphics(rom, alloc, rng)
+    build_text(rom, alloc)
+    build_reserved_space(rom, alloc)
+    build_sounds(rom, alloc)
+    return rom.data
+
+
+def build_synthetic(seed: int = 0) -> Rom:
+    """Returns a ROM with synthetic data, loaded the same way as a ROM file."""
+    return Rom.from_bytes(build_synthetic_rom(seed))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("out_path", type=str, help="Path to write the ROM to")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the generated data")
+    args = parser.parse_args()
+
+    with open(args.out_path, "wb") as f:
+        f.write(build_synthetic_rom(args.seed))
+
+
+if __name__ == "__main__":
+    main()